@@ -0,0 +1,28 @@
+# Author: Ryan Riccio
+# Date: Oct 19th, 2026
+# Program: Compare Enigma cracking backends on the sample intercepts.
+#          Run from the root of the repo: python -m benchmarks.enigma_crack [backend ...]
+import sys
+import glob
+import time
+from encryption_algorithms.enigma import Enigma
+
+
+def main():
+    backends = sys.argv[1:] or ["python", "numpy", "native"]
+    for filename in sorted(glob.glob("samples/enigma/intercept*.txt")):
+        with open(filename, encoding="latin-1") as f:
+            message = f.read()
+        times = {}
+        for backend in backends:
+            start = time.perf_counter()
+            plaintext, settings = Enigma.crack(message, backend=backend)
+            times[backend] = time.perf_counter() - start
+            print(f"{filename} {backend:>8}: {times[backend]:8.2f} sec {settings} {plaintext[:30]!r}")
+        for backend in times:
+            if "python" in times and backend != "python":
+                print(f"{filename} {backend} speedup: {times['python'] / times[backend]:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
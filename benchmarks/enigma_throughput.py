@@ -0,0 +1,51 @@
+# Author: Ryan Riccio
+# Date: Oct 19th, 2026
+# Program: Measure Enigma encryption throughput in characters per second.
+#          Run from the root of the repo: python -m benchmarks.enigma_throughput
+import time
+from encryption_algorithms.enigma import EnigmaConfig, _m3
+
+
+def keypress_throughput(text, repeats):
+    """ Characters per second when simulating the machine key by key. """
+    start = time.perf_counter()
+    for _ in range(repeats):
+        machine = _m3(EnigmaConfig())
+        "".join(machine.keypress(ch) for ch in text)
+    return len(text) * repeats / (time.perf_counter() - start)
+
+
+def compiled_throughput(text, repeats):
+    """ Characters per second when compiling the tables and doing one gather per character. """
+    start = time.perf_counter()
+    for _ in range(repeats):
+        EnigmaConfig().compile(len(text)).crypt(text)
+    return len(text) * repeats / (time.perf_counter() - start)
+
+
+def gather_throughput(text, repeats):
+    """ Characters per second once the tables are compiled (e.g. many messages under one key). """
+    tables = EnigmaConfig().compile(len(text))
+    start = time.perf_counter()
+    for _ in range(repeats):
+        tables.crypt(text)
+    return len(text) * repeats / (time.perf_counter() - start)
+
+
+def main():
+    with open("samples/plaintext.txt") as f:
+        text = "".join(ch for ch in f.read().upper() if ch.isalpha() and ch.isascii()) * 50
+    repeats = 5
+    EnigmaConfig().compile(1)   # build the wiring tables outside the timings
+
+    old = keypress_throughput(text, repeats)
+    new = compiled_throughput(text, repeats)
+    gather = gather_throughput(text, repeats)
+    print(f"{len(text)} letters x {repeats}")
+    print(f"keypress:         {old:>12,.0f} chars/sec")
+    print(f"compile + gather: {new:>12,.0f} chars/sec ({new / old:.1f}x)")
+    print(f"gather only:      {gather:>12,.0f} chars/sec ({gather / old:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# Author: Ryan Riccio
+# Date: Oct 19th, 2026
+# Program: Measure how many Playfair keys the native cracker tries per second, how the
+#          multithreaded cracker scales with the number of threads, at what length scoring
+#          from digram pair counts beats decrypting the whole text, how much higher text scores from the
+#          pairs, what the fitness cache saves and how long it takes to crack with a batch of proposals
+#          per annealing step.
+#          Run from the root of the repo: python -m benchmarks.playfair_crack
+import glob
+import json
+import math
+import os
+import random
+import time
+import encryption_algorithms.cryptanalysis as ca
+from encryption_algorithms.playfair import Playfair
+
+
+def _seconds(crack, *args, **kwargs):
+    """ Seconds a crack takes less its set up (loading the quadgrams), timed as the same crack trying one key. """
+    start = time.perf_counter()
+    crack(*args, **{**kwargs, "iterations": 1, "temp": 0, "step": 1})
+    setup = time.perf_counter() - start
+    start = time.perf_counter()
+    crack(*args, **kwargs)
+    return time.perf_counter() - start - setup
+
+
+def keys_per_second(ciphertext, iterations, temp, step, pair_scoring=False, cache_size=4096, cracker=None):
+    """ Single threaded annealing with a threshold it never reaches, so every key is tried. """
+    cracker = cracker or ca.PlayfairCrack("ngrams/playfair/quadgrams.json")
+    keys = iterations * (int(round(temp / step)) + 1)
+    return keys / _seconds(cracker.c_crack, ciphertext, iterations=iterations, temp=temp, step=step, fudge=0.5,
+                           threshold=1000, pair_scoring=pair_scoring, cache_size=cache_size)
+
+
+def thread_scaling(ciphertext, threads, iterations, temp, step):
+    """ Keys per second over all chains, every chain runs the whole schedule since the threshold is never reached. """
+    cracker = ca.PlayfairCrack("ngrams/playfair/quadgrams.json")
+    keys = threads * iterations * (int(round(temp / step)) + 1)
+    return keys / _seconds(ca.mt_c_crack, cracker, ciphertext, iterations=iterations, temp=temp, step=step,
+                           threshold=1000, threads=threads)
+
+
+def english_like(length, seed=0):
+    """
+    Text that follows the quadgram statistics (there is no long English sample in the repo). The
+    stored scores are scaled logs, so the scale is picked to give back the mean score of 1000.
+    """
+    with open("ngrams/playfair/quadgrams.json") as f:
+        data = json.load(f)
+    alphabet, ngrams = data["alphabet"].upper(), data["ngrams"]
+    seen = [value for value in ngrams if value]
+    low, high = 0.0, 0.1
+    for _ in range(30):
+        scale = (low + high) / 2
+        weights = [math.exp(scale * (value - data["max_fitness"])) for value in seen]
+        if sum(w * value for w, value in zip(weights, seen)) / sum(weights) < 1000:
+            low = scale
+        else:
+            high = scale
+
+    rng = random.Random(seed)
+    letters = [alphabet.index(ch) for ch in "THE"]
+    choices = {}
+    while len(letters) < length:
+        context = ((letters[-3] << 10) + (letters[-2] << 5) + letters[-1]) << 5
+        if context not in choices:
+            choices[context] = [math.exp(low * ngrams[context + idx]) if ngrams[context + idx] else 0
+                                for idx in range(len(alphabet))]
+        weights = choices[context] if any(choices[context]) else None
+        letters.append(rng.choices(range(len(alphabet)), weights)[0])
+    return "".join(alphabet[idx] for idx in letters)
+
+
+def pair_crossover(lengths, keys, temp, step):
+    """ Keys per second decrypting the whole text against scoring the digram pair counts (best of 3, about keys letters each). """
+    text = english_like(max(lengths))
+    key = "PLAYFIREXMBCDGHKNOQSTUVWZ"
+    for length in lengths:
+        ciphertext = Playfair.encrypt(text[:length], key)
+        digrams = [ciphertext[idx:idx+2] for idx in range(0, len(ciphertext), 2)]
+        pairs = len(set(zip(digrams, digrams[1:])))
+        iterations = max(keys // len(ciphertext) // (int(round(temp / step)) + 1), 200)
+        full = max(keys_per_second(ciphertext, iterations, temp, step) for _ in range(3))
+        counted = max(keys_per_second(ciphertext, iterations, temp, step, pair_scoring=True) for _ in range(3))
+        print(f"{len(ciphertext):>7} letters {pairs:>7} pairs: {full:>12,.0f} keys/sec decrypting "
+              f"{counted:>12,.0f} keys/sec from pairs ({counted / full:.2f}x)")
+
+
+def pair_score_offset(lengths, samples=20):
+    """
+    Mean fitness of the plaintext over every quadgram against over the quadgrams that start on a
+    digram (all the pair scoring sees), the gap is what its threshold has to allow for.
+    """
+    with open("ngrams/playfair/quadgrams.json") as f:
+        data = json.load(f)
+    index = {ch: idx for idx, ch in enumerate(data["alphabet"].upper())}
+    ngrams = data["ngrams"]
+    text = english_like(max(lengths) * samples, seed=1)
+
+    def fitness(plaintext, step):
+        scores = [ngrams[(index[plaintext[idx]] << 15) + (index[plaintext[idx + 1]] << 10) +
+                         (index[plaintext[idx + 2]] << 5) + index[plaintext[idx + 3]]]
+                  for idx in range(0, len(plaintext) - 3, step)]
+        return sum(scores) / len(scores) / 10
+
+    for length in lengths:
+        full, pairs = 0.0, 0.0
+        for sample in range(samples):
+            plaintext = "".join(Playfair._encode_playfair_digrams(text[sample * length:(sample + 1) * length]))
+            full += fitness(plaintext, 1) / samples
+            pairs += fitness(plaintext, 2) / samples
+        print(f"{length:>7} letters: {full:.2f} every quadgram, {pairs:.2f} from pairs (+{pairs - full:.2f})")
+
+
+def cache_savings(ciphertext, iterations, temp, step):
+    """ Keys per second without and with the fitness cache, and how often the cache had the key. """
+    cracker = ca.PlayfairCrack("ngrams/playfair/quadgrams.json")
+    uncached = keys_per_second(ciphertext, iterations, temp, step, cache_size=0)
+    cached = keys_per_second(ciphertext, iterations, temp, step, cracker=cracker)
+    hit_rate = cracker.cache_hits / max(cracker.cache_hits + cracker.cache_misses, 1)
+    print(f"no cache: {uncached:>12,.0f} keys/sec, cache: {cached:>12,.0f} keys/sec ({cached / uncached:.2f}x), "
+          f"{hit_rate:.0%} hits")
+
+
+def time_to_solution(filename, plaintext, batches, runs, iterations, temp, step):
+    """ Seconds of cracking per solve (failed runs count their time too) for each batch size. """
+    with open(filename) as f:
+        ciphertext = "".join(ch for ch in f.read().upper() if ch.isalpha())
+    for batch in batches:
+        seconds, solved = 0.0, 0
+        for _ in range(runs):
+            cracker = ca.PlayfairCrack("ngrams/playfair/quadgrams.json")
+            start = time.perf_counter()
+            solved += plaintext in cracker.c_crack(ciphertext, iterations=iterations, temp=temp, step=step, batch=batch)
+            seconds += time.perf_counter() - start
+        per_solve = f"{seconds / solved:.2f} sec/solve" if solved else "never solved"
+        print(f"{filename} batch {batch:>2}: {solved}/{runs} solved, {per_solve}")
+
+
+def main():
+    for filename in sorted(glob.glob("samples/playfair/*.txt")):
+        with open(filename) as f:
+            ciphertext = "".join(ch for ch in f.read().upper() if ch.isalpha())
+        if not ciphertext:
+            continue
+        rate = keys_per_second(ciphertext, iterations=20000, temp=10, step=0.5)
+        print(f"{filename} ({len(ciphertext)} letters): {rate:>12,.0f} keys/sec")
+
+    with open("samples/playfair/example1.txt") as f:
+        ciphertext = "".join(ch for ch in f.read().upper() if ch.isalpha())
+    threads, single = 1, None
+    while threads <= max(os.cpu_count() or 1, 2):
+        rate = thread_scaling(ciphertext, threads, iterations=20000, temp=10, step=0.5)
+        single = single or rate
+        print(f"{threads:>3} threads: {rate:>12,.0f} keys/sec ({rate / single:.2f}x)")
+        threads *= 2
+
+    cache_savings(ciphertext, iterations=20000, temp=10, step=0.5)
+
+    time_to_solution("samples/playfair/example1.txt", "IOHNSGOSPEL", [1, 4, 8, 16], runs=10,
+                     iterations=10000, temp=10, step=0.2)
+
+    pair_score_offset([800, 3200, 12800])
+
+    pair_crossover([50, 100, 200, 400, 800, 1600, 3200, 6400, 12800, 25600, 51200],
+                   keys=2 ** 30, temp=4, step=1)
+
+
+if __name__ == "__main__":
+    main()
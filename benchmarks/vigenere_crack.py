@@ -0,0 +1,45 @@
+# Author: Ryan Riccio
+# Date: Oct 19th, 2026
+# Program: Crack the sample Vigenere texts, and check that punctuation in the ciphertext (which
+#          still uses up key letters) does not throw the native cracker off the key.
+#          Run from the root of the repo: python -m benchmarks.vigenere_crack
+import glob
+import time
+from encryption_algorithms.vigenere import Vigenere
+
+_punctuated = ("Four score and seven years ago, our fathers brought forth on this continent a new nation: conceived "
+               "in Liberty, and dedicated to the proposition that all men are created equal. Now we are engaged in a "
+               "great civil war, testing whether that nation - or any nation so conceived, and so dedicated - can long "
+               "endure! We are met on a great battle-field of that war; we have come to dedicate a portion of it.")
+
+
+def punctuated(lengths, key="LEMONADE"):
+    """ Crack and brute force the start of a punctuated passage, returns the lengths that came back wrong. """
+    failed = []
+    for length in lengths:
+        plaintext = _punctuated[:length]
+        ciphertext = Vigenere.encrypt(plaintext, key)
+        start = time.perf_counter()
+        _, cracked = Vigenere.crack(ciphertext)
+        seconds = time.perf_counter() - start
+        _, forced = Vigenere.brute_force(Vigenere.encrypt(plaintext, key[:5]), max_key_length=5, top=1)[0]
+        print(f"{length:>4} characters of punctuated text: crack {cracked} ({seconds:.2f} sec), brute force {forced}")
+        if cracked != key or forced != key[:5]:
+            failed.append(length)
+    return failed
+
+
+def main():
+    for filename in sorted(glob.glob("samples/vigenere/*.txt")):
+        with open(filename) as f:
+            ciphertext = f.read()
+        start = time.perf_counter()
+        plaintext, key = Vigenere.crack(ciphertext)
+        print(f"{filename}: {time.perf_counter() - start:8.2f} sec {key} {plaintext[:30]!r}")
+
+    failed = punctuated([150, 300, len(_punctuated)])
+    print(f"punctuated: {'wrong key at ' + str(failed) if failed else 'ok'}")
+
+
+if __name__ == "__main__":
+    main()
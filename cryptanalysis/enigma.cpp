@@ -0,0 +1,876 @@
+#include <string>
+#include <vector>
+#include <mutex>
+#include <atomic>
+#include <thread>
+#include <memory>
+#include <algorithm>
+#include <array>
+#include "include/rriccio/enigma.h"
+#include "include/rriccio/scoreText.h"
+
+#ifndef NOPYTHON
+#include <pybind11/pybind11.h>
+namespace py = pybind11;
+#endif
+
+using namespace std;
+
+// same wiring as _mechanical in enigma.py (offsets added to the wire number)
+static const int rotorForward[5][26] = {
+	{ 4, 9, 10, 2, 7, 1, -3, 9, 13, -10, 3, 8, 2, 9, 10, -8, 7, 3, 0, -4, 6, 13, 5, -6, 4, 10 },
+	{ 0, 8, 1, 7, -12, 3, 11, 13, -11, -8, 1, -4, 10, 6, -2, 13, 0, -11, 7, -6, -5, 3, 9, -2, -10, 5 },
+	{ 1, 2, 3, 4, 5, 6, -4, 8, 9, 10, 13, 10, 13, 0, 10, -11, -8, 5, -12, 7, -10, -9, -2, -5, -8, -11 },
+	{ 4, -9, 12, -8, 11, -6, 3, -7, -10, 7, 10, -3, 5, -6, 9, -4, -3, -12, 1, 13, -10, 8, 6, -11, -2, 2 },
+	{ -5, -2, -1, -12, 2, 3, 13, -9, 12, 6, 8, -8, 1, -6, -3, 8, 10, 5, -6, -10, -4, -7, 9, 7, 4, 11 }
+};
+static const int rotorReverse[5][26] = {
+	{ -6, -5, -4, 3, -4, -2, -1, 8, -13, -10, -9, -7, -10, -3, -2, 4, -9, 6, 0, -8, -3, -13, -9, -7, -10, 10 },
+	{ 0, 8, -13, -1, -5, -9, 11, 4, -3, -8, -7, -1, 2, 6, 10, 5, 0, -11, 12, -6, -13, 2, -10, 11, -3, -7 },
+	{ -7, -1, 4, -2, 11, -3, 12, -4, 8, -5, 10, -6, 9, 0, 11, -8, 8, -9, 5, -10, 2, -10, -5, -13, -10, -13 },
+	{ 7, -2, -6, -8, -4, 12, -13, 6, 3, -3, 10, 4, 11, 3, -12, -11, -7, -5, 9, -1, -10, 8, 2, -9, 10, 6 },
+	{ -10, 1, -4, 8, -7, -9, -2, 6, -3, 10, -11, 3, 6, -1, 7, -6, 4, 12, -8, -13, -12, 5, -5, -8, 9, 2 }
+};
+static const int rotorPushpeg[5] = { 16, 4, 21, 9, 25 };
+static const int reflectorWiring[2][26] = {
+	{ -2, -10, -8, 4, 12, 13, 5, -4, 7, -12, 3, -5, 2, -3, -2, -7, -12, 10, -13, 6, 8, 1, -1, 12, 2, -6 },
+	{ 5, -6, 13, 6, 4, -5, 8, -9, -4, -6, 7, -12, 11, 9, -8, -13, 3, -7, 2, -3, -2, 6, -9, -11, 9, 12 }
+};
+
+// only A-Z (either case) are letters, isalpha also takes accented letters in some locales
+static bool isLetter(unsigned char ch)
+{
+	return (ch >= 'A' && ch <= 'Z') || (ch >= 'a' && ch <= 'z');
+}
+
+const char* EnigmaCrack::rotorNames[5] = { "I", "II", "III", "IV", "V" };
+int EnigmaCrack::rotorOrders[60][3];
+
+EnigmaCrack::EnigmaCrack(const char* ngramsFile)
+{	// get file as string and build the lookup tables
+	file = string(ngramsFile);
+	for (int rotor{ 0 }; rotor < 5; rotor++)
+	{
+		pushpeg[rotor] = rotorPushpeg[rotor];
+		for (int counter{ 0 }; counter < 26; counter++)
+		{
+			for (int wire{ 0 }; wire < 26; wire++)
+			{
+				forward[rotor][counter][wire] = static_cast<unsigned char>((wire + rotorForward[rotor][(wire + counter) % 26] + 26) % 26);
+				reverse[rotor][counter][wire] = static_cast<unsigned char>((wire + rotorReverse[rotor][(wire + counter) % 26] + 26) % 26);
+			}
+		}
+	}
+	for (int reflector{ 0 }; reflector < 2; reflector++)
+	{
+		for (int wire{ 0 }; wire < 26; wire++)
+			reflect[reflector][wire] = static_cast<unsigned char>((wire + reflectorWiring[reflector][wire] + 26) % 26);
+	}
+
+	// every rotor order in the same order as itertools.permutations
+	int order{ 0 };
+	for (int left{ 0 }; left < 5; left++)
+		for (int middle{ 0 }; middle < 5; middle++)
+			for (int right{ 0 }; right < 5; right++)
+				if (left != middle && middle != right && left != right)
+				{
+					rotorOrders[order][0] = left;
+					rotorOrders[order][1] = middle;
+					rotorOrders[order][2] = right;
+					order++;
+				}
+}
+
+void EnigmaCrack::setMessage(const char* newMessage)
+{	// split the message the same way Enigma.decrypt does, first 6 characters are the indicator
+	message = string(newMessage);
+	indicator.clear();
+	body.clear();
+	for (size_t idx{ 0 }; idx < message.length() && idx < 6; idx++)
+	{
+		if (isLetter(static_cast<unsigned char>(message[idx])))
+			indicator.push_back(static_cast<unsigned char>(toupper(message[idx]) - 'A'));
+	}
+	for (size_t idx{ 6 }; idx < message.length(); idx++)
+	{
+		if (isLetter(static_cast<unsigned char>(message[idx])))
+			body.push_back(static_cast<unsigned char>(toupper(message[idx]) - 'A'));
+	}
+}
+
+void EnigmaCrack::step(int& L, int& M, int& R, int middle, int right) const
+{	// same as _m3._step (including the double step)
+	if (M == pushpeg[middle])
+	{
+		L = (L + 1) % 26;
+		M = (M + 1) % 26;
+	}
+	if (R == pushpeg[right])
+		M = (M + 1) % 26;
+	R = (R + 1) % 26;
+}
+
+unsigned char EnigmaCrack::encipher(unsigned char letter, const EnigmaKey& key, int L, int M, int R) const
+{	// path through the plugboard, the rotors, the reflector and back
+	letter = key.plugboard[letter];
+	letter = forward[key.rotors[2]][R][letter];
+	letter = forward[key.rotors[1]][M][letter];
+	letter = forward[key.rotors[0]][L][letter];
+	letter = reflect[key.reflector][letter];
+	letter = reverse[key.rotors[0]][L][letter];
+	letter = reverse[key.rotors[1]][M][letter];
+	letter = reverse[key.rotors[2]][R][letter];
+	return key.plugboard[letter];
+}
+
+bool EnigmaCrack::decryptIndicator(const EnigmaKey& key, unsigned char* msgKey) const
+{	// decrypt the doubled message key and make sure both halves agree
+	if (indicator.size() != 6)
+		return false;
+	int L = (key.start[0] - key.ring[0] + 26) % 26;
+	int M = (key.start[1] - key.ring[1] + 26) % 26;
+	int R = (key.start[2] - key.ring[2] + 26) % 26;
+	unsigned char decrypted[6];
+	for (int idx{ 0 }; idx < 6; idx++)
+	{
+		step(L, M, R, key.rotors[1], key.rotors[2]);
+		decrypted[idx] = encipher(indicator[idx], key, L, M, R);
+		if (idx >= 3 && decrypted[idx] != decrypted[idx - 3])
+			return false;
+	}
+	for (int idx{ 0 }; idx < 3; idx++)
+		msgKey[idx] = decrypted[idx];
+	return true;
+}
+
+void EnigmaCrack::decryptBody(const EnigmaKey& key, const unsigned char* msgKey, const vector<unsigned char>& text,
+	                          vector<unsigned char>& plaintext) const
+{	// decrypt into a buffer the caller reuses
+	int L = (msgKey[0] - key.ring[0] + 26) % 26;
+	int M = (msgKey[1] - key.ring[1] + 26) % 26;
+	int R = (msgKey[2] - key.ring[2] + 26) % 26;
+	plaintext.resize(text.size());
+	for (size_t idx{ 0 }; idx < text.size(); idx++)
+	{
+		step(L, M, R, key.rotors[1], key.rotors[2]);
+		plaintext[idx] = encipher(text[idx], key, L, M, R);
+	}
+}
+
+double EnigmaCrack::indexOfCoincidence(const vector<unsigned char>& text) const
+{
+	int counts[26]{ 0 };
+	for (auto letter : text)
+		counts[letter]++;
+	double total{ 0 };
+	for (int count : counts)
+		total += static_cast<double>(count) * (count - 1);
+	double length = static_cast<double>(text.size());
+	return length > 1 ? total / (length * (length - 1)) : 0;
+}
+
+double EnigmaCrack::score(const vector<unsigned char>& text, const ScoreText* ngrams) const
+{	// ngram fitness when we have a table, index of coincidence (scaled up to be readable) otherwise
+	if (ngrams == nullptr)
+		return indexOfCoincidence(text) * 1000;
+	return ngrams->checkIndexFitness(text.data(), text.size());
+}
+
+void EnigmaCrack::searchRotorOrder(int order, int leftStart, const ScoreText* ngrams, EnigmaKey& localBestKey,
+	                               double& localMaxFitness, string& localMsgKey) const
+{	// try every middle/right start position for one rotor order and left start
+	EnigmaKey key;
+	key.rotors[0] = rotorOrders[order][0];
+	key.rotors[1] = rotorOrders[order][1];
+	key.rotors[2] = rotorOrders[order][2];
+	key.start[0] = leftStart;
+	unsigned char msgKey[3];
+	vector<unsigned char> plaintext(body.size());
+	double fitness;
+
+	for (key.start[1] = 0; key.start[1] < 26; key.start[1]++)
+	{
+		for (key.start[2] = 0; key.start[2] < 26; key.start[2]++)
+		{
+			if (!decryptIndicator(key, msgKey))
+				continue;
+			decryptBody(key, msgKey, body, plaintext);
+			fitness = score(plaintext, ngrams);
+			if (fitness > localMaxFitness)
+			{
+				localMaxFitness = fitness;
+				localBestKey = key;
+				localMsgKey = { static_cast<char>('A' + msgKey[0]), static_cast<char>('A' + msgKey[1]),
+					static_cast<char>('A' + msgKey[2]) };
+			}
+		}
+	}
+}
+
+void EnigmaCrack::searchMessageKeys(int order, int leftStart, size_t topN,
+	                                vector<pair<double, EnigmaKey>>& candidates) const
+{	// first phase of the plugboard attack: ignore the indicator and the plugs and rank every
+	// message key by the index of coincidence of the body, keeping the topN (candidates is a min heap)
+	auto worse = [](const pair<double, EnigmaKey>& a, const pair<double, EnigmaKey>& b) { return a.first > b.first; };
+	EnigmaKey key;
+	key.rotors[0] = rotorOrders[order][0];
+	key.rotors[1] = rotorOrders[order][1];
+	key.rotors[2] = rotorOrders[order][2];
+	key.start[0] = leftStart;
+	unsigned char msgKey[3];
+	vector<unsigned char> plaintext(body.size());
+	double fitness;
+
+	for (key.start[1] = 0; key.start[1] < 26; key.start[1]++)
+	{
+		for (key.start[2] = 0; key.start[2] < 26; key.start[2]++)
+		{
+			for (int idx{ 0 }; idx < 3; idx++)
+				msgKey[idx] = static_cast<unsigned char>(key.start[idx]);
+			decryptBody(key, msgKey, body, plaintext);
+			fitness = indexOfCoincidence(plaintext);
+			if (candidates.size() < topN || fitness > candidates.front().first)
+			{
+				candidates.push_back({ fitness, key });
+				push_heap(candidates.begin(), candidates.end(), worse);
+				if (candidates.size() > topN)
+				{
+					pop_heap(candidates.begin(), candidates.end(), worse);
+					candidates.pop_back();
+				}
+			}
+		}
+	}
+}
+
+double EnigmaCrack::hillClimbPlugboard(EnigmaKey& key, const ScoreText* ngrams, int maxPlugs,
+	                                   vector<unsigned char>& plaintext) const
+{	// key.start is the message key here, keep trying every pair of letters until no plug helps
+	unsigned char msgKey[3] = { static_cast<unsigned char>(key.start[0]), static_cast<unsigned char>(key.start[1]),
+		static_cast<unsigned char>(key.start[2]) };
+	decryptBody(key, msgKey, body, plaintext);
+	double fitness = score(plaintext, ngrams);
+	double testFitness;
+	bool betterKey = true;
+	EnigmaKey testKey;
+
+	while (betterKey)
+	{
+		betterKey = false;
+		for (unsigned char i{ 0 }; i < 25; i++)
+		{
+			for (unsigned char j = i + 1; j < 26; j++)
+			{
+				testKey = key;
+				unsigned char* plugs = testKey.plugboard;
+				if (plugs[i] == j)
+				{	// already plugged together, try taking the plug out
+					plugs[i] = i;
+					plugs[j] = j;
+				}
+				else
+				{	// free up both letters and plug them together
+					plugs[plugs[i]] = plugs[i];
+					plugs[plugs[j]] = plugs[j];
+					plugs[i] = j;
+					plugs[j] = i;
+				}
+				int plugCount{ 0 };
+				for (unsigned char letter{ 0 }; letter < 26; letter++)
+					plugCount += plugs[letter] > letter;
+				if (plugCount > maxPlugs)
+					continue;
+
+				decryptBody(testKey, msgKey, body, plaintext);
+				testFitness = score(plaintext, ngrams);
+				if (testFitness > fitness)
+				{
+					fitness = testFitness;
+					key = testKey;
+					betterKey = true;
+				}
+			}
+		}
+	}
+	return fitness;
+}
+
+double EnigmaCrack::windowedScore(const EnigmaKey& key, const ScoreText& ngrams, size_t window,
+	                               vector<unsigned char>& text) const
+{	// key.start is the body start here, score the worst window of the body: one bad stretch (a rotor
+	// stepping in the wrong place for part of the message) drags the whole key down instead of being averaged away
+	unsigned char msgKey[3] = { static_cast<unsigned char>(key.start[0]), static_cast<unsigned char>(key.start[1]),
+		static_cast<unsigned char>(key.start[2]) };
+	decryptBody(key, msgKey, body, text);
+	if (window == 0 || text.size() <= window)
+		return ngrams.checkIndexFitness(text.data(), text.size());
+	double worst{ 0 };
+	bool first = true;
+	for (size_t idx{ 0 }; idx + window <= text.size(); idx += window)
+	{	// the last window takes whatever is left over
+		size_t length = idx + 2 * window > text.size() ? text.size() - idx : window;
+		double fitness = ngrams.checkIndexFitness(text.data() + idx, length);
+		if (first || fitness < worst)
+			worst = fitness;
+		first = false;
+	}
+	return worst;
+}
+
+bool EnigmaCrack::findDayKey(EnigmaKey& key, bool searchRings) const
+{	// key.start is where the rotors start for the body, find the day key whose indicator decrypts to it.
+	// the rings only move the starting counters, so with searchRings any doubled indicator works and
+	// the rings are whatever is left between the message key and the body start
+	unsigned char bodyStart[3] = { static_cast<unsigned char>(key.start[0]), static_cast<unsigned char>(key.start[1]),
+		static_cast<unsigned char>(key.start[2]) };
+	unsigned char msgKey[3];
+	EnigmaKey dayKey = key;
+	for (int idx{ 0 }; idx < 3; idx++)
+		dayKey.ring[idx] = 0;
+	for (dayKey.start[0] = 0; dayKey.start[0] < 26; dayKey.start[0]++)
+	{
+		for (dayKey.start[1] = 0; dayKey.start[1] < 26; dayKey.start[1]++)
+		{
+			for (dayKey.start[2] = 0; dayKey.start[2] < 26; dayKey.start[2]++)
+			{
+				if (!decryptIndicator(dayKey, msgKey))
+					continue;
+				if (!searchRings && (msgKey[0] != bodyStart[0] || msgKey[1] != bodyStart[1] || msgKey[2] != bodyStart[2]))
+					continue;
+				key = dayKey;
+				for (int idx{ 0 }; idx < 3; idx++)
+				{
+					key.ring[idx] = (msgKey[idx] - bodyStart[idx] + 26) % 26;
+					key.start[idx] = (dayKey.start[idx] + key.ring[idx]) % 26;
+				}
+				return true;
+			}
+		}
+	}
+	return false;
+}
+
+bool EnigmaCrack::buildMenu(const string& crib, int offset, BombeMenu& menu) const
+{	// line the crib up with the body at offset, every letter pair is a connection in the menu
+	menu.edges.clear();
+	if (crib.empty() || offset < 0 || offset + crib.length() > body.size())
+		return false;
+	int connections[26]{ 0 };
+	for (size_t idx{ 0 }; idx < crib.length(); idx++)
+	{
+		unsigned char letter = static_cast<unsigned char>(toupper(crib[idx]) - 'A');
+		unsigned char cipher = body[offset + idx];
+		if (letter == cipher)	// enigma never encrypts a letter to itself
+			return false;
+		menu.edges.push_back({ letter, cipher, static_cast<int>(offset + idx) });
+		connections[letter]++;
+		connections[cipher]++;
+	}
+
+	// attach the test register to the letter with the most connections
+	menu.testLetter = 0;
+	for (int letter{ 1 }; letter < 26; letter++)
+	{
+		if (connections[letter] > connections[menu.testLetter])
+			menu.testLetter = letter;
+	}
+	menu.lastPosition = offset + static_cast<int>(crib.length()) - 1;
+	return true;
+}
+
+uint32_t EnigmaCrack::bombeTest(const BombeMenu& menu, const vector<vector<pair<int, int>>>& connections,
+	                            const Scrambler* scramblers, int hypothesis, uint32_t* live) const
+{	// live[i] bit j means "i is plugged to j" has not been ruled out. start from the test letter being
+	// plugged to the hypothesis and follow every implication, returning what is live on the test register
+	pair<unsigned char, unsigned char> pending[26 * 26];
+	int count{ 0 };
+	for (int letter{ 0 }; letter < 26; letter++)
+		live[letter] = 0;
+
+	auto energize = [&](int letter, int plug)
+	{
+		if (live[letter] & (1u << plug))
+			return;
+		live[letter] |= 1u << plug;
+		pending[count++] = { static_cast<unsigned char>(letter), static_cast<unsigned char>(plug) };
+	};
+
+	energize(menu.testLetter, hypothesis);
+	while (count > 0 && live[menu.testLetter] != (1u << 26) - 1)
+	{	// once the whole test register is live nothing else can come of it
+		auto [letter, plug] = pending[--count];
+		energize(plug, letter);	// diagonal board, plugs work both ways
+		for (auto& [other, edge] : connections[letter])
+		{
+			const Scrambler& scrambler = scramblers[edge];
+			energize(other, scrambler.out[scrambler.inner[scrambler.in[plug]]]);
+		}
+	}
+	return live[menu.testLetter];
+}
+
+void EnigmaCrack::searchBombe(int order, int leftStart, const BombeMenu& menu, vector<EnigmaKey>& stops) const
+{	// run the bombe over every middle/right start for one rotor order and left start (rings at A)
+	const uint32_t everyLetter = (1u << 26) - 1;
+	EnigmaKey key;
+	key.rotors[0] = rotorOrders[order][0];
+	key.rotors[1] = rotorOrders[order][1];
+	key.rotors[2] = rotorOrders[order][2];
+	key.start[0] = leftStart;
+
+	// which edges touch each letter, both directions since the scrambler is its own inverse
+	vector<vector<pair<int, int>>> connections(26);
+	for (size_t edge{ 0 }; edge < menu.edges.size(); edge++)
+	{
+		connections[menu.edges[edge].crib].push_back({ menu.edges[edge].cipher, static_cast<int>(edge) });
+		connections[menu.edges[edge].cipher].push_back({ menu.edges[edge].crib, static_cast<int>(edge) });
+	}
+	vector<Scrambler> scramblers(menu.edges.size());
+	vector<array<unsigned char, 26>> innerTables(menu.edges.size());
+	uint32_t live[26];
+
+	for (key.start[1] = 0; key.start[1] < 26; key.start[1]++)
+	{
+		for (key.start[2] = 0; key.start[2] < 26; key.start[2]++)
+		{	// the scrambler (no plugs) at every keypress on the menu. the left and middle rotors and the
+			// reflector only change when the middle rotor steps, so they are one table shared between
+			// connections and the right rotor is looked up as the bombe needs it
+			int L = key.start[0], M = key.start[1], R = key.start[2];
+			int innerL{ -1 }, innerM{ -1 };
+			size_t edge{ 0 }, tables{ 0 };
+			for (int position{ 0 }; position <= menu.lastPosition; position++)
+			{
+				step(L, M, R, key.rotors[1], key.rotors[2]);
+				if (edge == menu.edges.size() || menu.edges[edge].position != position)
+					continue;
+				if (L != innerL || M != innerM)
+				{
+					auto& inner = innerTables[tables++];
+					for (unsigned char letter{ 0 }; letter < 26; letter++)
+					{
+						unsigned char wire = forward[key.rotors[0]][L][forward[key.rotors[1]][M][letter]];
+						inner[letter] = reverse[key.rotors[1]][M][reverse[key.rotors[0]][L][reflect[key.reflector][wire]]];
+					}
+					innerL = L;
+					innerM = M;
+				}
+				scramblers[edge++] = { forward[key.rotors[2]][R], innerTables[tables - 1].data(), reverse[key.rotors[2]][R] };
+			}
+
+			// every hypothesis that ends up live on the test register leads to the same result,
+			// so each test rules out a whole set, usually all 26 at once
+			uint32_t untested = everyLetter;
+			while (untested)
+			{
+				int hypothesis{ 0 };
+				while (!(untested & (1u << hypothesis)))
+					hypothesis++;
+				uint32_t result = bombeTest(menu, connections, scramblers.data(), hypothesis, live);
+				untested &= ~result;
+				if (result == everyLetter)
+					continue;
+
+				// stop: one live letter is the plug, 25 live means the one left over is
+				int liveCount{ 0 };
+				for (uint32_t bits = result; bits; bits &= bits - 1)
+					liveCount++;
+				if (liveCount == 25)
+				{
+					int missing{ 0 };
+					while (result & (1u << missing))
+						missing++;
+					untested &= ~(1u << missing);
+					bombeTest(menu, connections, scramblers.data(), missing, live);
+				}
+				else if (liveCount != 1)
+					continue;
+
+				// read the plugs the stop implies off every letter with a single live wire
+				EnigmaKey stop = key;
+				bool consistent = true;
+				for (int letter{ 0 }; letter < 26 && consistent; letter++)
+				{
+					if (live[letter] == 0 || (live[letter] & (live[letter] - 1)))
+						continue;
+					int plug{ 0 };
+					while (!(live[letter] & (1u << plug)))
+						plug++;
+					consistent = live[plug] == (1u << letter);
+					stop.plugboard[letter] = static_cast<unsigned char>(plug);
+				}
+				if (consistent)
+					stops.push_back(stop);
+			}
+		}
+	}
+}
+
+string EnigmaCrack::decrypt(const EnigmaKey& key, const string& msgKey) const
+{	// decrypt the message body like Enigma.decrypt, anything that is not a letter is passed through
+	size_t first = message.length() > 6 ? message.find_first_not_of(" \t\r\n\f\v", 6) : string::npos;
+	if (first == string::npos || msgKey.length() != 3)
+		return "";
+	size_t last = message.find_last_not_of(" \t\r\n\f\v");
+	string plaintext = message.substr(first, last - first + 1);
+
+	int L = (msgKey[0] - 'A' - key.ring[0] + 26) % 26;
+	int M = (msgKey[1] - 'A' - key.ring[1] + 26) % 26;
+	int R = (msgKey[2] - 'A' - key.ring[2] + 26) % 26;
+	for (auto& ch : plaintext)
+	{
+		if (!isLetter(static_cast<unsigned char>(ch)))
+			continue;
+		step(L, M, R, key.rotors[1], key.rotors[2]);
+		ch = static_cast<char>('A' + encipher(static_cast<unsigned char>(toupper(ch) - 'A'), key, L, M, R));
+	}
+	return plaintext;
+}
+
+EnigmaSettings EnigmaCrack::settings() const
+{
+	string dayKey = { static_cast<char>('A' + bestKey.start[0]), static_cast<char>('A' + bestKey.start[1]),
+		static_cast<char>('A' + bestKey.start[2]) };
+	return { rotorNames[bestKey.rotors[0]], rotorNames[bestKey.rotors[1]], rotorNames[bestKey.rotors[2]],
+		bestMsgKey, dayKey };
+}
+
+EnigmaPlugSettings EnigmaCrack::plugSettings() const
+{
+	auto [left, middle, right, msgKey, dayKey] = settings();
+	string plugs;
+	for (unsigned char letter{ 0 }; letter < 26; letter++)
+	{
+		if (bestKey.plugboard[letter] > letter)
+		{
+			if (!plugs.empty())
+				plugs += ' ';
+			plugs += static_cast<char>('A' + letter);
+			plugs += static_cast<char>('A' + bestKey.plugboard[letter]);
+		}
+	}
+	return { left, middle, right, msgKey, dayKey, plugs };
+}
+
+EnigmaStop EnigmaCrack::stopSettings(const EnigmaKey& key) const
+{
+	string start = { static_cast<char>('A' + key.start[0]), static_cast<char>('A' + key.start[1]),
+		static_cast<char>('A' + key.start[2]) };
+	string plugs;
+	for (unsigned char letter{ 0 }; letter < 26; letter++)
+	{
+		if (key.plugboard[letter] > letter)
+		{
+			if (!plugs.empty())
+				plugs += ' ';
+			plugs += static_cast<char>('A' + letter);
+			plugs += static_cast<char>('A' + key.plugboard[letter]);
+		}
+	}
+	return { rotorNames[key.rotors[0]], rotorNames[key.rotors[1]], rotorNames[key.rotors[2]], start, plugs };
+}
+
+EnigmaRingSettings EnigmaCrack::ringSettings() const
+{
+	auto [left, middle, right, msgKey, dayKey] = settings();
+	string rings = { static_cast<char>('A' + bestKey.ring[0]), static_cast<char>('A' + bestKey.ring[1]),
+		static_cast<char>('A' + bestKey.ring[2]) };
+	return { left, middle, right, msgKey, dayKey, rings };
+}
+
+// multithreaded thread worker
+void mt_c_crack_enigma_Thread(EnigmaCrack& cracker, mutex& mtx, atomic<int>& nextJob, int& bestJob,
+	                          const ScoreText* ngrams)
+{
+	EnigmaKey localBestKey;
+	double localMaxFitness{ -1 };
+	string localMsgKey;
+	int localBestJob{ -1 };
+
+	// jobs are (rotor order, left start) pairs, threads take the next one until they run out
+	for (int job = nextJob++; job < 60 * 26; job = nextJob++)
+	{
+		double before = localMaxFitness;
+		cracker.searchRotorOrder(job / 26, job % 26, ngrams, localBestKey, localMaxFitness, localMsgKey);
+		if (localMaxFitness > before)
+			localBestJob = job;
+	}
+
+	// only the result is shared, ties go to the earliest setting so runs are repeatable
+	lock_guard<mutex> lock(mtx);
+	if (localBestJob < 0)
+		return;
+	if (localMaxFitness > cracker.maxFitness || (localMaxFitness == cracker.maxFitness && localBestJob < bestJob))
+	{
+		cracker.maxFitness = localMaxFitness;
+		cracker.bestKey = localBestKey;
+		cracker.bestMsgKey = localMsgKey;
+		bestJob = localBestJob;
+	}
+}
+
+tuple<string, EnigmaSettings> mt_c_crack_enigma(EnigmaCrack& cracker, const char* message, bool ngramScoring,
+	                                            int numThreads)
+{
+#ifndef NOPYTHON
+	// take control over the python interpreter lock
+	py::gil_scoped_release release;
+#endif
+	mutex mtx;	// shared lock
+	atomic<int> nextJob{ 0 };
+	int bestJob{ 60 * 26 };
+	vector<thread> threads;
+	cracker.setMessage(message);
+	cracker.bestKey = EnigmaKey();
+	cracker.bestMsgKey = "";
+	cracker.maxFitness = -1;
+
+	// one table shared by all threads, scoring it does not change it
+	unique_ptr<ScoreText> ngrams(ngramScoring ? new ScoreText(cracker.file.c_str()) : nullptr);
+
+	size_t threadCount = numThreads > 0 ? numThreads : thread::hardware_concurrency();
+	if (threadCount == 0)
+		threadCount = 1;
+	for (size_t i{ 0 }; i < threadCount; i++)
+	{
+		threads.push_back(thread(mt_c_crack_enigma_Thread, ref(cracker), ref(mtx), ref(nextJob), ref(bestJob), ngrams.get()));
+	}
+	for (auto& current_thread : threads)
+	{	// wait for threads
+		current_thread.join();
+	}
+	return { cracker.decrypt(cracker.bestKey, cracker.bestMsgKey), cracker.settings() };
+}
+
+// phase 1 worker for the plugboard and ring attacks: rank body start positions by index of coincidence
+void mt_c_rank_enigma_Thread(EnigmaCrack& cracker, atomic<int>& nextJob, size_t topN,
+	                         vector<pair<double, EnigmaKey>>& candidates)
+{
+	for (int job = nextJob++; job < 60 * 26; job = nextJob++)
+		cracker.searchMessageKeys(job / 26, job % 26, topN, candidates);
+}
+
+// every rotor order and body start ranked on all threads, best topN first
+vector<pair<double, EnigmaKey>> mt_c_rank_enigma(EnigmaCrack& cracker, size_t topN, size_t threadCount)
+{
+	atomic<int> nextJob{ 0 };
+	vector<vector<pair<double, EnigmaKey>>> threadCandidates(threadCount);
+	vector<thread> threads;
+	for (size_t i{ 0 }; i < threadCount; i++)
+	{
+		threads.push_back(thread(mt_c_rank_enigma_Thread, ref(cracker), ref(nextJob), topN,
+			ref(threadCandidates[i])));
+	}
+	for (auto& current_thread : threads)
+	{	// wait for threads
+		current_thread.join();
+	}
+	vector<pair<double, EnigmaKey>> merged;
+	for (auto& current : threadCandidates)
+		merged.insert(merged.end(), current.begin(), current.end());
+	sort(merged.begin(), merged.end(),
+		[](const pair<double, EnigmaKey>& a, const pair<double, EnigmaKey>& b) { return a.first > b.first; });
+	if (merged.size() > topN)
+		merged.resize(topN);
+	return merged;
+}
+
+// plugboard attack, phase 2 worker: climb the plugboard of each candidate with bigrams then trigrams
+void mt_c_plugboard_Thread(EnigmaCrack& cracker, mutex& mtx, atomic<int>& nextJob,
+	                       const vector<pair<double, EnigmaKey>>& candidates, const ScoreText& bigrams,
+	                       const ScoreText& trigrams, int maxPlugs)
+{
+	vector<unsigned char> plaintext;
+	for (int job = nextJob++; job < static_cast<int>(candidates.size()); job = nextJob++)
+	{
+		EnigmaKey key = candidates[job].second;
+		cracker.hillClimbPlugboard(key, nullptr, maxPlugs, plaintext);
+		cracker.hillClimbPlugboard(key, &bigrams, maxPlugs, plaintext);
+		double fitness = cracker.hillClimbPlugboard(key, &trigrams, maxPlugs, plaintext);
+
+		lock_guard<mutex> lock(mtx);
+		if (fitness > cracker.maxFitness)
+		{
+			cracker.maxFitness = fitness;
+			cracker.bestKey = key;
+		}
+	}
+}
+
+tuple<string, EnigmaPlugSettings> mt_c_crack_enigma_plugboard(EnigmaCrack& cracker, const char* message,
+	                                                          const char* bigramFile, const char* trigramFile,
+	                                                          int candidates, int maxPlugs, int numThreads)
+{
+#ifndef NOPYTHON
+	// take control over the python interpreter lock
+	py::gil_scoped_release release;
+#endif
+	mutex mtx;	// shared lock
+	cracker.setMessage(message);
+	cracker.bestKey = EnigmaKey();
+	cracker.bestMsgKey = "";
+	cracker.maxFitness = -1;
+	auto bigrams = ScoreText(bigramFile);
+	auto trigrams = ScoreText(trigramFile);
+
+	size_t threadCount = numThreads > 0 ? numThreads : thread::hardware_concurrency();
+	if (threadCount == 0)
+		threadCount = 1;
+
+	// phase 1: rank every rotor order and message key by index of coincidence, ignoring the plugs
+	vector<pair<double, EnigmaKey>> merged = mt_c_rank_enigma(cracker, static_cast<size_t>(candidates), threadCount);
+
+	// phase 2: hill climb the plugboard of the best candidates
+	atomic<int> nextJob{ 0 };
+	vector<thread> threads;
+	for (size_t i{ 0 }; i < threadCount; i++)
+	{
+		threads.push_back(thread(mt_c_plugboard_Thread, ref(cracker), ref(mtx), ref(nextJob), cref(merged),
+			cref(bigrams), cref(trigrams), maxPlugs));
+	}
+	for (auto& current_thread : threads)
+	{	// wait for threads
+		current_thread.join();
+	}
+
+	// the winner's start is its message key, the indicator gives back the day key
+	cracker.bestMsgKey = { static_cast<char>('A' + cracker.bestKey.start[0]),
+		static_cast<char>('A' + cracker.bestKey.start[1]), static_cast<char>('A' + cracker.bestKey.start[2]) };
+	string plaintext = cracker.decrypt(cracker.bestKey, cracker.bestMsgKey);
+	EnigmaPlugSettings found = cracker.plugSettings();
+	if (cracker.findDayKey(cracker.bestKey, false))
+		get<4>(found) = get<4>(cracker.plugSettings());
+	else
+		get<4>(found) = "";
+	return { plaintext, found };
+}
+
+tuple<string, EnigmaRingSettings> mt_c_crack_enigma_rings(EnigmaCrack& cracker, const char* message, int candidates,
+	                                                      int window, int numThreads)
+{
+#ifndef NOPYTHON
+	// take control over the python interpreter lock
+	py::gil_scoped_release release;
+#endif
+	cracker.setMessage(message);
+	cracker.bestKey = EnigmaKey();
+	cracker.bestMsgKey = "";
+	cracker.maxFitness = -1;
+	auto ngrams = ScoreText(cracker.file.c_str());
+
+	size_t threadCount = numThreads > 0 ? numThreads : thread::hardware_concurrency();
+	if (threadCount == 0)
+		threadCount = 1;
+
+	// stage 1: where the rotors start for the body does not depend on the rings, so rank every
+	// rotor order and start position by index of coincidence and ignore the indicator
+	vector<pair<double, EnigmaKey>> ranked = mt_c_rank_enigma(cracker, static_cast<size_t>(candidates), threadCount);
+
+	// stage 2: only the best candidates are rescored, on the worst window of the message
+	vector<unsigned char> plaintext;
+	for (auto& [ioc, key] : ranked)
+	{
+		double fitness = cracker.windowedScore(key, ngrams, static_cast<size_t>(window), plaintext);
+		if (fitness > cracker.maxFitness)
+		{
+			cracker.maxFitness = fitness;
+			cracker.bestKey = key;
+		}
+	}
+
+	// stage 3: the indicator gives the message key, the rings are the gap between it and the body start
+	cracker.bestMsgKey = { static_cast<char>('A' + cracker.bestKey.start[0]),
+		static_cast<char>('A' + cracker.bestKey.start[1]), static_cast<char>('A' + cracker.bestKey.start[2]) };
+	string plaintextOut = cracker.decrypt(cracker.bestKey, cracker.bestMsgKey);
+	EnigmaKey bodyKey = cracker.bestKey;
+	if (cracker.findDayKey(cracker.bestKey, true))
+	{
+		cracker.bestMsgKey = "";
+		for (int idx{ 0 }; idx < 3; idx++)
+			cracker.bestMsgKey += static_cast<char>('A' + (bodyKey.start[idx] + cracker.bestKey.ring[idx]) % 26);
+		return { plaintextOut, cracker.ringSettings() };
+	}
+	// no doubled indicator, the body is still readable with the rings left at A
+	cracker.bestKey = bodyKey;
+	EnigmaRingSettings found = cracker.ringSettings();
+	get<4>(found) = "";
+	return { plaintextOut, found };
+}
+
+// bombe thread worker, jobs are (crib offset, rotor order, left start)
+void mt_c_bombe_enigma_Thread(EnigmaCrack& cracker, atomic<int>& nextJob, const vector<BombeMenu>& menus,
+	                          vector<pair<int, EnigmaKey>>& stops)
+{
+	vector<EnigmaKey> found;
+	int jobs = static_cast<int>(menus.size()) * 60 * 26;
+	for (int job = nextJob++; job < jobs; job = nextJob++)
+	{
+		found.clear();
+		cracker.searchBombe(job / 26 % 60, job % 26, menus[job / (60 * 26)], found);
+		for (auto& stop : found)
+			stops.push_back({ job, stop });
+	}
+}
+
+vector<tuple<double, string, EnigmaStop>> mt_c_bombe_enigma(EnigmaCrack& cracker, const char* message, const char* crib,
+	                                                        int offset, int maxStops, int numThreads)
+{
+#ifndef NOPYTHON
+	// take control over the python interpreter lock
+	py::gil_scoped_release release;
+#endif
+	cracker.setMessage(message);
+	auto ngrams = ScoreText(cracker.file.c_str());
+	string cribText;
+	for (const char* ch = crib; *ch != '\0'; ch++)
+	{
+		if (isLetter(static_cast<unsigned char>(*ch)))
+			cribText += static_cast<char>(toupper(*ch));
+	}
+
+	// one menu for the offset asked for, or for every place the crib can go
+	vector<BombeMenu> menus;
+	BombeMenu menu;
+	int first = offset < 0 ? 0 : offset;
+	int last = offset < 0 ? static_cast<int>(cracker.bodyLength()) - static_cast<int>(cribText.length()) : offset;
+	for (int position = first; position <= last; position++)
+	{
+		if (cracker.buildMenu(cribText, position, menu))
+			menus.push_back(menu);
+	}
+
+	size_t threadCount = numThreads > 0 ? numThreads : thread::hardware_concurrency();
+	if (threadCount == 0)
+		threadCount = 1;
+	atomic<int> nextJob{ 0 };
+	vector<vector<pair<int, EnigmaKey>>> threadStops(threadCount);
+	vector<thread> threads;
+	for (size_t i{ 0 }; i < threadCount; i++)
+	{
+		threads.push_back(thread(mt_c_bombe_enigma_Thread, ref(cracker), ref(nextJob), cref(menus),
+			ref(threadStops[i])));
+	}
+	for (auto& current_thread : threads)
+	{	// wait for threads
+		current_thread.join();
+	}
+
+	// decrypt every stop with the plugs it found and put the most readable first
+	vector<tuple<double, string, EnigmaStop>> results;
+	vector<unsigned char> plaintext;
+	for (auto& current : threadStops)
+	{
+		for (auto& [job, stop] : current)
+		{
+			string bodyStart = { static_cast<char>('A' + stop.start[0]), static_cast<char>('A' + stop.start[1]),
+				static_cast<char>('A' + stop.start[2]) };
+			string decrypted = cracker.decrypt(stop, bodyStart);
+			string scored = decrypted;
+			results.push_back({ ngrams.checkFitness(scored), decrypted, cracker.stopSettings(stop) });
+		}
+	}
+	sort(results.begin(), results.end(),
+		[](const tuple<double, string, EnigmaStop>& a, const tuple<double, string, EnigmaStop>& b) { return get<0>(a) > get<0>(b); });
+	if (results.size() > static_cast<size_t>(maxStops))
+		results.resize(maxStops);
+	return results;
+}
@@ -0,0 +1,91 @@
+#include <vector>
+#include <cstdint>
+#include "include/rriccio/fitnessCache.h"
+
+using namespace std;
+
+static const size_t setWays{ 4 };
+
+PackedKey::PackedKey(const unsigned char* letters, size_t count)
+{	// write the letters one after another as a 192 bit stream
+	if (count > maxLetters)
+	{
+		complete = false;
+		return;
+	}
+	for (size_t idx{ 0 }; idx < count; idx++)
+	{
+		size_t bit = idx * 5;
+		size_t word = bit / 64;
+		size_t offset = bit % 64;
+		uint64_t letter = letters[idx] & 31;
+		words[word] |= letter << offset;
+		if (offset > 59)	// split over two words
+			words[word + 1] |= letter >> (64 - offset);
+	}
+}
+
+FitnessCache::FitnessCache(size_t capacity)
+{	// round down to a power of 2 sets so a set is a mask away, 0 turns the cache off
+	size_t sets{ 1 };
+	while (sets * 2 * setWays <= capacity)
+		sets *= 2;
+	if (capacity >= setWays)
+	{
+		entries.resize(sets * setWays);
+		hands.resize(sets, 0);
+		setMask = sets - 1;
+	}
+}
+
+size_t FitnessCache::setOf(const PackedKey& key) const
+{	// mix every word so keys that only differ in a few letters land in different sets
+	uint64_t hash = (key.words[0] ^ (key.words[1] * 0x9E3779B97F4A7C15ull) ^ (key.words[2] * 0x94D049BB133111EBull))
+		* 0xBF58476D1CE4E5B9ull;
+	return static_cast<size_t>(hash ^ (hash >> 31)) & setMask;
+}
+
+bool FitnessCache::find(const PackedKey& key, double& fitness)
+{
+	if (entries.empty() || !key.complete)
+		return false;
+	Entry* set = &entries[setOf(key) * setWays];
+	for (size_t way{ 0 }; way < setWays; way++)
+	{
+		if (set[way].used && set[way].key == key)
+		{
+			set[way].referenced = true;
+			fitness = set[way].fitness;
+			hits++;
+			return true;
+		}
+	}
+	misses++;
+	return false;
+}
+
+void FitnessCache::insert(const PackedKey& key, double fitness)
+{	// take an empty way, otherwise sweep the clock hand past recently used keys and replace the first one that was not
+	if (entries.empty() || !key.complete)
+		return;
+	size_t setIdx = setOf(key);
+	Entry* set = &entries[setIdx * setWays];
+	size_t way{ 0 };
+	while (way < setWays && set[way].used)
+		way++;
+	if (way == setWays)
+	{
+		unsigned char& hand = hands[setIdx];
+		while (set[hand].referenced)
+		{
+			set[hand].referenced = false;
+			hand = static_cast<unsigned char>((hand + 1) % setWays);
+		}
+		way = hand;
+		hand = static_cast<unsigned char>((hand + 1) % setWays);
+	}
+	set[way].key = key;
+	set[way].fitness = fitness;
+	set[way].used = true;
+	set[way].referenced = false;
+}
@@ -0,0 +1,120 @@
+#pragma once
+#include <string>
+#include <vector>
+#include <tuple>
+#include <array>
+#include <cstdint>
+#include "scoreText.h"
+
+using namespace std;
+
+// one possible setup of the machine, everything stored as 0-25 (rotors 0-4 for I-V)
+struct EnigmaKey
+{
+    int reflector{ 0 };
+    int rotors[3]{ 2, 1, 0 };
+    int start[3]{ 0, 0, 0 };
+    int ring[3]{ 0, 0, 0 };
+    unsigned char plugboard[26];
+
+    EnigmaKey()
+    {   // no plugs
+        for (unsigned char letter{ 0 }; letter < 26; letter++)
+            plugboard[letter] = letter;
+    }
+};
+
+// (left rotor, middle rotor, right rotor, message key, day key) like Enigma.crack
+typedef tuple<string, string, string, string, string> EnigmaSettings;
+// same as above with the plugboard pairs at the end, ex. "AB CD"
+typedef tuple<string, string, string, string, string, string> EnigmaPlugSettings;
+// same as above with the ring settings at the end, ex. "AQD"
+typedef tuple<string, string, string, string, string, string> EnigmaRingSettings;
+// bombe stop: (left rotor, middle rotor, right rotor, body start, plugboard pairs it implies)
+typedef tuple<string, string, string, string, string> EnigmaStop;
+
+// one connection in a bombe menu: a crib letter and its cipher letter, joined by the scrambler at a keypress
+struct MenuEdge
+{
+    unsigned char crib;
+    unsigned char cipher;
+    int position;
+};
+
+// the scrambler at one menu connection: right rotor in, left/middle rotors and reflector, right rotor out
+struct Scrambler
+{
+    const unsigned char* in;
+    const unsigned char* inner;
+    const unsigned char* out;
+};
+
+// a crib placed against the ciphertext: the menu and the letter the test register is attached to
+struct BombeMenu
+{
+    vector<MenuEdge> edges;
+    int testLetter{ 0 };
+    int lastPosition{ 0 };
+};
+
+class EnigmaCrack
+{
+public:
+    string file;
+    EnigmaKey bestKey;
+    string bestMsgKey;
+    double maxFitness{ 0 };
+
+    EnigmaCrack(const char* file);
+    void setMessage(const char* message);
+    size_t bodyLength() const { return body.size(); }
+
+    bool decryptIndicator(const EnigmaKey& key, unsigned char* msgKey) const;
+    void decryptBody(const EnigmaKey& key, const unsigned char* msgKey, const vector<unsigned char>& text,
+        vector<unsigned char>& plaintext) const;
+    double indexOfCoincidence(const vector<unsigned char>& text) const;
+    double score(const vector<unsigned char>& text, const ScoreText* ngrams) const;
+    void searchRotorOrder(int order, int leftStart, const ScoreText* ngrams, EnigmaKey& localBestKey,
+        double& localMaxFitness, string& localMsgKey) const;
+    void searchMessageKeys(int order, int leftStart, size_t topN, vector<pair<double, EnigmaKey>>& candidates) const;
+    double hillClimbPlugboard(EnigmaKey& key, const ScoreText* ngrams, int maxPlugs,
+        vector<unsigned char>& plaintext) const;
+    double windowedScore(const EnigmaKey& key, const ScoreText& ngrams, size_t window,
+        vector<unsigned char>& plaintext) const;
+    bool findDayKey(EnigmaKey& key, bool searchRings) const;
+    bool buildMenu(const string& crib, int offset, BombeMenu& menu) const;
+    void searchBombe(int order, int leftStart, const BombeMenu& menu, vector<EnigmaKey>& stops) const;
+    string decrypt(const EnigmaKey& key, const string& msgKey) const;
+    EnigmaSettings settings() const;
+    EnigmaPlugSettings plugSettings() const;
+    EnigmaRingSettings ringSettings() const;
+    EnigmaStop stopSettings(const EnigmaKey& key) const;
+
+    static const char* rotorNames[5];
+    static int rotorOrders[60][3];
+
+private:
+    string message;
+    vector<unsigned char> indicator;
+    vector<unsigned char> body;
+
+    // wiring tables: [rotor][counter][wire]
+    unsigned char forward[5][26][26];
+    unsigned char reverse[5][26][26];
+    unsigned char reflect[2][26];
+    int pushpeg[5];
+
+    void step(int& L, int& M, int& R, int middle, int right) const;
+    unsigned char encipher(unsigned char letter, const EnigmaKey& key, int L, int M, int R) const;
+    uint32_t bombeTest(const BombeMenu& menu, const vector<vector<pair<int, int>>>& connections,
+        const Scrambler* scramblers, int hypothesis, uint32_t* live) const;
+};
+
+tuple<string, EnigmaPlugSettings> mt_c_crack_enigma_plugboard(EnigmaCrack& cracker, const char* message,
+    const char* bigramFile, const char* trigramFile, int candidates = 100, int maxPlugs = 10, int numThreads = 0);
+tuple<string, EnigmaRingSettings> mt_c_crack_enigma_rings(EnigmaCrack& cracker, const char* message,
+    int candidates = 100, int window = 52, int numThreads = 0);
+vector<tuple<double, string, EnigmaStop>> mt_c_bombe_enigma(EnigmaCrack& cracker, const char* message,
+    const char* crib, int offset = -1, int maxStops = 100, int numThreads = 0);
+tuple<string, EnigmaSettings> mt_c_crack_enigma(EnigmaCrack& cracker, const char* message, bool ngramScoring = false,
+    int numThreads = 0);
@@ -0,0 +1,47 @@
+#pragma once
+#include <vector>
+#include <cstdint>
+
+using namespace std;
+
+// a key as 5 bits a letter, every letter is kept so two keys only match when all of their letters do
+struct PackedKey
+{
+    static const size_t maxLetters{ 38 };   // 3 words, more than the 32 letters an ngram alphabet can have
+    uint64_t words[3]{ 0, 0, 0 };
+    bool complete{ true };                  // false when the key was too long to pack, it is never cached
+
+    PackedKey() {}
+    PackedKey(const unsigned char* letters, size_t count);
+    bool operator==(const PackedKey& other) const
+    {
+        return words[0] == other.words[0] && words[1] == other.words[1] && words[2] == other.words[2];
+    }
+};
+
+// bounded key -> fitness memo for one thread, sets of 4 keys with clock eviction in each set
+class FitnessCache
+{
+public:
+    size_t hits{ 0 };
+    size_t misses{ 0 };
+
+    FitnessCache(size_t capacity = 4096);
+    bool find(const PackedKey& key, double& fitness);
+    void insert(const PackedKey& key, double fitness);
+
+private:
+    struct Entry
+    {
+        PackedKey key;
+        double fitness{ 0 };
+        bool used{ false };
+        bool referenced{ false };
+    };
+
+    vector<Entry> entries;
+    vector<unsigned char> hands;    // clock hand of each set
+    size_t setMask{ 0 };
+
+    size_t setOf(const PackedKey& key) const;
+};
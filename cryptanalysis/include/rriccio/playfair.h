@@ -1,9 +1,35 @@
 #pragma once
 #include <string>
+#include <vector>
+#include <random>
 #include "scoreText.h"
+#include "fitnessCache.h"
 
 using namespace std;
 
+// a key as the letter in each cell of the grid and the cell of each letter, letters are
+// indexes into the ngram alphabet so decrypted text can be scored without converting it
+struct PlayfairKey
+{
+    unsigned char grid[25];
+    unsigned char position[32];
+
+    void swapCells(int cellA, int cellB)
+    {   // keep the positions in step with the grid
+        swap(grid[cellA], grid[cellB]);
+        position[grid[cellA]] = static_cast<unsigned char>(cellA);
+        position[grid[cellB]] = static_cast<unsigned char>(cellB);
+    }
+};
+
+// two neighbouring cipher digrams and how many times they occur, digrams are slots in cipherDigrams
+struct DigramPair
+{
+    unsigned short first;
+    unsigned short second;
+    unsigned int count;
+};
+
 class PlayfairCrack
 {
 public:
@@ -11,19 +37,43 @@ public:
     string ciphertext;
     string bestKey = "ABCDEFGHIKLMNOPQRSTUVWXYZ";
     double maxFitness{ 0 };
+    bool pairScoring{ false };      // score keys from the digram pair counts instead of decrypting
+    size_t cacheHits{ 0 };          // fitness cache totals over every thread of the last crack
+    size_t cacheMisses{ 0 };
 
     PlayfairCrack(const char* file);
-    const char* crack(const char* newCiphertext, int iterations = 10000, float temp = 30.0,
-        float step = 0.2, float fudgeFactor = 0.5, float threshold = 95);
+    string crack(const char* newCiphertext, int iterations = 10000, float temp = 30.0,
+        float step = 0.2, float fudgeFactor = 0.5, float threshold = 95, bool usePairs = false,
+        int cacheSize = 4096, int batch = 1);
 
+    void setCiphertext(const char* newCiphertext, const ScoreText& score);
+    PlayfairKey makeKey(const string& key) const;
+    string keyString(const PlayfairKey& key) const;
+    size_t playfairDecrypt(const PlayfairKey& key, unsigned char* plaintext) const;
+    void playfairDecrypt(const PlayfairKey* const* keys, size_t count, unsigned char* plaintext, size_t* lengths) const;
     string playfairDecrypt(string &key) const;
-    void modifyKey(string& key) const;
+    void modifyKey(PlayfairKey& key, mt19937& rng) const;
+    double scoreKey(const PlayfairKey& key, const ScoreText& score, unsigned char* plaintext) const;
+    double scoreKey(const PlayfairKey& key, const ScoreText& score, unsigned char* plaintext, FitnessCache& cache) const;
+    void scoreKeys(const PlayfairKey* keys, size_t count, const ScoreText& score, unsigned char* plaintext,
+        double* fitness, FitnessCache& cache) const;
+    double pairFitness(const PlayfairKey& key, const ScoreText& score) const;
+    size_t textLength() const { return cipherIdx.size(); }
+    bool canScorePairs() const { return pairOffsets > 0; }
 
 private:
-    void exchange2letters(string &key) const;
-    void swap2rows(string &key) const;
-    void swap2cols(string &key) const;
-    void swapAllCols(string& key) const;
-    void swapAllRows(string& key) const;
-    void removeQs(string& plaintext) const;
-};
\ No newline at end of file
+    string alphabet;                // ngram alphabet, the letters every index refers to
+    vector<unsigned char> cipherIdx;
+    unsigned char fillerQ{ 0 };
+    vector<unsigned char> cipherDigrams;    // every distinct cipher digram once, two letters each
+    vector<DigramPair> digramPairs;
+    size_t pairOffsets{ 0 };                // ngrams scored in each pair (those starting in its first digram)
+    double pairNgrams{ 0 };                 // ngrams scored over all pairs
+
+    void exchange2letters(PlayfairKey& key, mt19937& rng) const;
+    void swap2rows(PlayfairKey& key, mt19937& rng) const;
+    void swap2cols(PlayfairKey& key, mt19937& rng) const;
+    void swapAllCols(PlayfairKey& key) const;
+    void swapAllRows(PlayfairKey& key) const;
+    size_t removeQs(unsigned char* plaintext, size_t length) const;
+};
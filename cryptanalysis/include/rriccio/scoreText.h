@@ -11,6 +11,9 @@ class ScoreText
 public:
 	ScoreText(const char* file);
 	double checkFitness(string &text) const;
+	double checkIndexFitness(const unsigned char* indexes, size_t length) const;
+	int indexScore(unsigned int ngramIdx) const { return ngrams[ngramIdx]; }
+	size_t getNgramLength() const;
 	string getAlphabet() const;
 
 private:
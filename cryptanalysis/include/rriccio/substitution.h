@@ -3,16 +3,20 @@
 #include <vector>
 #include <unordered_map>
 #include "scoreText.h"
+#include "fitnessCache.h"
 
 using namespace std;
 
 class SubstitutionCrack
 {
 public:
+	size_t cacheHits{ 0 };		// fitness cache totals of the last crack
+	size_t cacheMisses{ 0 };
+
 	SubstitutionCrack(const char* filename);
-	const char* crack(const char* newCiphertext, int iterations = 2000, int threshold = 3);
+	string crack(const char* newCiphertext, int iterations = 2000, int threshold = 3, int cacheSize = 4096);
 private:
-	double hillClimb(vector<int>& key, ScoreText& score);
+	double hillClimb(vector<int>& key, ScoreText& score, FitnessCache& cache);
 	string ciphertext;
 	string file;
 	vector<int> bestKey;
@@ -0,0 +1,40 @@
+#pragma once
+#include <string>
+#include <vector>
+#include <random>
+#include <tuple>
+#include "scoreText.h"
+
+using namespace std;
+
+class VigenereCrack
+{
+public:
+    string file;
+    string ciphertext;                  // without the spaces, like Vigenere.decrypt
+    vector<unsigned char> letters;      // every letter of the ciphertext as 0-25
+    vector<size_t> offsets;             // where each letter is in ciphertext
+    vector<size_t> positions;           // which key letter each letter is shifted by (mod the key length)
+    string bestKey = "";
+    double maxFitness{ 0 };
+
+    VigenereCrack(const char* file);
+    string crack(const char* newCiphertext, const char* seedKey, int iterations = 2000, float temp = 10.0,
+        float step = 0.5, float threshold = 95);
+
+    void setCiphertext(const char* newCiphertext);
+    string anneal(const string& seedKey, const ScoreText& score, mt19937& rng, double& fitness,
+        int iterations, float temp, float step, float threshold) const;
+    string vigenereDecrypt(const string& key) const;
+
+private:
+    double scoreKey(const string& key, const ScoreText& score) const;
+    double polishKey(string& key, const ScoreText& score) const;
+};
+
+string mt_c_crack_vigenere(VigenereCrack& cracker, const char* newCiphertext, vector<string> seedKeys,
+    int iterations = 2000, float temp = 10.0, float step = 0.5, float threshold = 95, int numThreads = 0,
+    float epsilon = 2);
+
+vector<tuple<double, string, string>> mt_c_brute_force_vigenere(VigenereCrack& cracker, const char* newCiphertext,
+    int maxKeyLength = 5, int topK = 10, int prefixLength = 80, int numThreads = 0);
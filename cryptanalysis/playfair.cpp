@@ -5,31 +5,79 @@
 #include <vector>
 #include <iostream>
 #include <mutex>
+#include <atomic>
 #include <thread>
+#include <random>
 #include "include/rriccio/playfair.h"
 #include "include/rriccio/scoreText.h"
+#include "include/rriccio/fitnessCache.h"
 #include "include/rriccio/substitution.h"
+#include "include/rriccio/vigenere.h"
+#include "include/rriccio/enigma.h"
 
 #ifndef NOPYTHON
 #include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
 namespace py = pybind11;
 #endif
 
 using namespace std;
 
+// the two cells a digram decrypts to only depend on the cells it is in, never on the key
+struct PlayfairCells
+{
+	unsigned char cells[25][25][2];
+
+	PlayfairCells()
+	{
+		for (int cellA{ 0 }; cellA < 25; cellA++)
+		{
+			for (int cellB{ 0 }; cellB < 25; cellB++)
+			{
+				int rowA = cellA / 5, colA = cellA % 5;
+				int rowB = cellB / 5, colB = cellB % 5;
+				if (colA == colB)
+				{
+					cells[cellA][cellB][0] = static_cast<unsigned char>(((rowA + 4) % 5) * 5 + colA);
+					cells[cellA][cellB][1] = static_cast<unsigned char>(((rowB + 4) % 5) * 5 + colB);
+				}
+				else if (rowA == rowB)
+				{
+					cells[cellA][cellB][0] = static_cast<unsigned char>(rowA * 5 + (colA + 4) % 5);
+					cells[cellA][cellB][1] = static_cast<unsigned char>(rowB * 5 + (colB + 4) % 5);
+				}
+				else
+				{
+					cells[cellA][cellB][0] = static_cast<unsigned char>(rowA * 5 + colB);
+					cells[cellA][cellB][1] = static_cast<unsigned char>(rowB * 5 + colA);
+				}
+			}
+		}
+	}
+};
+static const PlayfairCells decryptCells;
+
 PlayfairCrack::PlayfairCrack(const char* ngramsFile)
 {	// get file as string
 	file = string(ngramsFile);
 }
 
-const char* PlayfairCrack::crack(const char* newCiphertext, int iterations, 
-	                             float temp, float step, float fudgeFactor, float threshold)
+string PlayfairCrack::crack(const char* newCiphertext, int iterations,
+	                        float temp, float step, float fudgeFactor, float threshold, bool usePairs, int cacheSize,
+	                        int batch)
 {	// random seed and set vars
-	srand(static_cast<unsigned int>(time(0)));
-	ciphertext = string(newCiphertext);
+	mt19937 rng(random_device{}());
+	FitnessCache cache(cacheSize);
+	uniform_real_distribution<double> chance(0.0, 1.0);
 	auto score = ScoreText(file.c_str());
+	setCiphertext(newCiphertext, score);
+	pairScoring = usePairs && canScorePairs();
+	size_t batchSize = batch > 1 ? batch : 1;
 
-	string decrypted, testKey;
+	PlayfairKey currentKey = makeKey(bestKey);
+	vector<PlayfairKey> testKeys(batchSize);
+	vector<double> testScores(batchSize);
+	vector<unsigned char> decrypted(cipherIdx.size() * batchSize);	// reusable decryption buffer, one text per key
 	double currentScore, probability;
 	double deltaFitness = 0.0;
 	
@@ -37,35 +85,40 @@ const char* PlayfairCrack::crack(const char* newCiphertext, int iterations,
 	// simulated annealing allows possibly bad keys to be kept in order to overcome local maximum
 	for (float currentTemp = temp; currentTemp >= 0; currentTemp -= step)
 	{
-		for (int count{ 0 }; count < iterations; count++)
+		for (int count{ 0 }; count < iterations; count += static_cast<int>(batchSize))
 		{
-			// modify key
-			testKey = bestKey;
-			modifyKey(testKey);
+			// modify key, a batch of keys all from the current one
+			for (auto& testKey : testKeys)
+			{
+				testKey = currentKey;
+				modifyKey(testKey, rng);
+			}
 
-			// decrypt and score
-			decrypted = playfairDecrypt(testKey);
-			currentScore = score.checkFitness(decrypted);
+			// decrypt and score them together, then only the best of the batch is up for keeping
+			scoreKeys(testKeys.data(), batchSize, score, decrypted.data(), testScores.data(), cache);
+			size_t best = max_element(testScores.begin(), testScores.end()) - testScores.begin();
+			currentScore = testScores[best];
 			deltaFitness = currentScore - maxFitness;
 
 			// if the key is better, keep it
 			if (deltaFitness >= 0)
 			{
 				maxFitness = currentScore;
-				bestKey = testKey;
+				currentKey = testKeys[best];
 			}
 			else if (currentTemp > 0)
 			{	// when the key is worse, use e^(dT/T) to get the probability of the key being kept
 				// a fudge factor closer to 1 will keep less bad keys and generally require less iterations
 				probability = exp(deltaFitness / currentTemp) - fudgeFactor;
-				if (probability > 1.0 * rand() / RAND_MAX)
+				if (probability > chance(rng))
 				{
 					maxFitness = currentScore;
-					bestKey = testKey;
+					currentKey = testKeys[best];
 				}
 			}
 		}
 		// once our score hits the threshold, we are done
+		bestKey = keyString(currentKey);
 		cout << '\r' << bestKey << '\t' << maxFitness;
 		if (maxFitness > threshold)
 		{
@@ -73,110 +126,282 @@ const char* PlayfairCrack::crack(const char* newCiphertext, int iterations,
 		}
 	}
 	cout << endl;
-	const char* deciphered = decrypted.c_str();
-	return deciphered;
+	cacheHits = cache.hits;
+	cacheMisses = cache.misses;
+	return playfairDecrypt(bestKey);
+}
+
+void PlayfairCrack::setCiphertext(const char* newCiphertext, const ScoreText& score)
+{	// convert to ngram alphabet indexes once, 'J' is 'I' and anything else outside the alphabet is dropped
+	ciphertext = string(newCiphertext);
+	alphabet = score.getAlphabet();
+	fillerQ = static_cast<unsigned char>(alphabet.find('Q'));
+	cipherIdx.clear();
+	for (char ch : ciphertext)
+	{
+		ch = static_cast<char>(toupper(static_cast<unsigned char>(ch)));
+		if (ch == 'J')
+			ch = 'I';
+		size_t idx = alphabet.find(ch);
+		if (idx != string::npos && isalpha(static_cast<unsigned char>(ch)))
+			cipherIdx.push_back(static_cast<unsigned char>(idx));
+	}
+	if (cipherIdx.size() % 2 != 0)	// a dangling letter has no digram
+		cipherIdx.pop_back();
+
+	// count each pair of neighbouring digrams, a key decrypts every digram on its own so the
+	// digram-aligned ngrams of the plaintext only depend on which pairs occur and how often
+	vector<int> slots(625, -1);
+	vector<int> pairSlots(625 * 625, -1);
+	cipherDigrams.clear();
+	digramPairs.clear();
+	for (size_t idx{ 0 }; idx < cipherIdx.size(); idx += 2)
+	{
+		int& slot = slots[cipherIdx[idx] * 25 + cipherIdx[idx + 1]];
+		if (slot < 0)
+		{
+			slot = static_cast<int>(cipherDigrams.size() / 2);
+			cipherDigrams.push_back(cipherIdx[idx]);
+			cipherDigrams.push_back(cipherIdx[idx + 1]);
+		}
+	}
+	for (size_t idx{ 2 }; idx < cipherIdx.size(); idx += 2)
+	{
+		int first = slots[cipherIdx[idx - 2] * 25 + cipherIdx[idx - 1]];
+		int second = slots[cipherIdx[idx] * 25 + cipherIdx[idx + 1]];
+		int& pairSlot = pairSlots[first * 625 + second];
+		if (pairSlot < 0)
+		{
+			pairSlot = static_cast<int>(digramPairs.size());
+			digramPairs.push_back({ static_cast<unsigned short>(first), static_cast<unsigned short>(second), 0 });
+		}
+		digramPairs[pairSlot].count++;
+	}
+	// pairs that start with the same digram look up ngrams close to each other
+	sort(digramPairs.begin(), digramPairs.end(), [](const DigramPair& a, const DigramPair& b)
+		{ return a.first != b.first ? a.first < b.first : a.second < b.second; });
+
+	// a pair is 4 letters, only ngrams that fit and start in the first digram belong to it
+	size_t ngramLength = score.getNgramLength();
+	pairOffsets = ngramLength <= 4 ? min(static_cast<size_t>(2), 5 - ngramLength) : 0;
+	pairNgrams = static_cast<double>(pairOffsets * (cipherIdx.size() / 2 - (cipherIdx.empty() ? 0 : 1)));
+}
+
+PlayfairKey PlayfairCrack::makeKey(const string& key) const
+{
+	PlayfairKey compiled{};
+	for (int cell{ 0 }; cell < 25; cell++)
+	{
+		compiled.grid[cell] = static_cast<unsigned char>(alphabet.find(key[cell]));
+		compiled.position[compiled.grid[cell]] = static_cast<unsigned char>(cell);
+	}
+	return compiled;
+}
+
+string PlayfairCrack::keyString(const PlayfairKey& key) const
+{
+	string text(25, ' ');
+	for (int cell{ 0 }; cell < 25; cell++)
+		text[cell] = alphabet[key.grid[cell]];
+	return text;
+}
+
+size_t PlayfairCrack::playfairDecrypt(const PlayfairKey& key, unsigned char* plaintext) const
+{	// same playfair decrypt as in python, two lookups per digram into a buffer the caller owns
+	const unsigned char* cipher = cipherIdx.data();
+	for (size_t idx{ 0 }; idx < cipherIdx.size(); idx += 2)
+	{
+		const unsigned char* cells = decryptCells.cells[key.position[cipher[idx]]][key.position[cipher[idx + 1]]];
+		plaintext[idx] = key.grid[cells[0]];
+		plaintext[idx + 1] = key.grid[cells[1]];
+	}
+	return removeQs(plaintext, cipherIdx.size());
+}
+
+void PlayfairCrack::playfairDecrypt(const PlayfairKey* const* keys, size_t count, unsigned char* plaintext,
+	                                size_t* lengths) const
+{	// decrypt several keys in one pass, each cipher digram is read once for all of them and
+	// key k writes its text at plaintext + k * textLength()
+	const unsigned char* cipher = cipherIdx.data();
+	size_t length = cipherIdx.size();
+	for (size_t idx{ 0 }; idx < length; idx += 2)
+	{
+		unsigned char first = cipher[idx];
+		unsigned char second = cipher[idx + 1];
+		unsigned char* out = plaintext + idx;
+		for (size_t k{ 0 }; k < count; k++, out += length)
+		{
+			const unsigned char* cells = decryptCells.cells[keys[k]->position[first]][keys[k]->position[second]];
+			out[0] = keys[k]->grid[cells[0]];
+			out[1] = keys[k]->grid[cells[1]];
+		}
+	}
+	for (size_t k{ 0 }; k < count; k++)
+		lengths[k] = removeQs(plaintext + k * length, length);
 }
 
 string PlayfairCrack::playfairDecrypt(string& key) const
-{	// same playfair decrypt as in python, yet a bit more optimized
-	size_t delta_col;
-	size_t idxA, idxB;
-	size_t rowA, rowB;
-	size_t colA, colB;
-	string decrypted{ "" };
-
-	for (size_t idx{ 0 }; idx < ciphertext.length(); idx += 2)
+{	// readable version of the above
+	vector<unsigned char> plaintext(cipherIdx.size());
+	size_t length = playfairDecrypt(makeKey(key), plaintext.data());
+	string decrypted(length, ' ');
+	for (size_t idx{ 0 }; idx < length; idx++)
+		decrypted[idx] = alphabet[plaintext[idx]];
+	return decrypted;
+}
+
+double PlayfairCrack::scoreKey(const PlayfairKey& key, const ScoreText& score, unsigned char* plaintext) const
+{	// fitness of a key, plaintext is a buffer of textLength() the caller owns
+	if (pairScoring)
+		return pairFitness(key, score);
+	return score.checkIndexFitness(plaintext, playfairDecrypt(key, plaintext));
+}
+
+double PlayfairCrack::scoreKey(const PlayfairKey& key, const ScoreText& score, unsigned char* plaintext,
+	                           FitnessCache& cache) const
+{	// annealing keeps proposing the same few keys once it settles, only score the ones it has not seen lately
+	PackedKey packed(key.grid, 25);
+	double fitness;
+	if (!cache.find(packed, fitness))
+	{
+		fitness = scoreKey(key, score, plaintext);
+		cache.insert(packed, fitness);
+	}
+	return fitness;
+}
+
+double PlayfairCrack::pairFitness(const PlayfairKey& key, const ScoreText& score) const
+{	// decrypt every distinct digram once, then score each distinct pair once times its count, the cost
+	// depends on the pairs and not the length of the text (the filler 'Q's are scored as they are). Only the
+	// quadgrams that start on a digram are seen, so it is not checkIndexFitness: English scores about 0.5 higher
+	if (pairNgrams == 0)
+		return 0;
+	unsigned int plainDigrams[625];		// two letters as 5 bits each, like the ngram indexes
+	for (size_t idx{ 0 }; idx < cipherDigrams.size(); idx += 2)
+	{
+		const unsigned char* cells = decryptCells.cells[key.position[cipherDigrams[idx]]][key.position[cipherDigrams[idx + 1]]];
+		plainDigrams[idx / 2] = (key.grid[cells[0]] << 5) + key.grid[cells[1]];
+	}
+
+	// the 4 letters of a pair as one 20 bit index, each ngram is a shift and a mask away
+	unsigned int ngramLength = static_cast<unsigned int>(score.getNgramLength());
+	unsigned int mask = (1u << (5 * ngramLength)) - 1;
+	unsigned long long fitness{ 0 };
+	for (size_t offset{ 0 }; offset < pairOffsets; offset++)
 	{
-		idxA = key.find(ciphertext[idx]);
-		idxB = key.find(ciphertext[idx + 1]);
-		rowA = idxA / 5;
-		rowB = idxB / 5;
-		colA = idxA % 5;
-		colB = idxB % 5;
-
-		if (colA == colB)
+		unsigned int shift = 5 * (4 - ngramLength - static_cast<unsigned int>(offset));
+		for (const DigramPair& pair : digramPairs)
 		{
-			decrypted += key[((5 + (rowA - 1)) % 5) * 5 + colA];
-			decrypted += key[((5 + (rowB - 1)) % 5) * 5 + colB];
+			unsigned int letters = (plainDigrams[pair.first] << 10) + plainDigrams[pair.second];
+			fitness += static_cast<unsigned long long>(pair.count) * score.indexScore((letters >> shift) & mask);
 		}
-		else if (rowA == rowB)
+	}
+	return fitness / pairNgrams / 10;
+}
+
+void PlayfairCrack::scoreKeys(const PlayfairKey* keys, size_t count, const ScoreText& score, unsigned char* plaintext,
+	                          double* fitness, FitnessCache& cache) const
+{	// batch version of scoreKey, the keys the cache does not have are decrypted together
+	const PlayfairKey* missed[64];
+	size_t missedIdx[64];
+	size_t lengths[64];
+	for (size_t first{ 0 }; first < count; first += 64)
+	{
+		size_t last = min(count, first + 64);
+		size_t misses{ 0 };
+		for (size_t k{ first }; k < last; k++)
 		{
-			decrypted += key[rowA * 5 + (5 + (colA - 1)) % 5];
-			decrypted += key[rowB * 5 + (5 + (colB - 1)) % 5];
+			if (!cache.find(PackedKey(keys[k].grid, 25), fitness[k]))
+			{
+				missed[misses] = &keys[k];
+				missedIdx[misses++] = k;
+			}
+		}
+		if (misses == 0)
+			continue;
+
+		if (pairScoring)
+		{
+			for (size_t m{ 0 }; m < misses; m++)
+				fitness[missedIdx[m]] = pairFitness(*missed[m], score);
 		}
 		else
 		{
-			delta_col = colA - colB;
-			decrypted += key[rowA * 5 + (colA - delta_col)];
-			decrypted += key[rowB * 5 + (colB + delta_col)];
+			playfairDecrypt(missed, misses, plaintext, lengths);
+			for (size_t m{ 0 }; m < misses; m++)
+				fitness[missedIdx[m]] = score.checkIndexFitness(plaintext + m * cipherIdx.size(), lengths[m]);
 		}
+		for (size_t m{ 0 }; m < misses; m++)
+			cache.insert(PackedKey(missed[m]->grid, 25), fitness[missedIdx[m]]);
 	}
-	removeQs(decrypted);
-	return decrypted;
 }
 
 // key modifiers
-void PlayfairCrack::exchange2letters(string& key) const
+void PlayfairCrack::exchange2letters(PlayfairKey& key, mt19937& rng) const
 {
-	int randomChar1{ rand() % 25 };
-	int randomChar2{ rand() % 25 };
-	swap(key[randomChar1], key[randomChar2]);
+	uniform_int_distribution<int> cell(0, 24);
+	int randomChar1{ cell(rng) };
+	int randomChar2{ cell(rng) };
+	key.swapCells(randomChar1, randomChar2);
 }
 
-void PlayfairCrack::swap2rows(string& key) const
+void PlayfairCrack::swap2rows(PlayfairKey& key, mt19937& rng) const
 {
-	int randomRow1{ rand() % 5 };
-	int randomRow2{ rand() % 5 };
-	for (size_t idx{ 0 }; idx < 5; idx += 1)
+	uniform_int_distribution<int> row(0, 4);
+	int randomRow1{ row(rng) };
+	int randomRow2{ row(rng) };
+	for (int idx{ 0 }; idx < 5; idx += 1)
 	{
-		swap(key[randomRow1 * 5 + idx], key[randomRow2 * 5 + idx]);
+		key.swapCells(randomRow1 * 5 + idx, randomRow2 * 5 + idx);
 	}
 }
 
-void PlayfairCrack::swap2cols(string& key) const
+void PlayfairCrack::swap2cols(PlayfairKey& key, mt19937& rng) const
 {
-	int randomCol1{ rand() % 5 };
-	int randomCol2{ rand() % 5 };
-	for (size_t idx{ 0 }; idx < 5; idx += 1)
+	uniform_int_distribution<int> col(0, 4);
+	int randomCol1{ col(rng) };
+	int randomCol2{ col(rng) };
+	for (int idx{ 0 }; idx < 5; idx += 1)
 	{
-		swap(key[idx * 5 + randomCol1], key[idx * 5 + randomCol2]);
+		key.swapCells(idx * 5 + randomCol1, idx * 5 + randomCol2);
 	}
 }
 
-void PlayfairCrack::swapAllCols(string& key) const
+void PlayfairCrack::swapAllCols(PlayfairKey& key) const
 {
-	for (size_t idx{ 0 }; idx < 5; idx += 1)
+	for (int idx{ 0 }; idx < 5; idx += 1)
 	{
-		swap(key[idx * 5], key[idx * 5 + 4]);
+		key.swapCells(idx * 5, idx * 5 + 4);
 	}
-	for (size_t idx{ 0 }; idx < 5; idx += 1)
+	for (int idx{ 0 }; idx < 5; idx += 1)
 	{
-		swap(key[idx * 5 + 1], key[idx * 5 + 3]);
+		key.swapCells(idx * 5 + 1, idx * 5 + 3);
 	}
 }
 
-void PlayfairCrack::swapAllRows(string& key) const
+void PlayfairCrack::swapAllRows(PlayfairKey& key) const
 {
-	for (size_t idx{ 0 }; idx < 5; idx += 1)
+	for (int idx{ 0 }; idx < 5; idx += 1)
 	{
-		swap(key[idx], key[4 * 5 + idx]);
+		key.swapCells(idx, 4 * 5 + idx);
 	}
-	for (size_t idx{ 0 }; idx < 5; idx += 1)
+	for (int idx{ 0 }; idx < 5; idx += 1)
 	{
-		swap(key[5 + idx], key[3 * 5 + idx]);
+		key.swapCells(5 + idx, 3 * 5 + idx);
 	}
 }
 
-void PlayfairCrack::modifyKey(string& key) const
+void PlayfairCrack::modifyKey(PlayfairKey& key, mt19937& rng) const
 {
-	int choice = rand() % 50;
+	uniform_int_distribution<int> modifier(0, 49);
+	int choice = modifier(rng);
 	switch (choice) 
 	{
 	case 0: 
-		swap2rows(key); 
+		swap2rows(key, rng); 
 		break;
 	case 1: 
-		swap2cols(key);
+		swap2cols(key, rng);
 		break;
 	case 2:
 		swapAllCols(key);
@@ -189,100 +414,130 @@ void PlayfairCrack::modifyKey(string& key) const
 		swapAllRows(key);
 		break;
 	default:
-		exchange2letters(key);
+		exchange2letters(key, rng);
 	}
 }
 
-void PlayfairCrack::removeQs(string& plaintext) const
-{
-	for (size_t idx{ 1 }; idx < plaintext.length() - 1; idx += 1)
+size_t PlayfairCrack::removeQs(unsigned char* plaintext, size_t length) const
+{	// drop a 'Q' between two equal letters in one pass, the letter after a dropped 'Q' is never
+	// checked itself (same as erasing in place and moving on)
+	if (length < 3)
+		return length;
+	size_t write{ 1 };
+	size_t read{ 1 };
+	for (; read < length - 1; read++)
 	{
-		if (toupper(plaintext[idx]) == 'Q')
-		{
-			if (plaintext[idx - 1] == plaintext[idx + 1])
-				plaintext.erase(idx, 1);
-		}
+		if (plaintext[read] == fillerQ && plaintext[write - 1] == plaintext[read + 1])
+			plaintext[write++] = plaintext[++read];
+		else
+			plaintext[write++] = plaintext[read];
 	}
+	while (read < length)
+		plaintext[write++] = plaintext[read++];
+	return write;
 }
 
 // multithreaded thread worker
-void mt_c_crack_Thread(PlayfairCrack& cracker, mutex& mtx, int iterations, float temp,
-	                   float step, float fudgeFactor, float threshold)
+void mt_c_crack_Thread(PlayfairCrack& cracker, const ScoreText& score, mutex& mtx, atomic<bool>& done,
+	                   PlayfairKey& sharedKey, unsigned int seed, int exchange, int cacheSize, int iterations,
+	                   float temp, float step, float fudgeFactor, float threshold)
 {
-	// give a score object to each thread
-	auto score = ScoreText(cracker.file.c_str());
-
-	string decrypted, testKey;
-	double currentScore, probability;
-	double deltaFitness = 0.0;
+	// give a decryption buffer, a random generator, a fitness cache and a chain to each thread
+	vector<unsigned char> decrypted(cracker.textLength());
+	mt19937 rng(seed);
+	FitnessCache cache(cacheSize);
+	uniform_real_distribution<double> chance(0.0, 1.0);
+	mtx.lock();
+	PlayfairKey currentKey = sharedKey;
+	mtx.unlock();
+	PlayfairKey testKey, localBestKey = currentKey;
+	double currentFitness = cracker.scoreKey(currentKey, score, decrypted.data());
+	double localMaxFitness = currentFitness;
+	double testFitness, deltaFitness;
+	int temperatureSteps{ 0 };
 
-	// normal simmulated annealing, yet with locks
-	for (float currentTemp = temp; currentTemp >= 0; currentTemp -= step)
+	// same annealing as the single threaded crack, nothing is shared until the temperature drops
+	for (float currentTemp = temp; currentTemp >= 0 && !done; currentTemp -= step)
 	{
-		for (int count{ 0 }; count < iterations; count++)
-		{	// mutex lock sucks (it locks all threads, not just the data member) but it is easy and works for what we're doing
-			mtx.lock();
-			testKey = cracker.bestKey;
-			mtx.unlock();
-			cracker.modifyKey(testKey);
-			decrypted = cracker.playfairDecrypt(testKey);
-			currentScore = score.checkFitness(decrypted);
-			mtx.lock();
-			deltaFitness = currentScore - cracker.maxFitness;
-			mtx.unlock();
-			if (deltaFitness >= 0)
-			{
-				mtx.lock();
-				cracker.maxFitness = currentScore;
-				cracker.bestKey = testKey;
-				mtx.unlock();
-			}
-			else if (currentTemp > 0)
+		for (int count{ 0 }; count < iterations && !done; count++)
+		{
+			testKey = currentKey;
+			cracker.modifyKey(testKey, rng);
+			testFitness = cracker.scoreKey(testKey, score, decrypted.data(), cache);
+			deltaFitness = testFitness - currentFitness;
+			if (deltaFitness >= 0 || (currentTemp > 0 && exp(deltaFitness / currentTemp) - fudgeFactor > chance(rng)))
 			{
-				probability = exp(deltaFitness / currentTemp) - fudgeFactor;
-				if (probability > 1.0 * rand() / RAND_MAX)
+				currentKey = testKey;
+				currentFitness = testFitness;
+				if (currentFitness > localMaxFitness)
 				{
-					mtx.lock();
-					cracker.maxFitness = currentScore;
-					cracker.bestKey = testKey;
-					mtx.unlock();
+					localMaxFitness = currentFitness;
+					localBestKey = currentKey;
 				}
 			}
 		}
+
+		// publish this chain's best, and every few temperatures move a chain that fell behind onto the best key
 		mtx.lock();
-		cout << '\r' << cracker.bestKey << '\t' << cracker.maxFitness;
+		if (localMaxFitness > cracker.maxFitness)
+		{
+			cracker.maxFitness = localMaxFitness;
+			sharedKey = localBestKey;
+			cout << '\r' << cracker.keyString(sharedKey) << '\t' << cracker.maxFitness;
+		}
 		if (cracker.maxFitness > threshold)
+			done = true;
+		else if (exchange > 0 && ++temperatureSteps % exchange == 0 && cracker.maxFitness > currentFitness)
 		{
-			mtx.unlock();
-			break;
+			currentKey = sharedKey;
+			currentFitness = cracker.maxFitness;
 		}
 		mtx.unlock();
 	}
+	mtx.lock();
+	cracker.cacheHits += cache.hits;
+	cracker.cacheMisses += cache.misses;
+	mtx.unlock();
 }
 
-const char* mt_c_crack(PlayfairCrack& cracker, const char* newCiphertext, int iterations = 5000, float temp = 30.0,
-	float step = 0.2, float fudgeFactor = 0.75, float threshold = 95)
+string mt_c_crack(PlayfairCrack& cracker, const char* newCiphertext, int iterations = 5000, float temp = 30.0,
+	float step = 0.2, float fudgeFactor = 0.75, float threshold = 95, int exchange = 10, int numThreads = 10,
+	bool usePairs = false, int cacheSize = 4096)
 {
+#ifndef NOPYTHON
 	// take control over the python interpreter lock
 	py::gil_scoped_release release;
+#endif
 	mutex mtx;	// shared lock
+	atomic<bool> done{ false };
 	vector<thread> threads;
-	cracker.ciphertext = string(newCiphertext);
-	srand(static_cast<unsigned int>(time(0)));	// make sure seed is new
+	auto score = ScoreText(cracker.file.c_str());	// read only, every thread can share it
+	cracker.setCiphertext(newCiphertext, score);
+	cracker.pairScoring = usePairs && cracker.canScorePairs();
+	PlayfairKey sharedKey = cracker.makeKey(cracker.bestKey);
+	vector<unsigned char> decrypted(cracker.textLength());
+	cracker.maxFitness = cracker.scoreKey(sharedKey, score, decrypted.data());
+	cracker.cacheHits = 0;
+	cracker.cacheMisses = 0;
+
+	// more chains find the key more often even when they share cores, 0 is one chain per core
+	size_t threadCount = numThreads > 0 ? numThreads : thread::hardware_concurrency();
+	if (threadCount == 0)
+		threadCount = 1;
 
-	// create 10 threads
-	for (size_t i{ 0 }; i < 10; i++)
+	random_device rd;
+	for (size_t i{ 0 }; i < threadCount; i++)
 	{
-		threads.push_back(thread(mt_c_crack_Thread, ref(cracker), ref(mtx), iterations, temp, step, fudgeFactor, threshold));
+		threads.push_back(thread(mt_c_crack_Thread, ref(cracker), cref(score), ref(mtx), ref(done), ref(sharedKey),
+			rd(), exchange, cacheSize, iterations, temp, step, fudgeFactor, threshold));
 	}
 	for (auto& current_thread : threads)
 	{	// wait for threads
 		current_thread.join();
 	}
 	cout << endl;
-	py::gil_scoped_acquire aquire;	// give lock back to interpreter
-	const char* decrypted = cracker.playfairDecrypt(cracker.bestKey).c_str();	// convert to c string to allow happiness with C
-	return decrypted;
+	cracker.bestKey = cracker.keyString(sharedKey);
+	return cracker.playfairDecrypt(cracker.bestKey);
 }
 
 #ifndef __cplusplus
@@ -301,19 +556,36 @@ extern "C"
 // generate python bindings
 PYBIND11_MODULE(cryptanalysis, m)
 {
-	m.doc() = "C Code for cracking a given ciphertext (playfair/substitution).";
+	m.doc() = "C Code for cracking a given ciphertext (playfair/substitution/vigenere/enigma).";
 	// const char* newCiphertext, int iterations, 
 	// float temp, float step, float fudgeFactor, float threshold
 	py::class_<PlayfairCrack>(m, "PlayfairCrack")
 		.def(py::init<const char*>())
 		.def("c_crack", &PlayfairCrack::crack, "single threaded crack method",
-			py::arg("ciphertext"), py::arg("iterations") = 50000, py::arg("temp") = 30, py::arg("step") = 0.2, py::arg("fudge") = 0.5, py::arg("threshold") = 95)
+			py::arg("ciphertext"), py::arg("iterations") = 50000, py::arg("temp") = 30, py::arg("step") = 0.2, py::arg("fudge") = 0.5, py::arg("threshold") = 95, py::arg("pair_scoring") = false, py::arg("cache_size") = 4096, py::arg("batch") = 1)
+		.def_readonly("cache_hits", &PlayfairCrack::cacheHits)
+		.def_readonly("cache_misses", &PlayfairCrack::cacheMisses)
 		;
 
 	py::class_<SubstitutionCrack>(m, "SubstitutionCrack")
 		.def(py::init<const char*>())
 		.def("c_crack", &SubstitutionCrack::crack, "single threaded crack method",
-			py::arg("ciphertext"), py::arg("iterations") = 2000, py::arg("threshold") = 3)
+			py::arg("ciphertext"), py::arg("iterations") = 2000, py::arg("threshold") = 3, py::arg("cache_size") = 4096)
+		.def_readonly("cache_hits", &SubstitutionCrack::cacheHits)
+		.def_readonly("cache_misses", &SubstitutionCrack::cacheMisses)
+		;
+
+	py::class_<VigenereCrack>(m, "VigenereCrack")
+		.def(py::init<const char*>())
+		.def("c_crack", &VigenereCrack::crack, "single threaded crack method",
+			py::arg("ciphertext"), py::arg("seed_key"), py::arg("iterations") = 2000, py::arg("temp") = 10, py::arg("step") = 0.5, py::arg("threshold") = 95)
+		.def_readonly("best_key", &VigenereCrack::bestKey)
+		.def_readonly("max_fitness", &VigenereCrack::maxFitness)
+		;
+
+	py::class_<EnigmaCrack>(m, "EnigmaCrack")
+		.def(py::init<const char*>())
+		.def_readonly("max_fitness", &EnigmaCrack::maxFitness)
 		;
 
 	py::class_<ScoreText>(m, "ScoreText")
@@ -322,7 +594,25 @@ PYBIND11_MODULE(cryptanalysis, m)
 			py::arg("text"));
 
 	m.def("mt_c_crack", &mt_c_crack,
-		py::arg("crackobj"), py::arg("ciphertext"), py::arg("iterations") = 3000, py::arg("temp") = 30, py::arg("step") = 0.2, py::arg("fudge") = 0.75, py::arg("threshold") = 95);
+		py::arg("crackobj"), py::arg("ciphertext"), py::arg("iterations") = 3000, py::arg("temp") = 30, py::arg("step") = 0.2, py::arg("fudge") = 0.75, py::arg("threshold") = 95, py::arg("exchange") = 10, py::arg("threads") = 10, py::arg("pair_scoring") = false, py::arg("cache_size") = 4096);
+
+	m.def("mt_c_crack_vigenere", &mt_c_crack_vigenere,
+		py::arg("crackobj"), py::arg("ciphertext"), py::arg("seed_keys"), py::arg("iterations") = 2000, py::arg("temp") = 10, py::arg("step") = 0.5, py::arg("threshold") = 95, py::arg("threads") = 0, py::arg("epsilon") = 2);
+
+	m.def("mt_c_brute_force_vigenere", &mt_c_brute_force_vigenere,
+		py::arg("crackobj"), py::arg("ciphertext"), py::arg("max_key_length") = 5, py::arg("top") = 10, py::arg("prefix_length") = 80, py::arg("threads") = 0);
+
+	m.def("mt_c_crack_enigma", &mt_c_crack_enigma,
+		py::arg("crackobj"), py::arg("message"), py::arg("ngram_scoring") = false, py::arg("threads") = 0);
+
+	m.def("mt_c_crack_enigma_plugboard", &mt_c_crack_enigma_plugboard,
+		py::arg("crackobj"), py::arg("message"), py::arg("bigram_file"), py::arg("trigram_file"), py::arg("candidates") = 100, py::arg("max_plugs") = 10, py::arg("threads") = 0);
+
+	m.def("mt_c_crack_enigma_rings", &mt_c_crack_enigma_rings,
+		py::arg("crackobj"), py::arg("message"), py::arg("candidates") = 100, py::arg("window") = 52, py::arg("threads") = 0);
+
+	m.def("mt_c_bombe_enigma", &mt_c_bombe_enigma,
+		py::arg("crackobj"), py::arg("message"), py::arg("crib"), py::arg("offset") = -1, py::arg("max_stops") = 100, py::arg("threads") = 0);
 }
 #endif
 
@@ -69,6 +69,32 @@ double ScoreText::checkFitness(string& text) const
     return fitness / numCounted / 10;
 }
 
+double ScoreText::checkIndexFitness(const unsigned char* indexes, size_t length) const
+{   // same as checkFitness, but the text has already been cleaned and converted to alphabet indexes
+    // so hot loops can score a reusable buffer without building strings
+    double fitness{ 0 };
+    unsigned int ngramIdx{ 0 };
+    if (length < ngramLength)
+        return 0;
+
+    for (size_t idx{ 0 }; idx < ngramLength - 1; idx++)
+    {
+        ngramIdx = (ngramIdx << 5) + indexes[idx];
+    }
+
+    for (size_t idx{ ngramLength - 1 }; idx < length; idx++)
+    {
+        ngramIdx = ((ngramIdx & bitmask) << 5) + indexes[idx];
+        fitness += ngrams[ngramIdx];
+    }
+    return fitness / (length - ngramLength + 1) / 10;
+}
+
+size_t ScoreText::getNgramLength() const
+{
+    return ngramLength;
+}
+
 string ScoreText::getAlphabet() const
 {
     return defaultAlphabet;
@@ -7,6 +7,7 @@
 #include <algorithm>
 #include "include/rriccio/substitution.h"
 #include "include/rriccio/scoreText.h"
+#include "include/rriccio/fitnessCache.h"
 
 using namespace std;
 
@@ -16,9 +17,11 @@ SubstitutionCrack::SubstitutionCrack(const char* filename)
 	file = string(filename);
 }
 
-const char* SubstitutionCrack::crack(const char* newCiphertext, int iterations, int threshold)
+string SubstitutionCrack::crack(const char* newCiphertext, int iterations, int threshold, int cacheSize)
 {
 	auto score = ScoreText(file.c_str());
+	// restarts often climb back to a local maximum they already found, keys too long to pack are not cached
+	FitnessCache cache(score.getAlphabet().length() <= PackedKey::maxLetters ? cacheSize : 0);
 	string tmpText = "";
 	ciphertext = newCiphertext;
 	alphabet = score.getAlphabet();
@@ -50,7 +53,7 @@ const char* SubstitutionCrack::crack(const char* newCiphertext, int iterations,
 	for (int i{ 0 }; i < iterations; i++)
 	{	// shuffle the key and check the fitness
 		std::shuffle(std::begin(currentKey), std::end(currentKey), rng);
-		currentFitness = hillClimb(currentKey, score);
+		currentFitness = hillClimb(currentKey, score, cache);
 		// keep only better kets
 		if (currentFitness > maxFitness)
 		{
@@ -83,20 +86,26 @@ const char* SubstitutionCrack::crack(const char* newCiphertext, int iterations,
 				decryptString += charValues.at(i);
 		}
 	}
-	const char* cDecrypted = decryptString.c_str();
-	return cDecrypted;
+	cacheHits = cache.hits;
+	cacheMisses = cache.misses;
+	return decryptString;
 }
 
-double SubstitutionCrack::hillClimb(vector<int>& key, ScoreText& score)
+double SubstitutionCrack::hillClimb(vector<int>& key, ScoreText& score, FitnessCache& cache)
 {
+	// a cipher letter decrypts to its position in the key, the same as the swaps below and the final decrypt
 	vector<int> plaintext;
 	vector<int> curVec;
+	vector<int> inverse(key.size());
+	for (int i{ 0 }; i < key.size(); i++)
+		inverse[key[i]] = i;
 	for (auto idx : cipherBin)
-		plaintext.push_back(key[idx]);
+		plaintext.push_back(inverse[idx]);
 
 	double localMaxFitness{ 0 };
 	double currentFitness{ 0 };
 	string plainString;
+	vector<unsigned char> swapped(key.begin(), key.end());
 	bool betterKey = true;
 	int ch1, ch2;
 	while (betterKey)
@@ -118,14 +127,22 @@ double SubstitutionCrack::hillClimb(vector<int>& key, ScoreText& score)
 				for (auto& idx : curVec)
 					plaintext[idx] = i;
 
-				// convert back to plaintext
-				plainString = "";
-				for (auto& idx : plaintext)
-				{
-					plainString += charValues.at(idx);
+				// score the swapped key, unless it was already scored
+				for (int k{ 0 }; k < key.size(); k++)
+					swapped[k] = static_cast<unsigned char>(key[k]);
+				swap(swapped[i], swapped[j]);
+				PackedKey packed(swapped.data(), swapped.size());
+				if (!cache.find(packed, currentFitness))
+				{	// convert back to plaintext
+					plainString = "";
+					for (auto& idx : plaintext)
+					{
+						plainString += charValues.at(idx);
+					}
+					// score
+					currentFitness = score.checkFitness(plainString);
+					cache.insert(packed, currentFitness);
 				}
-				// score
-				currentFitness = score.checkFitness(plainString);
 				
 				// if swap was better, swap in the key and try again
 				if (currentFitness > localMaxFitness)
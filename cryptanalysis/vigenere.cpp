@@ -0,0 +1,412 @@
+#include <string>
+#include <vector>
+#include <cmath>
+#include <random>
+#include <mutex>
+#include <atomic>
+#include <thread>
+#include <queue>
+#include <algorithm>
+#include <cstdint>
+#include <stdexcept>
+#include "include/rriccio/vigenere.h"
+#include "include/rriccio/scoreText.h"
+
+#ifndef NOPYTHON
+#include <pybind11/pybind11.h>
+namespace py = pybind11;
+#endif
+
+using namespace std;
+
+// only A-Z (either case) are shifted, like Caesar._words_to_ordinals for ascii text
+static bool isLetter(unsigned char ch)
+{
+	return (ch >= 'A' && ch <= 'Z') || (ch >= 'a' && ch <= 'z');
+}
+
+VigenereCrack::VigenereCrack(const char* ngramsFile)
+{	// get file as string
+	file = string(ngramsFile);
+}
+
+void VigenereCrack::setCiphertext(const char* newCiphertext)
+{	// drop only the spaces like Vigenere.decrypt, every other character (punctuation, digits) still uses
+	// up a key letter, but only the letters are shifted and scored
+	ciphertext = "";
+	letters.clear();
+	offsets.clear();
+	positions.clear();
+	size_t position{ 0 };
+	for (const char* ch = newCiphertext; *ch != '\0'; ch++)
+	{
+		unsigned char current = static_cast<unsigned char>(*ch);
+		if (current == ' ')
+			continue;
+		if (isLetter(current))
+		{
+			current = static_cast<unsigned char>(toupper(current));
+			letters.push_back(static_cast<unsigned char>(current - 'A'));
+			offsets.push_back(ciphertext.length());
+			positions.push_back(position);
+		}
+		if ((current & 0xC0) != 0x80)	// python counts a utf-8 character once, not once per byte
+			position++;
+		ciphertext += static_cast<char>(current);
+	}
+}
+
+string VigenereCrack::crack(const char* newCiphertext, const char* seedKey, int iterations,
+	                        float temp, float step, float threshold)
+{	// single threaded crack starting from one seed key
+	setCiphertext(newCiphertext);
+	auto score = ScoreText(file.c_str());
+	mt19937 rng(random_device{}());
+
+	bestKey = anneal(string(seedKey), score, rng, maxFitness, iterations, temp, step, threshold);
+	return vigenereDecrypt(bestKey);
+}
+
+string VigenereCrack::anneal(const string& seedKey, const ScoreText& score, mt19937& rng, double& fitness,
+	                         int iterations, float temp, float step, float threshold) const
+{
+	string currentKey = seedKey;
+	for (auto& ch : currentKey)
+		ch = static_cast<char>(toupper(ch));
+	if (currentKey.empty() || ciphertext.empty())
+	{
+		fitness = 0;
+		return currentKey;
+	}
+
+	uniform_int_distribution<size_t> position(0, currentKey.length() - 1);
+	uniform_int_distribution<int> letter(0, 25);
+	uniform_real_distribution<double> chance(0.0, 1.0);
+
+	double currentFitness = scoreKey(currentKey, score);
+	string localBestKey = currentKey;
+	double localMaxFitness = currentFitness;
+	string testKey;
+	double testFitness, deltaFitness;
+
+	// use simulated annealing like the playfair cracker, but only ever change a single key letter
+	// since every letter of the key only controls its own column of the ciphertext
+	for (float currentTemp = temp; currentTemp >= 0 && localMaxFitness <= threshold; currentTemp -= step)
+	{
+		for (int count{ 0 }; count < iterations; count++)
+		{
+			testKey = currentKey;
+			testKey[position(rng)] = static_cast<char>('A' + letter(rng));
+			testFitness = scoreKey(testKey, score);
+			deltaFitness = testFitness - currentFitness;
+
+			// keep better keys, and worse keys with probability e^(dF/T)
+			if (deltaFitness >= 0 || (currentTemp > 0 && exp(deltaFitness / currentTemp) > chance(rng)))
+			{
+				currentKey = testKey;
+				currentFitness = testFitness;
+				if (currentFitness > localMaxFitness)
+				{
+					localMaxFitness = currentFitness;
+					localBestKey = currentKey;
+				}
+			}
+		}
+	}
+
+	// finish with a hill climb so every letter is at its local best
+	fitness = polishKey(localBestKey, score);
+	return localBestKey;
+}
+
+double VigenereCrack::polishKey(string& key, const ScoreText& score) const
+{	// try every letter in every position until no single change improves the key
+	double fitness = scoreKey(key, score);
+	double testFitness;
+	bool betterKey = true;
+	while (betterKey)
+	{
+		betterKey = false;
+		for (size_t idx{ 0 }; idx < key.length(); idx++)
+		{
+			char original = key[idx];
+			char bestLetter = original;
+			for (char ch{ 'A' }; ch <= 'Z'; ch++)
+			{
+				if (ch == original)
+					continue;
+				key[idx] = ch;
+				testFitness = scoreKey(key, score);
+				if (testFitness > fitness)
+				{
+					fitness = testFitness;
+					bestLetter = ch;
+					betterKey = true;
+				}
+			}
+			key[idx] = bestLetter;
+		}
+	}
+	return fitness;
+}
+
+double VigenereCrack::scoreKey(const string& key, const ScoreText& score) const
+{
+	string decrypted = vigenereDecrypt(key);
+	return score.checkFitness(decrypted);
+}
+
+string VigenereCrack::vigenereDecrypt(const string& key) const
+{	// shift the letters only, anything else stays as it is but still used up its key letter
+	string decrypted = ciphertext;
+	if (key.empty())
+		return decrypted;
+	for (size_t idx{ 0 }; idx < letters.size(); idx++)
+	{
+		int shift = toupper(key[positions[idx] % key.length()]) - 'A';
+		decrypted[offsets[idx]] = static_cast<char>('A' + (letters[idx] - shift + 26) % 26);
+	}
+	return decrypted;
+}
+
+// shortest key that repeats to the given key, ex. LEMONLEMON -> LEMON
+static string keyPeriod(const string& key)
+{
+	for (size_t period{ 1 }; period < key.length(); period++)
+	{
+		if (key.length() % period != 0)
+			continue;
+		bool repeated = true;
+		for (size_t i{ period }; i < key.length() && repeated; i++)
+			repeated = key[i] == key[i % period];
+		if (repeated)
+			return key.substr(0, period);
+	}
+	return key;
+}
+
+// multithreaded thread worker
+void mt_c_crack_vigenere_Thread(VigenereCrack& cracker, mutex& mtx, atomic<bool>& done,
+	                            const vector<string>& seedKeys, size_t first, size_t stride, unsigned int seed,
+	                            int iterations, float temp, float step, float threshold,
+	                            vector<pair<double, string>>& results)
+{
+	// give a score object and a random generator to each thread
+	auto score = ScoreText(cracker.file.c_str());
+	mt19937 rng(seed);
+	double fitness;
+	string key;
+
+	// each thread works on its own seeds, only the result is shared
+	for (size_t idx{ first }; idx < seedKeys.size() && !done; idx += stride)
+	{
+		key = cracker.anneal(seedKeys[idx], score, rng, fitness, iterations, temp, step, threshold);
+		mtx.lock();
+		results.push_back({ fitness, keyPeriod(key) });
+		if (fitness > cracker.maxFitness)
+			cracker.maxFitness = fitness;
+		if (cracker.maxFitness > threshold)
+			done = true;
+		mtx.unlock();
+	}
+}
+
+string mt_c_crack_vigenere(VigenereCrack& cracker, const char* newCiphertext, vector<string> seedKeys,
+	                       int iterations, float temp, float step, float threshold, int numThreads, float epsilon)
+{
+#ifndef NOPYTHON
+	// take control over the python interpreter lock
+	py::gil_scoped_release release;
+#endif
+	mutex mtx;	// shared lock
+	atomic<bool> done{ false };
+	vector<thread> threads;
+	cracker.setCiphertext(newCiphertext);
+	cracker.bestKey = seedKeys.empty() ? "" : seedKeys[0];
+	cracker.maxFitness = 0;
+
+	// use every core unless told otherwise, but never more threads than seeds
+	size_t threadCount = numThreads > 0 ? numThreads : thread::hardware_concurrency();
+	if (threadCount == 0)
+		threadCount = 1;
+	if (threadCount > seedKeys.size())
+		threadCount = seedKeys.size();
+
+	random_device rd;
+	vector<pair<double, string>> results;
+	for (size_t i{ 0 }; i < threadCount; i++)
+	{
+		threads.push_back(thread(mt_c_crack_vigenere_Thread, ref(cracker), ref(mtx), ref(done), cref(seedKeys),
+			i, threadCount, rd(), iterations, temp, step, threshold, ref(results)));
+	}
+	for (auto& current_thread : threads)
+	{	// wait for threads
+		current_thread.join();
+	}
+
+	// a key repeated to a multiple of its length always fits the text a little better (each letter
+	// has fewer letters to answer to), so take the shortest key within epsilon of the best
+	string chosenKey;
+	double chosenFitness{ 0 };
+	for (auto& [fitness, key] : results)
+	{
+		if (key.empty() || fitness < cracker.maxFitness - epsilon)
+			continue;
+		if (chosenKey.empty() || key.length() < chosenKey.length() ||
+			(key.length() == chosenKey.length() && fitness > chosenFitness))
+		{
+			chosenKey = key;
+			chosenFitness = fitness;
+		}
+	}
+	if (!chosenKey.empty())
+	{
+		cracker.bestKey = chosenKey;
+		cracker.maxFitness = chosenFitness;
+	}
+	return cracker.vigenereDecrypt(cracker.bestKey);
+}
+
+// brute force thread worker
+void mt_c_brute_force_vigenere_Thread(const ScoreText& score, const vector<unsigned char>& cipherIdx,
+	                                  const vector<size_t>& cipherPositions, int maxKeyLength, size_t topK, size_t threadNum, size_t threadCount,
+	                                  vector<pair<double, string>>& results)
+{
+	// min heap of the best keys this thread has seen, the worst of the best is on top
+	priority_queue<pair<double, string>, vector<pair<double, string>>, greater<pair<double, string>>> heap;
+	vector<unsigned char> plainIdx(cipherIdx.size());	// reusable decryption buffer
+	unsigned char shifts[32];
+	unsigned char shiftTable[26][26];	// [key shift][cipher letter] -> plain letter
+	string key;
+	double fitness;
+
+	for (int shift{ 0 }; shift < 26; shift++)
+	{
+		for (int letter{ 0 }; letter < 26; letter++)
+			shiftTable[shift][letter] = static_cast<unsigned char>((letter + 26 - shift) % 26);
+	}
+
+	for (int keyLength{ 1 }; keyLength <= maxKeyLength; keyLength++)
+	{	// split this key length's keyspace evenly between the threads
+		uint64_t keyspace{ 1 };
+		for (int i{ 0 }; i < keyLength; i++)
+			keyspace *= 26;
+		uint64_t first = keyspace * threadNum / threadCount;
+		uint64_t last = keyspace * (threadNum + 1) / threadCount;
+
+		// the letters each key letter shifts, punctuation between letters still moves the key along
+		vector<vector<size_t>> columns(keyLength);
+		for (size_t idx{ 0 }; idx < cipherIdx.size(); idx++)
+			columns[cipherPositions[idx] % keyLength].push_back(idx);
+
+		for (uint64_t keyNum{ first }; keyNum < last; keyNum++)
+		{	// keyNum in base 26 is the key
+			uint64_t remaining = keyNum;
+			for (int i{ keyLength - 1 }; i >= 0; i--)
+			{
+				shifts[i] = static_cast<unsigned char>(remaining % 26);
+				remaining /= 26;
+			}
+
+			// keys that just repeat a shorter key were already tried
+			bool repeated = false;
+			for (int period{ 1 }; period < keyLength && !repeated; period++)
+			{
+				if (keyLength % period != 0)
+					continue;
+				repeated = true;
+				for (int i{ period }; i < keyLength && repeated; i++)
+					repeated = shifts[i] == shifts[i % period];
+			}
+			if (repeated)
+				continue;
+
+			// decrypt the prefix only, one column at a time so each column is a single table row
+			for (int column{ 0 }; column < keyLength; column++)
+			{
+				const unsigned char* row = shiftTable[shifts[column]];
+				for (size_t idx : columns[column])
+					plainIdx[idx] = row[cipherIdx[idx]];
+			}
+			fitness = score.checkIndexFitness(plainIdx.data(), plainIdx.size());
+
+			// keep the top K
+			if (heap.size() < topK || (!heap.empty() && fitness > heap.top().first))
+			{
+				key.assign(keyLength, 'A');
+				for (int i{ 0 }; i < keyLength; i++)
+					key[i] = static_cast<char>('A' + shifts[i]);
+				heap.push({ fitness, key });
+				if (heap.size() > topK)
+					heap.pop();
+			}
+		}
+	}
+
+	while (!heap.empty())
+	{
+		results.push_back(heap.top());
+		heap.pop();
+	}
+}
+
+vector<tuple<double, string, string>> mt_c_brute_force_vigenere(VigenereCrack& cracker, const char* newCiphertext,
+	                                                            int maxKeyLength, int topK, int prefixLength, int numThreads)
+{
+#ifndef NOPYTHON
+	// take control over the python interpreter lock
+	py::gil_scoped_release release;
+#endif
+	// pybind turns these into ValueError
+	if (topK < 1)
+		throw invalid_argument("Top must be at least 1!");
+	if (maxKeyLength < 1)
+		throw invalid_argument("Max key length must be at least 1!");
+	if (maxKeyLength > 12)	// keep the keyspace split from overflowing 64 bits
+		throw invalid_argument("Max key length can be at most 12!");
+	auto score = ScoreText(cracker.file.c_str());
+	cracker.setCiphertext(newCiphertext);
+
+	// convert the prefix to alphabet indexes once, every thread shares it
+	size_t prefix = min(static_cast<size_t>(prefixLength), cracker.letters.size());
+	vector<unsigned char> cipherIdx(cracker.letters.begin(), cracker.letters.begin() + prefix);
+	vector<size_t> cipherPositions(cracker.positions.begin(), cracker.positions.begin() + prefix);
+
+	size_t threadCount = numThreads > 0 ? numThreads : thread::hardware_concurrency();
+	if (threadCount == 0)
+		threadCount = 1;
+	vector<vector<pair<double, string>>> threadResults(threadCount);
+	vector<thread> threads;
+	for (size_t i{ 0 }; i < threadCount; i++)
+	{
+		threads.push_back(thread(mt_c_brute_force_vigenere_Thread, cref(score), cref(cipherIdx), cref(cipherPositions), maxKeyLength,
+			static_cast<size_t>(topK), i, threadCount, ref(threadResults[i])));
+	}
+	for (auto& current_thread : threads)
+	{	// wait for threads
+		current_thread.join();
+	}
+
+	// merge, then only fully decrypt the winners and rescore them on the whole text
+	vector<pair<double, string>> merged;
+	for (auto& results : threadResults)
+		merged.insert(merged.end(), results.begin(), results.end());
+	sort(merged.begin(), merged.end(), greater<pair<double, string>>());
+	if (merged.size() > static_cast<size_t>(topK))
+		merged.resize(topK);
+
+	vector<tuple<double, string, string>> winners;
+	for (auto& [prefixFitness, key] : merged)
+	{
+		string plaintext = cracker.vigenereDecrypt(key);
+		string scored = plaintext;
+		winners.push_back({ score.checkFitness(scored), key, plaintext });
+	}
+	sort(winners.begin(), winners.end(), greater<tuple<double, string, string>>());
+	if (!winners.empty())
+	{
+		cracker.maxFitness = get<0>(winners[0]);
+		cracker.bestKey = get<1>(winners[0]);
+	}
+	return winners;
+}
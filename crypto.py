@@ -45,6 +45,18 @@ def main():
     group_enigma = parser.add_argument_group('Enigma')
     group_enigma.add_argument('-r', '--rotors', type=str, help='3 rotors from 5: "I II III IV V" ex. "V IV III"')
     group_enigma.add_argument('-km', '--key_msg', type=str, help='message key (3 letters)')
+    group_enigma.add_argument('-p', '--plugboard', type=str, help='plugboard pairs ex. "AB CD EF"')
+    # each of these is a different way to crack enigma, only one can be used at a time
+    group_enigma_crack = group_enigma.add_mutually_exclusive_group()
+    group_enigma_crack.add_argument('-sP', '--search_plugboard', action='store_true',
+                                    help='also search for the plugboard when cracking enigma')
+    group_enigma_crack.add_argument('-sR', '--search_rings', action='store_true',
+                                    help='also search for the ring settings when cracking enigma')
+    group_enigma_crack.add_argument('-c', '--crib', type=str,
+                                    help='known plaintext to run the bombe with when cracking')
+    group_enigma.add_argument('-co', '--crib_offset', type=int,
+                              help='letter of the message the crib starts at, -1 tries everywhere it fits '
+                                   '(a full bombe run for each place)')
     args = parser.parse_args()
 
     config = EnigmaConfig()
@@ -94,6 +106,13 @@ def main():
                 # make sure key is proper length
                 if len(str(args.key_msg)) != 3:
                     parser.error("The message key must be 3 letters long!")
+            if args.crib is None and args.crib_offset is not None:
+                parser.error("A crib offset only works with a crib! (-c)")
+            if args.mode == 'crack' and args.crib is not None:
+                if args.crib_offset is None:
+                    parser.error("You must specify where the crib starts! (-co, -1 tries everywhere)")
+                if args.crib_offset < 0:
+                    print(f"Running the bombe at {len(Enigma.crib_offsets(args.text, args.crib))} crib offsets.")
             if args.mode != 'crack':
                 if args.key is None:
                     parser.error("You must specify a day key! (-k)")
@@ -122,6 +141,13 @@ def main():
                 config.middle_start = args.key[1]
                 config.right_start = args.key[2]
                 args.key = args.key_msg
+
+                # plugboard is optional
+                if args.plugboard is not None:
+                    try:
+                        config.plugboard = args.plugboard
+                    except ValueError as e:
+                        parser.error(str(e))
         case 'playfair':
             pass
         case 'railfence':
@@ -150,7 +176,12 @@ def main():
         output = decrypt(encryption_types[args.algorithm], args.text,
                          args.key, show_table=args.show_table, config=config)
     elif args.mode == 'crack':
-        output = crack(encryption_types[args.algorithm], args.text)
+        try:
+            output = crack(encryption_types[args.algorithm], args.text, search_plugboard=args.search_plugboard,
+                           search_rings=args.search_rings, crib=args.crib,
+                           crib_offset=-1 if args.crib_offset is None else args.crib_offset)
+        except ValueError as e:
+            parser.error(str(e))
 
     if args.output is not None:
         args.output.write(output)
@@ -59,11 +59,22 @@ def decrypt(algorithm, ciphertext, key, config=None, show_table=False):
             return Vigenere.decrypt(ciphertext, key)
 
 
-def crack(algorithm, ciphertext):
+def crack(algorithm, ciphertext, search_plugboard=False, search_rings=False, crib=None, crib_offset=-1):
     match algorithm:
         case Algorithm.CAESAR:
             return Caesar.crack(ciphertext)
         case Algorithm.ENIGMA:
+            if (crib is not None) + search_plugboard + search_rings > 1:
+                raise ValueError("Only one of a crib, the plugboard search and the ring search can be used!")
+            if crib is not None:
+                stops = Enigma.bombe(ciphertext, crib, crib_offset, max_stops=1)
+                if not stops:
+                    raise ValueError("The bombe found no stop for that crib!")
+                return stops[0]
+            if search_plugboard:
+                return Enigma.crack_plugboard(ciphertext)
+            if search_rings:
+                return Enigma.crack_rings(ciphertext)
             return Enigma.crack(ciphertext)
         case Algorithm.OTP:
             return OTP.crack(ciphertext)
@@ -25,7 +25,11 @@ def crack_playfair(ciphertext):
     :rtype: str
     """
     cracker = ca.PlayfairCrack("ngrams/playfair/quadgrams.json")
-    return ca.mt_c_crack(cracker, ciphertext, iterations=3000, temp=30, step=0.2, fudge=0.75, threshold=95)
+    # past ~800 letters scoring from the digram pair counts is faster than decrypting, it only sees the
+    # quadgrams that start on a digram and English scores about 0.5 higher on those (benchmarks.playfair_crack)
+    pair_scoring = len(ciphertext) >= 800
+    return ca.mt_c_crack(cracker, ciphertext, iterations=3000, temp=30, step=0.2, fudge=0.75,
+                         threshold=95.5 if pair_scoring else 95, pair_scoring=pair_scoring)
 
 
 def crack_substitution(ciphertext):
@@ -38,3 +42,93 @@ def crack_substitution(ciphertext):
     """
     cracker = ca.SubstitutionCrack("ngrams/quadgrams.json")
     return cracker.c_crack(ciphertext)
+
+
+def crack_vigenere(ciphertext, seed_keys, epsilon=2):
+    """
+    Crack Vigenere by annealing the key letters, starting from the given seed keys.
+
+    :param str ciphertext: ciphertext to decrypt.
+    :param list[str] seed_keys: starting keys (one per key length worth trying).
+    :param float epsilon: the shortest key within this much fitness of the best is the one returned.
+    :return: tuple of the decrypted ciphertext and the best key.
+    :rtype: tuple[str, str]
+    """
+    cracker = ca.VigenereCrack("ngrams/quadgrams.json")
+    plaintext = ca.mt_c_crack_vigenere(cracker, ciphertext, seed_keys, iterations=2000, temp=10, step=0.5,
+                                       epsilon=epsilon)
+    return plaintext, cracker.best_key
+
+
+def brute_force_vigenere(ciphertext, max_key_length=5, top=10):
+    """
+    Try every Vigenere key up to a given length, scoring a prefix of the text with quadgrams.
+
+    :param str ciphertext: ciphertext to decrypt.
+    :param int max_key_length: longest key to try (26^5 keys at 5, at most 12).
+    :param int top: how many of the best keys to return.
+    :return: list of (fitness, key, plaintext) tuples, best first.
+    :rtype: list[tuple[float, str, str]]
+    """
+    cracker = ca.VigenereCrack("ngrams/quadgrams.json")
+    return ca.mt_c_brute_force_vigenere(cracker, ciphertext, max_key_length=max_key_length, top=top)
+
+
+def crack_enigma(message, ngram_scoring=False):
+    """
+    Crack Enigma (no rings, no plugboard) by trying every rotor order and start position.
+
+    :param str message: message with the doubled message key as the first 6 letters.
+    :param bool ngram_scoring: score with quadgrams instead of index of coincidence.
+    :return: tuple of the plaintext and (left, middle, right, message key, day key).
+    :rtype: tuple[str, tuple[str, str, str, str, str]]
+    """
+    cracker = ca.EnigmaCrack("ngrams/quadgrams.json")
+    return ca.mt_c_crack_enigma(cracker, message, ngram_scoring=ngram_scoring)
+
+
+def crack_enigma_plugboard(message, candidates=100, max_plugs=10):
+    """
+    Crack Enigma with a plugboard (no rings): rank every rotor order and message key by index
+    of coincidence ignoring the plugs, then hill climb the plugboard of the best candidates.
+
+    :param str message: message with the doubled message key as the first 6 letters.
+    :param int candidates: how many message keys to keep for the plugboard search.
+    :param int max_plugs: most plugs to put in the plugboard.
+    :return: tuple of the plaintext and (left, middle, right, message key, day key, plugboard).
+    :rtype: tuple[str, tuple[str, str, str, str, str, str]]
+    """
+    cracker = ca.EnigmaCrack("ngrams/quadgrams.json")
+    return ca.mt_c_crack_enigma_plugboard(cracker, message, "ngrams/bigrams.json", "ngrams/trigrams.json",
+                                          candidates=candidates, max_plugs=max_plugs)
+
+
+def crack_enigma_rings(message, candidates=100, window=52):
+    """
+    Crack Enigma with unknown rings (no plugboard): rank every rotor order and body start by index
+    of coincidence, rescore the best candidates on their worst window, then read the rings off the indicator.
+
+    :param str message: message with the doubled message key as the first 6 letters.
+    :param int candidates: how many body starts to rescore.
+    :param int window: letters per window when rescoring.
+    :return: tuple of the plaintext and (left, middle, right, message key, day key, rings), the day key
+        and rings are the first pair that fits the indicator (Enigma.ring_candidates lists every one).
+    :rtype: tuple[str, tuple[str, str, str, str, str, str]]
+    """
+    cracker = ca.EnigmaCrack("ngrams/quadgrams.json")
+    return ca.mt_c_crack_enigma_rings(cracker, message, candidates=candidates, window=window)
+
+
+def bombe_enigma(message, crib, offset=-1, max_stops=100):
+    """
+    Run a Turing bombe over every rotor order and start position (rings at A) using a crib.
+
+    :param str message: message with the doubled message key as the first 6 letters.
+    :param str crib: plaintext we expect in the body.
+    :param int offset: letter in the body where the crib starts, -1 to try everywhere it fits.
+    :param int max_stops: how many stops to return.
+    :return: list of (fitness, plaintext, (left, middle, right, body start, plugboard)), best first.
+    :rtype: list[tuple[float, str, tuple[str, str, str, str, str]]]
+    """
+    cracker = ca.EnigmaCrack("ngrams/quadgrams.json")
+    return ca.mt_c_bombe_enigma(cracker, message, crib, offset=offset, max_stops=max_stops)
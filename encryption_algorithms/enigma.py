@@ -1,13 +1,18 @@
 # Authors: Joshua Tallman, Ryan Riccio
 # Date: Sept 17th, 2022
 # Program: For encrypting and decrypting text messages using an Enigma simulator.
+from types import MappingProxyType
+from itertools import permutations
+import mmap
+import os
+
 
 # region Enigma Backend
 class EnigmaConfig(object):
     def __init__(self, reflector="B",
                  left_rotor="III", middle_rotor="II", right_rotor="I",
                  left_start="A", middle_start="A", right_start="A",
-                 left_ring="A", middle_ring="A", right_ring="A"):
+                 left_ring="A", middle_ring="A", right_ring="A", plugboard=()):
         """
         Stores information about the setup of the Enigma Machine.
 
@@ -31,6 +36,8 @@ class EnigmaConfig(object):
         :type middle_ring: str
         :param right_ring: Must be capital alphabetical character.
         :type right_ring: str
+        :param plugboard: Pairs of letters to swap, ex. "AB CD" or ["AB", "CD"].
+        :type plugboard: str | list[str]
         """
         self.rotors = ['I', 'II', 'III', 'IV', 'V']
 
@@ -44,6 +51,7 @@ class EnigmaConfig(object):
         self.left_ring = left_ring
         self.middle_ring = middle_ring
         self.right_ring = right_ring
+        self.plugboard = plugboard
 
         if self.left_rotor == self.middle_rotor or self.left_rotor == self.right_rotor \
                 or self.middle_rotor == self.right_rotor:
@@ -89,6 +97,10 @@ class EnigmaConfig(object):
     def right_ring(self) -> str:
         return self._right_ring
 
+    @property
+    def plugboard(self) -> tuple[str, ...]:
+        return self._plugboard
+
     @reflector.setter
     def reflector(self, value: str):
         """
@@ -219,40 +231,71 @@ class EnigmaConfig(object):
         else:
             raise ValueError("Ring character must be a single letter!")
 
+    @plugboard.setter
+    def plugboard(self, value):
+        """
+        Pairs of letters swapped by the plugboard.
+
+        :param value: Pairs of letters, ex. "AB CD" or ["AB", "CD"]
+        :return: None
+        """
+        pairs = value.split() if isinstance(value, str) else list(value)
+        used = set()
+        for pair in pairs:
+            if not isinstance(pair, str) or len(pair) != 2 or not pair.isalpha() or not pair.isascii():
+                raise ValueError("Each plug must be a pair of letters!")
+            if pair[0].upper() == pair[1].upper() or used & set(pair.upper()):
+                raise ValueError("Each letter can only be plugged once!")
+            used |= set(pair.upper())
+        self._plugboard = tuple(pair.upper() for pair in pairs)
+
+    def compile(self, length):
+        """
+        Compile the machine into one combined permutation for each of the next
+        length keypresses, with the rotor stepping already applied.
+
+        :param length: Number of letters that will be encrypted.
+        :type length: int
+        :return: _compiled
+        """
+        return _compiled(self, length)
+
 
 # physical simulator of enigma M3
 class _m3:
     """ A class that implements the German M3 Enigma that was used by the Army
         and Navy in WWII. It has three rotors, a reflector, and a plugboard.
-        There is another part that plays a very minor role in encryption, the
-        rings, but these are not implemented for simplicity. It would be easy to
-        add them by simply adjusting the initial counter values for each rotor.
+        Rings are handled by adjusting the initial counter values for each rotor.
+        The rotor positions belong to each machine; the wiring in _mechanical is
+        read only and shared, so any number of machines can run at once.
     """
+    __slots__ = ("_reflector", "_L_rotor", "_M_rotor", "_R_rotor",
+                 "_L_counter", "_M_counter", "_R_counter", "_plugboard")
 
-    def __init__(self, ec: EnigmaConfig, plugboard={}):
+    def __init__(self, ec: EnigmaConfig, plugboard=None):
         """ Initializes the M3 Enigma machine by choosing which reflector and
             rotors to use and their initial settings (the letter showing in the
-            top of the Enigma box). It also sets plugboard. If rings were added
-            they would be set here.
+            top of the Enigma box). It also sets plugboard (the config's unless
+            one is given) and rings.
         """
-        self.reset(ec)
+        self.reset(ec, plugboard)
 
-    def reset(self, ec: EnigmaConfig, plugboard=[]):
+    def reset(self, ec: EnigmaConfig, plugboard=None):
         """ Initializes the M3 Enigma machine by choosing which reflector and
             rotors to use and their initial settings (the letter showing in the
-            top of the Enigma box). It also sets plugboard. If rings were added
-            they would be set here.
+            top of the Enigma box). It also sets plugboard (the config's unless
+            one is given) and rings.
         """
+        if plugboard is None:
+            plugboard = ec.plugboard
         self._reflector = _mechanical.reflector[ec.reflector.upper()]
         self._L_rotor = _mechanical.rotor[ec.left_rotor.upper()]
         self._M_rotor = _mechanical.rotor[ec.middle_rotor.upper()]
         self._R_rotor = _mechanical.rotor[ec.right_rotor.upper()]
-        self._L_rotor["counter"] = (self._letter_to_ordinal(ec.left_start) - self._letter_to_ordinal(ec.left_ring)) % 26
-        self._M_rotor["counter"] = (self._letter_to_ordinal(ec.middle_start) - self._letter_to_ordinal(
-            ec.middle_ring)) % 26
-        self._R_rotor["counter"] = (self._letter_to_ordinal(ec.right_start) - self._letter_to_ordinal(
-            ec.right_ring)) % 26
-        self._plugboard = {i: i for i in range(26)}
+        self._L_counter = (self._letter_to_ordinal(ec.left_start) - self._letter_to_ordinal(ec.left_ring)) % 26
+        self._M_counter = (self._letter_to_ordinal(ec.middle_start) - self._letter_to_ordinal(ec.middle_ring)) % 26
+        self._R_counter = (self._letter_to_ordinal(ec.right_start) - self._letter_to_ordinal(ec.right_ring)) % 26
+        self._plugboard = list(range(26))
         for plug in plugboard:
             k1 = self._letter_to_ordinal(plug[0])
             k2 = self._letter_to_ordinal(plug[-1])
@@ -281,18 +324,18 @@ class _m3:
         ch0 = self._letter_to_ordinal(letter)
         self._step()
         ch1 = self._plugboard[ch0]
-        ch2 = self._rotor(ch1, self._R_rotor, "forward")
-        ch3 = self._rotor(ch2, self._M_rotor, "forward")
-        ch4 = self._rotor(ch3, self._L_rotor, "forward")
+        ch2 = self._rotor(ch1, self._R_rotor["forward"], self._R_counter)
+        ch3 = self._rotor(ch2, self._M_rotor["forward"], self._M_counter)
+        ch4 = self._rotor(ch3, self._L_rotor["forward"], self._L_counter)
         ch5 = self._bounce_back(ch4, self._reflector)
-        ch6 = self._rotor(ch5, self._L_rotor, "reverse")
-        ch7 = self._rotor(ch6, self._M_rotor, "reverse")
-        ch8 = self._rotor(ch7, self._R_rotor, "reverse")
+        ch6 = self._rotor(ch5, self._L_rotor["reverse"], self._L_counter)
+        ch7 = self._rotor(ch6, self._M_rotor["reverse"], self._M_counter)
+        ch8 = self._rotor(ch7, self._R_rotor["reverse"], self._R_counter)
         ch9 = self._plugboard[ch8]
         if debug:
-            L_letter = self._ordinal_to_letter(self._L_rotor["counter"])
-            M_letter = self._ordinal_to_letter(self._M_rotor["counter"])
-            R_letter = self._ordinal_to_letter(self._R_rotor["counter"])
+            L_letter = self._ordinal_to_letter(self._L_counter)
+            M_letter = self._ordinal_to_letter(self._M_counter)
+            R_letter = self._ordinal_to_letter(self._R_counter)
             m = "{0}{1}{2} {3} : {4} -> {5} -> {6} -> {7} | {8} -> {9} -> {10} -> {11} : {12}"
             print(m.format(L_letter, M_letter, R_letter,
                            self._ordinal_to_letter(ch0), self._ordinal_to_letter(ch1),
@@ -306,21 +349,23 @@ class _m3:
     def _step(self):
         """ Steps the rotors forward for a single keypress.
         """
-        if self._M_rotor["counter"] == self._M_rotor["pushpeg"]:
-            self._L_rotor["counter"] = (self._L_rotor["counter"] + 1) % 26
-            self._M_rotor["counter"] = (self._M_rotor["counter"] + 1) % 26
-        if self._R_rotor["counter"] == self._R_rotor["pushpeg"]:
-            self._M_rotor["counter"] = (self._M_rotor["counter"] + 1) % 26
-        self._R_rotor["counter"] = (self._R_rotor["counter"] + 1) % 26
+        if self._M_counter == self._M_rotor["pushpeg"]:
+            self._L_counter = (self._L_counter + 1) % 26
+            self._M_counter = (self._M_counter + 1) % 26
+        if self._R_counter == self._R_rotor["pushpeg"]:
+            self._M_counter = (self._M_counter + 1) % 26
+        self._R_counter = (self._R_counter + 1) % 26
 
-    def _rotor(self, enter_wire, rotor, direction="forward"):
-        """ Encrypts a signal passing through a single rotor.
+    @staticmethod
+    def _rotor(enter_wire, wiring, counter):
+        """ Encrypts a signal passing through a single rotor in one direction.
         """
-        rotor_indx = (enter_wire + rotor["counter"]) % 26
-        leave_wire = (enter_wire + rotor[direction][rotor_indx]) % 26
+        rotor_indx = (enter_wire + counter) % 26
+        leave_wire = (enter_wire + wiring[rotor_indx]) % 26
         return leave_wire
 
-    def _bounce_back(self, enter_wire, reflector):
+    @staticmethod
+    def _bounce_back(enter_wire, reflector):
         """ Encrypts a signal passing through the reflector.
         """
         leave_wire = (enter_wire + reflector[enter_wire]) % 26
@@ -346,6 +391,7 @@ class _m3:
 class _mechanical:
     """ Technical specifications of the M3 Enigma mechnical parts based on the
         website http://users.telenet.be/d.rijmenants/en/enigmatech.htm
+        These are frozen at the bottom of the module since every machine shares them.
     """
     rotor = \
         {
@@ -353,7 +399,6 @@ class _mechanical:
                 "forward": [4, 9, 10, 2, 7, 1, -3, 9, 13, -10, 3, 8, 2, 9, 10, -8, 7, 3, 0, -4, 6, 13, 5, -6, 4, 10],
                 "reverse": [-6, -5, -4, 3, -4, -2, -1, 8, -13, -10, -9, -7, -10, -3, -2, 4, -9, 6, 0, -8, -3, -13, -9,
                             -7, -10, 10],
-                "counter": 0,
                 "pushpeg": 16
             },
             "II": {
@@ -361,7 +406,6 @@ class _mechanical:
                             5],
                 "reverse": [0, 8, -13, -1, -5, -9, 11, 4, -3, -8, -7, -1, 2, 6, 10, 5, 0, -11, 12, -6, -13, 2, -10, 11,
                             -3, -7],
-                "counter": 0,
                 "pushpeg": 4
             },
             "III": {
@@ -369,7 +413,6 @@ class _mechanical:
                             -11],
                 "reverse": [-7, -1, 4, -2, 11, -3, 12, -4, 8, -5, 10, -6, 9, 0, 11, -8, 8, -9, 5, -10, 2, -10, -5, -13,
                             -10, -13],
-                "counter": 0,
                 "pushpeg": 21
             },
             "IV": {
@@ -377,7 +420,6 @@ class _mechanical:
                             -2, 2],
                 "reverse": [7, -2, -6, -8, -4, 12, -13, 6, 3, -3, 10, 4, 11, 3, -12, -11, -7, -5, 9, -1, -10, 8, 2, -9,
                             10, 6],
-                "counter": 0,
                 "pushpeg": 9
             },
             "V": {
@@ -385,7 +427,6 @@ class _mechanical:
                             11],
                 "reverse": [-10, 1, -4, 8, -7, -9, -2, 6, -3, 10, -11, 3, 6, -1, 7, -6, 4, 12, -8, -13, -12, 5, -5, -8,
                             9, 2],
-                "counter": 0,
                 "pushpeg": 25
             }
         }
@@ -394,10 +435,309 @@ class _mechanical:
             "B": [-2, -10, -8, 4, 12, 13, 5, -4, 7, -12, 3, -5, 2, -3, -2, -7, -12, 10, -13, 6, 8, 1, -1, 12, 2, -6],
             "C": [5, -6, 13, 6, 4, -5, 8, -9, -4, -6, 7, -12, 11, 9, -8, -13, 3, -7, 2, -3, -2, 6, -9, -11, 9, 12]
         }
+
+
+# the wiring is shared by every machine, so make sure nothing can write to it
+_mechanical.rotor = MappingProxyType({name: MappingProxyType({k: tuple(v) if isinstance(v, list) else v
+                                                              for k, v in rotor.items()})
+                                      for name, rotor in _mechanical.rotor.items()})
+_mechanical.reflector = MappingProxyType({name: tuple(wiring) for name, wiring in _mechanical.reflector.items()})
+
+
+class _compiled:
+    """ An Enigma setup compiled into a flat array of 26-letter permutations,
+        one for each rotor position the message passes through. The stepping
+        (and the double step) is worked out here, so encrypting a message is a
+        single table lookup per letter.
+    """
+    __slots__ = ("tables", "length")
+
+    _letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    _letter_index = {ch: idx for idx, ch in enumerate(_letters)} | \
+                    {ch.lower(): idx for idx, ch in enumerate(_letters)}
+    _rotor_tables = {}  # (rotor, direction) -> 26 bytes.translate tables, one per counter
+    _reflector_tables = {}
+    _next_positions = {}    # (middle rotor, right rotor) -> next_positions
+
+    def __init__(self, ec: EnigmaConfig, length):
+        if not _compiled._rotor_tables:
+            _compiled._build_wiring_tables()
+        reflector = _compiled._reflector_tables[ec.reflector]
+        rotors = (ec.left_rotor, ec.middle_rotor, ec.right_rotor)
+        L_fwd, M_fwd, R_fwd = (_compiled._rotor_tables[rotor, "forward"] for rotor in rotors)
+        L_rev, M_rev, R_rev = (_compiled._rotor_tables[rotor, "reverse"] for rotor in rotors)
+        M_peg = _mechanical.rotor[ec.middle_rotor]["pushpeg"]
+        R_peg = _mechanical.rotor[ec.right_rotor]["pushpeg"]
+
+        # same starting counters as _m3.reset
+        L = (ord(ec.left_start) - ord(ec.left_ring)) % 26
+        M = (ord(ec.middle_start) - ord(ec.middle_ring)) % 26
+        R = (ord(ec.right_start) - ord(ec.right_ring)) % 26
+
+        # plugboard is the same swap on the way in and the way out
+        plugs = list(range(26))
+        for pair in ec.plugboard:
+            a, b = ord(pair[0]) - ord('A'), ord(pair[1]) - ord('A')
+            plugs[a], plugs[b] = b, a
+        plugboard = bytes(plugs) + bytes(230)
+        plugged = bytes(plugs)
+
+        # every reflector B scrambler is already worked out in the store
+        store, base = _store.locate(*rotors) if ec.reflector == "B" else (None, 0)
+        copy_runs = store is not None and not ec.plugboard
+        letters = bytes(range(26))
+        tables = bytearray()
+        remaining = length
+        while remaining:
+            # same stepping as _m3._step (including the double step)
+            if M == M_peg:
+                L = (L + 1) % 26
+                M = (M + 1) % 26
+            if R == R_peg:
+                M = (M + 1) % 26
+            R = (R + 1) % 26
+            position = base + (L * 676 + M * 26 + R) * 26
+
+            if copy_runs:
+                # until the middle rotor moves or the right one wraps, the positions
+                # are next to each other in the store and can be copied in one go
+                run = 1 if M == M_peg else 1 + min((R_peg - R) % 26, 25 - R, remaining - 1)
+                tables += store[position:position + run * 26]
+                R += run - 1
+                remaining -= run
+                continue
+
+            if store is not None:
+                scrambler = store[position:position + 26] + bytes(230)
+            else:
+                # compose the path through the rotors with bytes.translate
+                scrambler = letters.translate(R_fwd[R]).translate(M_fwd[M]).translate(L_fwd[L]) \
+                    .translate(reflector).translate(L_rev[L]).translate(M_rev[M]).translate(R_rev[R]) \
+                    + bytes(230)
+            tables += plugged.translate(scrambler).translate(plugboard)
+            remaining -= 1
+        self.tables = bytes(tables)
+        self.length = length
+
+    def crypt(self, text):
+        """ Encrypts (or decrypts) text. Letters use up one permutation each,
+            anything else is passed through without stepping, like _m3.keypress.
+        """
+        letter_index = _compiled._letter_index
+        letters = _compiled._letters
+        tables = self.tables
+        output = []
+        step = 0
+        for ch in text:
+            idx = letter_index.get(ch)
+            if idx is None:
+                output.append(ch)
+            else:
+                output.append(letters[tables[step + idx]])
+                step += 26
+        return "".join(output)
+
+    @staticmethod
+    def count_letters(text):
+        """ Number of keypresses the machine will make for this text. """
+        letter_index = _compiled._letter_index
+        return sum(1 for ch in text if ch in letter_index)
+
+    @staticmethod
+    def position_table(reflector, left_rotor, middle_rotor, right_rotor):
+        """ The scrambler (no plugboard) for every rotor position of one rotor order,
+            26 bytes for each position (L * 676 + M * 26 + R) in a single bytes object.
+        """
+        if not _compiled._rotor_tables:
+            _compiled._build_wiring_tables()
+        reflector = _compiled._reflector_tables[reflector]
+        L_fwd, M_fwd, R_fwd = (_compiled._rotor_tables[rotor, "forward"]
+                               for rotor in (left_rotor, middle_rotor, right_rotor))
+        L_rev, M_rev, R_rev = (_compiled._rotor_tables[rotor, "reverse"]
+                               for rotor in (left_rotor, middle_rotor, right_rotor))
+
+        letters = bytes(range(26))
+        table = bytearray()
+        for L in range(26):
+            for M in range(26):
+                # the left and middle rotors and the reflector are the same for every right position
+                inner = letters.translate(M_fwd[M]).translate(L_fwd[L]).translate(reflector) \
+                    .translate(L_rev[L]).translate(M_rev[M]) + bytes(230)
+                for R in range(26):
+                    table += letters.translate(R_fwd[R]).translate(inner).translate(R_rev[R])
+        return bytes(table)
+
+    @staticmethod
+    def next_positions(middle_rotor, right_rotor):
+        """ Where each rotor position (L * 676 + M * 26 + R) steps to on the next keypress.
+            Only the middle and right rotors matter, so it is worked out once per pair.
+        """
+        positions = _compiled._next_positions.get((middle_rotor, right_rotor))
+        if positions is not None:
+            return positions
+        M_peg = _mechanical.rotor[middle_rotor]["pushpeg"]
+        R_peg = _mechanical.rotor[right_rotor]["pushpeg"]
+        positions = []
+        for L in range(26):
+            for M in range(26):
+                for R in range(26):
+                    # same stepping as _m3._step (including the double step)
+                    L_next, M_next = L, M
+                    if M == M_peg:
+                        L_next = (L + 1) % 26
+                        M_next = (M + 1) % 26
+                    if R == R_peg:
+                        M_next = (M_next + 1) % 26
+                    positions.append(L_next * 676 + M_next * 26 + (R + 1) % 26)
+        positions = _compiled._next_positions[middle_rotor, right_rotor] = tuple(positions)
+        return positions
+
+    @staticmethod
+    def _build_wiring_tables():
+        """ Turns the offset lists in _mechanical into translate tables for every
+            counter value of every rotor.
+        """
+        for name, rotor in _mechanical.rotor.items():
+            for direction in ("forward", "reverse"):
+                _compiled._rotor_tables[name, direction] = [
+                    bytes((wire + rotor[direction][(wire + counter) % 26]) % 26 for wire in range(26)) + bytes(230)
+                    for counter in range(26)]
+        for name, reflector in _mechanical.reflector.items():
+            _compiled._reflector_tables[name] = bytes((wire + reflector[wire]) % 26 for wire in range(26)) + bytes(230)
+
+
+class _store:
+    """ Every reflector B scrambler (no plugboard) for every rotor order and rotor position,
+        60 x 17,576 x 26 bytes (about 27 MB) laid out like _compiled.position_table one rotor
+        order after another. It is worked out once, kept in the user's cache directory and
+        memory mapped, so every process shares the same pages and nothing is rebuilt.
+
+        The file starts with a header: a magic number, the format version and a hash of the
+        wiring in _mechanical. A file with a different header (an older layout or other
+        rotors) is rebuilt instead of being trusted.
+    """
+    version = 1                 # bump whenever the layout of the tables changes
+    magic = b"ENIGPERM"
+    orders = {rotors: idx for idx, rotors in enumerate(permutations(("I", "II", "III", "IV", "V"), 3))}
+    order_size = 17576 * 26
+    _tables = None
+    _start = 0                  # where the tables start, after the header when memory mapped
+
+    @staticmethod
+    def path():
+        """ $ENIGMA_CACHE_DIR, otherwise the platform's user cache directory. """
+        directory = os.environ.get("ENIGMA_CACHE_DIR")
+        if not directory:
+            if os.name == "nt":
+                base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+            else:
+                base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            directory = os.path.join(base, "encryption_algorithms")
+        return os.path.join(directory, "enigma_permutations.bin")
+
+    @staticmethod
+    def header():
+        """ Magic, format version and a SHA-256 of the wiring the tables were built from. """
+        import hashlib
+        import struct
+
+        wiring = repr((sorted((name, sorted(rotor.items())) for name, rotor in _mechanical.rotor.items()),
+                       sorted(_mechanical.reflector.items())))
+        return _store.magic + struct.pack("<I", _store.version) + hashlib.sha256(wiring.encode()).digest()
+
+    @staticmethod
+    def table(left_rotor, middle_rotor, right_rotor):
+        """ _compiled.position_table for one rotor order, straight out of the store (no copy). """
+        tables, start = _store.locate(left_rotor, middle_rotor, right_rotor)
+        return memoryview(tables)[start:start + _store.order_size]
+
+    @staticmethod
+    def locate(left_rotor, middle_rotor, right_rotor):
+        """ The whole store and where this rotor order starts in it, slicing the store
+            itself is the cheapest way to get a single 26-byte scrambler out.
+        """
+        if _store._tables is None:
+            _store._tables, _store._start = _store._load(_store.path())
+        return _store._tables, _store._start + _store.orders[left_rotor, middle_rotor, right_rotor] * _store.order_size
+
+    @staticmethod
+    def build(path):
+        """ Write the store, through a temporary file so other processes never see half of it. """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, "wb") as f:
+            f.write(_store.header())
+            for rotors in _store.orders:
+                f.write(_compiled.position_table("B", *rotors))
+        os.replace(temp, path)
+
+    @staticmethod
+    def _load(path):
+        """ Memory map the store, building it first if it is missing or does not match this module. """
+        header = _store.header()
+        try:
+            if not _store._valid(path, header):
+                _store.build(path)
+            with open(path, "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), len(header)
+        except OSError:
+            # nowhere to keep it, so this process works it out in memory
+            return b"".join(_compiled.position_table("B", *rotors) for rotors in _store.orders), 0
+
+    @staticmethod
+    def _valid(path, header):
+        """ The file is there, has the right size and was built by this version from this wiring. """
+        if not os.path.exists(path) or os.path.getsize(path) != len(header) + len(_store.orders) * _store.order_size:
+            return False
+        with open(path, "rb") as f:
+            return f.read(len(header)) == header
+
+
+class _machine:
+    """ A bare reflector B machine (no rings, no plugboard) for one rotor order, running
+        straight off the store. It is moved to a new position in place, so a search can
+        reuse one machine for every position without building configs or checking settings;
+        whoever creates it is expected to have checked the rotors already.
+    """
+    __slots__ = ("table", "next_position", "position")
+
+    def __init__(self, left_rotor, middle_rotor, right_rotor):
+        self.table = _store.table(left_rotor, middle_rotor, right_rotor)
+        self.next_position = _compiled.next_positions(middle_rotor, right_rotor)
+        self.position = 0
+
+    def set_positions(self, left, middle, right):
+        """ Move the rotors, counters are 0-25 (A-Z). """
+        self.position = left * 676 + middle * 26 + right
+
+    def crypt(self, text):
+        """ Encrypts (or decrypts) text from the current position and leaves the rotors
+            where they stop, anything that is not a letter is passed through like _compiled.crypt.
+        """
+        letter_index = _compiled._letter_index
+        letters = _compiled._letters
+        table = self.table
+        next_position = self.next_position
+        position = self.position
+        output = []
+        for ch in text:
+            idx = letter_index.get(ch)
+            if idx is None:
+                output.append(ch)
+            else:
+                position = next_position[position]
+                output.append(letters[table[position * 26 + idx]])
+        self.position = position
+        return "".join(output)
 # endregion
 
 
 class Enigma(object):
+    # decrypt_many only starts a pool for at least this many letters: starting one costs 25-40 ms and
+    # decrypting 0.25-0.45 us a letter (sending the messages over is about free), so with 2 cores the
+    # pool pays for itself somewhere past 150,000 letters and smaller days are done before it is up
+    _pool_letters = 200000
+
     @staticmethod
     def encrypt(plaintext, msg_key, ec: EnigmaConfig) -> str:
         """
@@ -414,19 +754,14 @@ class Enigma(object):
         # make sure the day key is the correct length
         if len(msg_key) == 3:
             # encrypt the day key
-            my_enigma = _m3(ec)
-            ciphertext = ""
-            for idx in range(6):
-                ciphertext += my_enigma.keypress(msg_key[idx % 3])
-            ciphertext += " "
+            indicator = msg_key + msg_key
+            ciphertext = ec.compile(_compiled.count_letters(indicator)).crypt(indicator) + " "
 
             # switch rotors to day key
             ec.left_start, ec.middle_start, ec.right_start = msg_key[0], msg_key[1], msg_key[2]
-            my_enigma.reset(ec)
 
             # encrypt plaintext
-            for ch in plaintext:
-                ciphertext += my_enigma.keypress(ch)
+            ciphertext += ec.compile(_compiled.count_letters(plaintext)).crypt(plaintext)
             return ciphertext
         else:
             raise ValueError("Day Key must be 3 characters long!")
@@ -442,70 +777,130 @@ class Enigma(object):
         :type ec: EnigmaConfig
         :return: tuple with the plaintext and message key.
         """
-        my_enigma = _m3(ec)
-
         # separate day key and ciphertext
         first_six = ciphertext[:6]  # first 6 letters
         ciphertext = ciphertext[6:].strip()  # real ciphertext message
 
         # decrypt the message key
-        msg_key = [my_enigma.keypress(ch) for ch in first_six]
+        msg_key = ec.compile(_compiled.count_letters(first_six)).crypt(first_six)
 
         # check for valid message key and decrypt the message
-        if msg_key[0] == msg_key[3] and msg_key[1] == msg_key[4] and msg_key[2] == msg_key[5]:
-            plaintext = ""
+        if len(msg_key) == 6 and msg_key[0] == msg_key[3] and msg_key[1] == msg_key[4] and msg_key[2] == msg_key[5]:
             ec.left_start, ec.middle_start, ec.right_start = msg_key[0], msg_key[1], msg_key[2]
-            my_enigma.reset(ec)
-            for ch in ciphertext:
-                plaintext += my_enigma.keypress(ch)
-            return plaintext, f"{msg_key[0]}{msg_key[1]}{msg_key[2]}"
+            plaintext = ec.compile(_compiled.count_letters(ciphertext)).crypt(ciphertext)
+            return plaintext, msg_key[:3]
         else:
             raise ValueError("That is not a valid daily key!")
 
     @staticmethod
-    def crack(message) -> tuple[str, [str, str, str, str, str]]:
+    def decrypt_many(messages, ec: EnigmaConfig, processes=None) -> list[tuple[str, str, ValueError]]:
+        """
+        Decrypt a day's worth of messages sent under the same day key. The day key is only
+        compiled once, messages that share a message key share one compiled machine, and a
+        bad message is reported in its own result instead of stopping the rest.
+
+        :param messages: Texts to decrypt, each with the doubled message key at the start.
+        :type messages: list[str]
+        :param ec: Configuration of the Enigma Machine (not changed).
+        :type ec: EnigmaConfig
+        :param processes: Number of processes to decrypt with, None for every core. The message keys
+            are only spread over a pool from 200,000 letters, below that starting one costs more
+            than it saves and everything is decrypted in this process.
+        :type processes: int
+        :return: list with the plaintext, message key and error (None if it worked) for each message.
+        """
+        from copy import copy
+        import multiprocessing
+
+        messages = list(messages)
+        indicators = [message[:6].upper() for message in messages]
+        valid = [idx for idx, indicator in enumerate(indicators)
+                 if len(indicator) == 6 and all(ch in _compiled._letter_index for ch in indicator)]
+        results = [("", "", ValueError(f"Message {idx} does not start with a 6 letter message key!"))
+                   for idx in range(len(messages))]
+
+        # decrypt every indicator at once, one translate per keypress over that letter of every message
+        day_key = ec.compile(6)
+        joined = "".join(indicators[idx] for idx in valid).encode("ascii")
+        columns = []
+        for step in range(6):
+            scrambler = day_key.tables[step * 26:step * 26 + 26]
+            table = bytes(range(65)) + bytes(65 + letter for letter in scrambler) + bytes(range(91, 256))
+            columns.append(joined[step::6].translate(table).decode("ascii"))
+
+        # only doubled message keys are real, group the rest of the messages by message key
+        groups = {}
+        for idx, msg_key in zip(valid, map("".join, zip(*columns))):
+            if msg_key[:3] == msg_key[3:]:
+                groups.setdefault(msg_key[:3], []).append(idx)
+            else:
+                results[idx] = ("", "", ValueError(f"Message {idx} decrypts its message key to {msg_key}, "
+                                                   f"which is not doubled!"))
+
+        # each message key is one compiled machine, spread them between the processes
+        jobs = [(copy(ec), msg_key, [messages[idx][6:].strip() for idx in group]) for msg_key, group in groups.items()]
+        processes = min(processes or os.cpu_count() or 1, len(jobs))
+        if processes > 1 and sum(len(ciphertext) for job in jobs for ciphertext in job[2]) >= Enigma._pool_letters:
+            with multiprocessing.Pool(processes) as pool:
+                plaintexts = pool.starmap(Enigma._decrypt_group, jobs)
+        else:
+            plaintexts = [Enigma._decrypt_group(*job) for job in jobs]
+
+        for (msg_key, group), group_plaintexts in zip(groups.items(), plaintexts):
+            for idx, plaintext in zip(group, group_plaintexts):
+                results[idx] = (plaintext, msg_key, None)
+        return results
+
+    @staticmethod
+    def _decrypt_group(ec: EnigmaConfig, msg_key, ciphertexts):
+        """ Decrypt message bodies that all use the same message key with a single compiled machine. """
+        ec.left_start, ec.middle_start, ec.right_start = msg_key[0], msg_key[1], msg_key[2]
+        machine = ec.compile(max(map(_compiled.count_letters, ciphertexts)))
+        return [machine.crypt(ciphertext) for ciphertext in ciphertexts]
+
+    @staticmethod
+    def crack(message, backend="native", stages=None) -> tuple[str, [str, str, str, str, str]]:
         """
         Use frequency analysis to estimate the most likely solution to an enigma ciphertext
         Brute force assuming no rings and no plugboard setup. Assuming the first 6 characters
         are the msg key repeated twice.
 
+        The default backend used to be the python search, it is now the C++ cryptanalysis module
+        (built with python setup.py build_ext like the other crackers need). Both find the same
+        settings on the sample intercepts, pass backend='python' to get the old search.
+
         :param message: Text to be cracked
         :type message: str
+        :param backend: 'native' (C++ on every core, the default), 'numpy' or 'python' (the original
+            multiprocessing search, the only one that fills in stages)
+        :type backend: str
+        :param stages: Cut-offs for the python backend's scoring, its counters are filled in.
+        :type stages: EnigmaStages
         :return tuple with the plaintext and the settings
         """
+        if backend == "native":
+            import encryption_algorithms.cryptanalysis_wrapper as ca
+            return ca.crack_enigma(message)
+        elif backend == "numpy":
+            return Enigma._crack_numpy(message)
+        elif backend != "python":
+            raise ValueError("Backend must be 'native', 'numpy' or 'python'.")
+
         import psutil
         import time
         import multiprocessing
         from itertools import permutations
 
-        # get logical number of cores
-        num_cpu = psutil.cpu_count(logical=True)
+        stages = EnigmaStages() if stages is None else stages
 
-        # calculate how many CPUs we can actually use and how to split them evenly
-        if num_cpu > 1:
-            num_cpu -= 2
-            while True:
-                if 60 % num_cpu == 0:
-                    num_jobs = num_cpu
-                    break
-                else:
-                    num_cpu -= 1
-        else:
-            num_jobs = 1
-
-        rotors = ["I", "II", "III", "IV", "V"]
-        total_combinations = []
+        # every logical core gets a job, the rotor orders are dealt out between them
+        num_jobs = min(psutil.cpu_count(logical=True) or 1, 60)
+        split_jobs = [list(rotors) for rotors in permutations(["I", "II", "III", "IV", "V"], 3)]
+        split_jobs = [split_jobs[idx::num_jobs] for idx in range(num_jobs)]
 
         # start the timer
         start = time.time()
 
-        # split every combination of rotors between the CPUs
-        for rotor_l, rotor_m, rotor_r in permutations(rotors, 3):
-            total_combinations.append([rotor_l, rotor_m, rotor_r])
-
-        num_splits = 60 // num_jobs
-        split_jobs = [total_combinations[idx:idx + num_splits] for idx in range(0, len(total_combinations), num_splits)]
-
         print(f"Starting up {num_jobs} jobs to crack enigma.")
 
         # start the jobs
@@ -513,7 +908,7 @@ class Enigma(object):
         shared_dict = manager.dict()
         processes = []
         for idx in range(num_jobs):
-            p = multiprocessing.Process(target=Enigma._crack_job, args=(message, split_jobs[idx], shared_dict))
+            p = multiprocessing.Process(target=Enigma._crack_job, args=(message, split_jobs[idx], shared_dict, stages))
             processes.append(p)
             p.start()
 
@@ -523,9 +918,15 @@ class Enigma(object):
         end = time.time()   # end time
         print(f"Cracked enigma in {end - start:.2f} sec.")
 
-        # sort results and store the settings
-        sorted_dict = {k: v for k, v in sorted(shared_dict.items(), key=lambda item: item[0])}
-        settings = list(sorted_dict.values())[0]
+        # keep the fittest result of every job, and add up how much work each stage did
+        results = [best for best, _ in shared_dict.values() if best is not None]
+        for _, counters in shared_dict.values():
+            for name, count in counters.items():
+                stages.counters[name] += count
+        print(", ".join(f"{count} {name}" for name, count in stages.counters.items()))
+        if not results:
+            raise ValueError("No start position gives a valid message key!")
+        settings = max(results)[1]
 
         # decrypt using the settings
         ec = EnigmaConfig(left_rotor=settings[0], middle_rotor=settings[1], right_rotor=settings[2],
@@ -533,36 +934,750 @@ class Enigma(object):
         plaintext = Enigma.decrypt(message, ec)[0]
         return plaintext, settings
 
+    @staticmethod
+    def crack_plugboard(message, candidates=100, max_plugs=10) -> tuple[str, [str, str, str, str, str, str]]:
+        """
+        Crack an enigma ciphertext that went through a plugboard (no rings). Every rotor order and
+        message key is ranked by index of coincidence with the plugs ignored, then the plugboard of
+        the best candidates is hill climbed with index of coincidence, bigrams and finally trigrams.
+        The day key is found last by decrypting the first 6 characters with the recovered plugboard.
+
+        :param message: Text to be cracked
+        :type message: str
+        :param candidates: How many message keys get a plugboard search
+        :type candidates: int
+        :param max_plugs: Most plugs to put in the plugboard
+        :type max_plugs: int
+        :return tuple with the plaintext and the settings (day key is empty if the indicator did not match)
+        """
+        import encryption_algorithms.cryptanalysis_wrapper as ca
+        return ca.crack_enigma_plugboard(message, candidates=candidates, max_plugs=max_plugs)
+
+    @staticmethod
+    def crack_rings(message, candidates=100, window=52) -> tuple[str, [str, str, str, str, str, str]]:
+        """
+        Crack an enigma ciphertext sent with unknown rings (no plugboard). The rings only move where
+        the rotors start, so every rotor order and body start is ranked by index of coincidence without
+        them, the best candidates are rescored on their worst window of quadgrams, and the rings are
+        what is left between the message key in the indicator and the body start.
+
+        :param message: Text to be cracked
+        :type message: str
+        :param candidates: How many body starts get rescored
+        :type candidates: int
+        :param window: Letters per window when rescoring
+        :type window: int
+        :return tuple with the plaintext and the settings (day key is empty if the indicator did not match).
+            Only the body start (message key less the rings) is really recovered: every start whose
+            indicator decrypts to a doubled key gives its own day key and rings that read the message
+            just as well, this is the first of them and ring_candidates lists them all.
+        """
+        import encryption_algorithms.cryptanalysis_wrapper as ca
+        return ca.crack_enigma_rings(message, candidates=candidates, window=window)
+
+    @staticmethod
+    def ring_candidates(message, settings) -> list[tuple[str, str]]:
+        """
+        Every day key and ring setting that fits a crack_rings result. The message alone cannot tell
+        them apart, each decrypts the indicator to a doubled message key that puts the rotors at the
+        same body start, so the real one is among these (usually only one or two).
+
+        :param message: Text that was cracked
+        :type message: str
+        :param settings: (left, middle, right, message key, day key, rings) from crack_rings
+        :type settings: tuple
+        :return: list of (day key, rings), empty if the indicator did not match.
+        """
+        left, middle, right, msg_key, _, rings = settings
+        indicator = [_compiled._letter_index.get(ch) for ch in message[:6]]
+        if len(msg_key) != 3 or len(indicator) != 6 or None in indicator:
+            return []
+        body_start = [(ord(key) - ord(ring)) % 26 for key, ring in zip(msg_key, rings)]
+
+        # decrypt the indicator from every rotor position, rings at A
+        table = _store.table(left, middle, right)
+        next_position = _compiled.next_positions(middle, right)
+        letters = _compiled._letters
+        candidates = []
+        for start in range(17576):
+            position = start
+            decrypted = []
+            for letter in indicator:
+                position = next_position[position]
+                decrypted.append(table[position * 26 + letter])
+            if decrypted[:3] != decrypted[3:]:
+                continue
+            # the rings are the gap between the message key and the body start, the day key is where
+            # the rotors were plus the rings
+            ring = [(key - body) % 26 for key, body in zip(decrypted, body_start)]
+            counters = (start // 676, start // 26 % 26, start % 26)
+            candidates.append(("".join(letters[(counter + r) % 26] for counter, r in zip(counters, ring)),
+                               "".join(letters[r] for r in ring)))
+        return candidates
+
+    @staticmethod
+    def bombe(message, crib, offset=-1, max_stops=100) -> list[tuple[str, [str, str, str, str, str]]]:
+        """
+        Run a Turing bombe with a crib (plaintext we expect in the message) over every rotor order
+        and start position, rings at A. The crib is lined up against the body to make a menu, and
+        every setting where the plugboard hypotheses stay consistent is a stop. Each stop is
+        decrypted with the plugs it implies and the most readable come first.
+
+        :param message: Text to be cracked
+        :type message: str
+        :param crib: Plaintext that is in the message
+        :type crib: str
+        :param offset: Letter of the body (after the first 6 characters) the crib starts at, -1 tries everywhere it fits
+        :type offset: int
+        :param max_stops: Most stops to return
+        :type max_stops: int
+        :return list of tuples with the plaintext and the stop (left, middle, right, body start, plugboard)
+        """
+        crib, body = Enigma._crib_letters(message, crib)
+        if not crib:
+            raise ValueError("Crib must have at least one letter!")
+        if offset >= 0:
+            if offset + len(crib) > len(body):
+                raise ValueError("Crib does not fit in the message at that offset!")
+            # enigma never encrypts a letter to itself
+            if any(plain == cipher for plain, cipher in zip(crib, body[offset:])):
+                raise ValueError("Crib cannot go where a letter would encrypt to itself!")
+
+        import encryption_algorithms.cryptanalysis_wrapper as ca
+        return [(plaintext, stop) for _, plaintext, stop in ca.bombe_enigma(message, crib, offset, max_stops)]
+
+    @staticmethod
+    def crib_offsets(message, crib) -> list[int]:
+        """
+        Offsets bombe tries for a crib when it is not given one, each is a full run of the bombe.
+
+        :param message: Text to be cracked
+        :type message: str
+        :param crib: Plaintext that is in the message
+        :type crib: str
+        :return: list of letters of the body the crib could start at.
+        """
+        crib, body = Enigma._crib_letters(message, crib)
+        return [offset for offset in range(len(body) - len(crib) + 1) if crib and
+                all(plain != cipher for plain, cipher in zip(crib, body[offset:]))]
+
+    @staticmethod
+    def _crib_letters(message, crib):
+        """ The crib and the body as A-Z only like the native bombe, so offsets count the same letters on both sides. """
+        crib = "".join(ch for ch in crib if ch in _compiled._letter_index).upper()
+        body = [ch.upper() for ch in message[6:] if ch in _compiled._letter_index]
+        return crib, body
+
     # region Crack Worker
     @staticmethod
-    def _crack_job(message, rotor_list, shared_dict):
+    def _crack_numpy(message, chunk_size=4096):
+        """
+        Same search as crack, but every start position of a rotor order is a row
+        in an array, so the machines are stepped and looked up in the permutation
+        store together. Rows that survive the doubled message key check are decrypted
+        and scored by index of coincidence at most chunk_size rows at a time.
+        """
+        import numpy as np
+
+        letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+        first_six = message[:6]
+        body = [letters.index(ch) for ch in message[6:].strip().upper() if ch in letters]
+        if len(first_six) != 6 or not all(ch in letters for ch in first_six.upper()) or len(body) < 2:
+            raise ValueError("Message must start with a doubled message key!")
+        indicator = [letters.index(ch) for ch in first_six.upper()]
+        body = np.array(body, dtype=np.intp)
+
+        # every start position as a row, positions are L * 676 + M * 26 + R
+        starts = np.arange(17576)
+
+        best = (-1.0, None)
+        for rotors in permutations(["I", "II", "III", "IV", "V"], 3):
+            # [position, letter] -> letter straight out of the store, and where each position steps to
+            scrambler = np.frombuffer(_store.table(*rotors), dtype=np.uint8).reshape(17576, 26)
+            next_position = np.array(_compiled.next_positions(rotors[1], rotors[2]), dtype=np.intp)
+
+            # decrypt the indicator for all 17,576 start positions and keep rows where both halves agree
+            position = starts
+            msg_key = []
+            alive = np.ones(position.shape, dtype=bool)
+            for idx, ch in enumerate(indicator):
+                position = next_position[position]
+                decrypted = scrambler[position, ch]
+                if idx < 3:
+                    msg_key.append(decrypted.astype(np.intp))
+                else:
+                    alive &= decrypted == msg_key[idx - 3]
+            rows = np.flatnonzero(alive)
+
+            # decrypt the survivors chunk by chunk, one gather per letter for every row
+            for chunk in range(0, len(rows), chunk_size):
+                chunk_rows = rows[chunk:chunk + chunk_size]
+                position = msg_key[0][chunk_rows] * 676 + msg_key[1][chunk_rows] * 26 + msg_key[2][chunk_rows]
+                plaintext = np.empty((len(chunk_rows), len(body)), dtype=np.intp)
+                for idx, ch in enumerate(body):
+                    position = next_position[position]
+                    plaintext[:, idx] = scrambler[position, ch]
+
+                # index of coincidence of every row from one bincount
+                offsets = plaintext + 26 * np.arange(len(chunk_rows))[:, None]
+                counts = np.bincount(offsets.ravel(), minlength=26 * len(chunk_rows)).reshape(-1, 26)
+                ioc = (counts * (counts - 1)).sum(axis=1) / (len(body) * (len(body) - 1))
+                row = int(np.argmax(ioc))
+                if ioc[row] > best[0]:
+                    start = chunk_rows[row]
+                    day_key = "".join(letters[idx] for idx in (start // 676, start // 26 % 26, start % 26))
+                    best = (float(ioc[row]), (rotors, day_key))
+
+        if best[1] is None:
+            raise ValueError("No start position gives a valid message key!")
+        rotors, day_key = best[1]
+        ec = EnigmaConfig("B", *rotors, *day_key)
+        plaintext, msg_key = Enigma.decrypt(message, ec)
+        return plaintext, (*rotors, msg_key, day_key)
+
+    @staticmethod
+    def _crack_job(message, rotor_list, shared_dict, stages=None):
         """
         Worker process to find the settings of an Enigma Machine
         """
-        from itertools import product
-        from encryption_algorithms.caesar import Caesar
-
-        key_info = {}
-
-        # go through every combination of given rotors and positions
-        for rotors in rotor_list:
-            scramblers = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-            for start_l, start_m, start_r in product(scramblers, repeat=3):
-                # test if this is a valid setup, then decrypt and perform frequency analysis if valid
-                config = EnigmaConfig("B", rotors[0], rotors[1], rotors[2], start_l, start_m, start_r)
-                try:
-                    decrypted = Enigma.decrypt(message, config)
-                    settings = (rotors[0], rotors[1], rotors[2], decrypted[1],
-                                f"{start_l}{start_m}{start_r}")
-
-                    # use frequency analysis to see if this is a good decryption
-                    frequency_distribution = Caesar.calculate_frequencies(decrypted[0])
-                    key_info[settings] = Caesar.score_frequencies(frequency_distribution)
-                except ValueError:  # if decryption does not work, start over
+        stages = EnigmaStages() if stages is None else stages
+        units = [(rotors, left_start, "AAA") for rotors in rotor_list for left_start in range(26)]
+        ranked = Enigma._crack_units(message, units, stages)
+        best = (ranked[0][0], ranked[0][1][:5]) if ranked else None
+        shared_dict[os.getpid()] = (best, stages.counters)
+
+    @staticmethod
+    def _crack_units(message, units, stages) -> list[tuple[float, tuple[str, str, str, str, str, str]]]:
+        """
+        Search part of the keyspace. A unit is a rotor order, a left rotor counter (0-25,
+        676 start positions) and ring settings; every start position that survives the
+        doubled message key check is handed to stages.
+
+        :return: list of (quadgram fitness, (left, middle, right, message key, day key, rings)), best first.
+        """
+        # everything about the message is checked and split up once, the loop below only does lookups
+        letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+        indicator = [letters.find(ch) for ch in message[:6].upper()]
+        if len(indicator) != 6 or -1 in indicator:
+            units = []      # every position would fail the doubled message key check
+        else:
+            first, second, third, fourth, fifth, sixth = indicator
+        ciphertext = message[6:].strip()
+        prefix = ciphertext[:stages.prefix_end(ciphertext)]
+
+        # go through every start position of every unit
+        for rotors, left_start, rings in units:
+            # six keypresses straight from the scrambler tables, only positions where the
+            # doubled message key matches are worth decrypting
+            machine = _machine(rotors[0], rotors[1], rotors[2])
+            table = machine.table
+            next_position = machine.next_position
+            ring_l, ring_m, ring_r = (letters.index(ring) for ring in rings)
+            stages.counters["positions"] += 676
+            for start in range(left_start * 676, left_start * 676 + 676):
+                p1 = next_position[start]
+                p2 = next_position[p1]
+                p3 = next_position[p2]
+                p4 = next_position[p3]
+                msg_l = table[p1 * 26 + first]
+                if msg_l != table[p4 * 26 + fourth]:
+                    continue
+                p5 = next_position[p4]
+                msg_m = table[p2 * 26 + second]
+                if msg_m != table[p5 * 26 + fifth]:
                     continue
+                p6 = next_position[p5]
+                msg_r = table[p3 * 26 + third]
+                if msg_r != table[p6 * 26 + sixth]:
+                    continue
+
+                # survivors only get the start of the message decrypted for now, the message
+                # key is what the windows show so the rings come off before the machine is moved
+                machine.set_positions((msg_l - ring_l) % 26, (msg_m - ring_m) % 26, (msg_r - ring_r) % 26)
+                stages.add((rotors, msg_l, msg_m, msg_r, start, rings), machine.crypt(prefix))
+
+        def decrypt(candidate):
+            candidate_rotors, msg_l, msg_m, msg_r, _, candidate_rings = candidate
+            candidate_machine = _machine(candidate_rotors[0], candidate_rotors[1], candidate_rotors[2])
+            candidate_machine.set_positions(*((msg - letters.index(ring)) % 26
+                                              for msg, ring in zip((msg_l, msg_m, msg_r), candidate_rings)))
+            return candidate_machine.crypt(ciphertext)
+
+        # the best prefixes are decrypted in full and scored on n-grams
+        ranked = []
+        for fitness, (rotors, msg_l, msg_m, msg_r, start, rings), _ in stages.rank(decrypt):
+            counters = (start // 676, start // 26 % 26, start % 26)
+            day_key = "".join(letters[(counter + letters.index(ring)) % 26] for counter, ring in zip(counters, rings))
+            ranked.append((fitness, (rotors[0], rotors[1], rotors[2],
+                                     letters[msg_l] + letters[msg_m] + letters[msg_r], day_key, rings)))
+        return ranked
+    # endregion
+
+
+class EnigmaStages(object):
+    """
+    Staged scoring for Enigma.crack. Every candidate only has the first few letters
+    decrypted and scored by index of coincidence, the best of those are decrypted in full
+    and scored on bigrams, and the best of those are scored on quadgrams. counters says
+    how many candidates each stage looked at.
+    """
+    _letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    _score_texts = {}   # file -> ScoreText
+
+    def __init__(self, prefix=80, ioc_keep=2000, bigram_keep=30,
+                 bigram_file="ngrams/bigrams.json", quadgram_file="ngrams/quadgrams.json"):
+        """
+        :param prefix: Letters of each candidate scored by index of coincidence.
+        :type prefix: int
+        :param ioc_keep: Candidates kept for bigram scoring.
+        :type ioc_keep: int
+        :param bigram_keep: Candidates kept for quadgram scoring.
+        :type bigram_keep: int
+        :param bigram_file: Bigram file for ScoreText.
+        :type bigram_file: str
+        :param quadgram_file: Quadgram file for ScoreText.
+        :type quadgram_file: str
+        """
+        if prefix < 2 or ioc_keep < 1 or bigram_keep < 1:
+            raise ValueError("Prefix must be at least 2 letters and every stage must keep a candidate!")
+        self.prefix = prefix
+        self.ioc_keep = ioc_keep
+        self.bigram_keep = bigram_keep
+        self.bigram_file = bigram_file
+        self.quadgram_file = quadgram_file
+        self.counters = {"positions": 0, "prefix": 0, "bigram": 0, "quadgram": 0}
+        self._heap = []     # min heap of (index of coincidence, order added, candidate)
+
+    def prefix_end(self, ciphertext):
+        """
+        Where the prefix stops in ciphertext, so it can be cut once and decrypted for every candidate.
+
+        :param ciphertext: Message body.
+        :type ciphertext: str
+        :return: int
+        """
+        count = 0
+        for idx, ch in enumerate(ciphertext):
+            if ch.upper() in EnigmaStages._letters:
+                count += 1
+                if count == self.prefix:
+                    return idx + 1
+        return len(ciphertext)
+
+    def add(self, candidate, plaintext):
+        """
+        Stage 1, score a candidate's decrypted prefix and keep it if it is in the top ioc_keep.
+
+        :param candidate: Anything that rank's decrypt can turn into the full plaintext.
+        :param plaintext: The candidate's decrypted prefix.
+        :type plaintext: str
+        """
+        import heapq
+
+        counts = [plaintext.count(ch) for ch in EnigmaStages._letters]
+        length = sum(counts)
+        ioc = sum(count * (count - 1) for count in counts) / (length * (length - 1)) if length > 1 else 0.0
+        entry = (ioc, self.counters["prefix"], candidate)
+        self.counters["prefix"] += 1
+        if len(self._heap) < self.ioc_keep:
+            heapq.heappush(self._heap, entry)
+        elif ioc > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def rank(self, decrypt) -> list[tuple[float, object, str]]:
+        """
+        Stages 2 and 3, fully decrypt what is left and score it on bigrams, then quadgrams.
+
+        :param decrypt: Function from a candidate to its full plaintext.
+        :type decrypt: callable
+        :return: list of (quadgram fitness, candidate, plaintext), best first.
+        """
+        if not self._heap:
+            return []
+        survivors = [(candidate, decrypt(candidate)) for _, _, candidate in self._heap]
+        self._heap = []
+        if len(survivors) > self.bigram_keep:
+            # no point in bigrams when every survivor would go on to quadgrams anyway
+            self.counters["bigram"] += len(survivors)
+            bigrams = EnigmaStages._score_text(self.bigram_file)
+            survivors = sorted(survivors, key=lambda item: bigrams.c_score(item[1]), reverse=True)[:self.bigram_keep]
+
+        self.counters["quadgram"] += len(survivors)
+        quadgrams = EnigmaStages._score_text(self.quadgram_file)
+        ranked = [(quadgrams.c_score(plaintext), candidate, plaintext) for candidate, plaintext in survivors]
+        return sorted(ranked, key=lambda item: item[0], reverse=True)
+
+    @staticmethod
+    def _score_text(file):
+        """ One ScoreText per n-gram file per process, loading quadgrams takes longer than scoring. """
+        import encryption_algorithms.cryptanalysis as ca
+
+        if file not in EnigmaStages._score_texts:
+            EnigmaStages._score_texts[file] = ca.ScoreText(file)
+        return EnigmaStages._score_texts[file]
+
+
+class EnigmaStream(object):
+    """
+    An Enigma Machine that works through a stream a chunk at a time instead of a whole
+    message at once, so memory stays the same however long the stream is. Its rotor state
+    can be saved with snapshot and picked back up with restore, and advance moves it to a
+    known keypress offset so a long stream can be split between workers.
+    """
+    def __init__(self, ec: EnigmaConfig):
+        """
+        Set up a machine at the start positions of ec (ec itself is not changed).
 
-        # sort answers and return our best work
-        scored_dict = {k: v for k, v in sorted(key_info.items(), key=lambda item: item[1])}
-        best_config = list(scored_dict.keys())[0]
-        shared_dict[scored_dict[best_config]] = best_config
+        :param ec: Configuration of the Enigma Machine.
+        :type ec: EnigmaConfig
+        """
+        from copy import copy
+
+        self._config = copy(ec)
+        self._set_position(ec.left_start, ec.middle_start, ec.right_start)
+
+    def crypt(self, chunk):
+        """
+        Encrypt (or decrypt) the next chunk of the stream, anything that is not a letter
+        is passed through without stepping.
+
+        :param chunk: Next part of the stream, bytes are read as latin-1.
+        :type chunk: str | bytes
+        :return: str | bytes (the same type as chunk)
+        """
+        binary = isinstance(chunk, (bytes, bytearray))
+        text = chunk.decode("latin-1") if binary else chunk
+        length = _compiled.count_letters(text)
+        if length:
+            ec = self._config
+            ec.left_start, ec.middle_start, ec.right_start = self.position
+            text = ec.compile(length).crypt(text)
+            self.advance(length)
+        return text.encode("latin-1") if binary else text
+
+    def stream(self, source, chunk_size=65536):
+        """
+        Encrypt (or decrypt) a whole stream, yielding the output a chunk at a time.
+
+        :param source: Iterable of str or bytes chunks, or a file opened in binary mode.
+        :type source: iterable | BinaryIO
+        :param chunk_size: Bytes to read at a time from a file.
+        :type chunk_size: int
+        :return: generator of str | bytes
+        """
+        for chunk in EnigmaStream._chunks(source, chunk_size):
+            yield self.crypt(chunk)
+
+    def encrypt(self, source, msg_key, chunk_size=65536):
+        """
+        Stream version of Enigma.encrypt, the machine should be at the day key. The doubled
+        message key comes out first, then the message encrypted from the message key.
+
+        :param source: Iterable of str or bytes chunks, or a file opened in binary mode.
+        :type source: iterable | BinaryIO
+        :param msg_key: Three letter message key.
+        :type msg_key: str
+        :param chunk_size: Bytes to read at a time from a file.
+        :type chunk_size: int
+        :return: generator of str | bytes
+        """
+        if len(msg_key) != 3:
+            raise ValueError("Day Key must be 3 characters long!")
+        indicator = self.crypt(msg_key + msg_key) + " "
+        self._set_position(msg_key[0], msg_key[1], msg_key[2])
+
+        binary = hasattr(source, "read")
+        for chunk in EnigmaStream._chunks(source, chunk_size):
+            binary = isinstance(chunk, (bytes, bytearray))
+            if indicator:
+                yield (indicator.encode("latin-1") if binary else indicator) + self.crypt(chunk)
+                indicator = None
+            else:
+                yield self.crypt(chunk)
+        if indicator:   # nothing to encrypt, but the message key is still sent
+            yield indicator.encode("latin-1") if binary else indicator
+
+    def decrypt(self, source, chunk_size=65536):
+        """
+        Stream version of Enigma.decrypt, the machine should be at the day key. The first
+        6 characters are the doubled message key, and the space after it is skipped.
+        Unlike Enigma.decrypt, whitespace at the very end is passed through.
+
+        :param source: Iterable of str or bytes chunks, or a file opened in binary mode.
+        :type source: iterable | BinaryIO
+        :param chunk_size: Bytes to read at a time from a file.
+        :type chunk_size: int
+        :return: generator of str | bytes
+        """
+        first_six = ""
+        started = False
+        for chunk in EnigmaStream._chunks(source, chunk_size):
+            binary = isinstance(chunk, (bytes, bytearray))
+            text = chunk.decode("latin-1") if binary else chunk
+
+            # hold on to the start of the stream until the message key is all there
+            if len(first_six) < 6:
+                needed = 6 - len(first_six)
+                first_six, text = first_six + text[:needed], text[needed:]
+                if len(first_six) < 6:
+                    continue
+                msg_key = self.crypt(first_six)
+                if msg_key[0] == msg_key[3] and msg_key[1] == msg_key[4] and msg_key[2] == msg_key[5]:
+                    self._set_position(msg_key[0], msg_key[1], msg_key[2])
+                else:
+                    raise ValueError("That is not a valid daily key!")
+
+            if not started:
+                text = text.lstrip()
+                started = bool(text)
+            yield self.crypt(text.encode("latin-1") if binary else text)
+        if len(first_six) < 6:
+            raise ValueError("That is not a valid daily key!")
+
+    def advance(self, steps):
+        """
+        Step the rotors without encrypting anything.
+
+        :param steps: Number of keypresses.
+        :type steps: int
+        """
+        next_position = _compiled.next_positions(self._config.middle_rotor, self._config.right_rotor)
+        position = self._position
+        for _ in range(steps):
+            position = next_position[position]
+        self._position = position
+        self.steps += steps
+
+    @property
+    def position(self) -> str:
+        """ Letters showing in the rotor windows (what left_start, middle_start and right_start would be). """
+        ec = self._config
+        letters = _compiled._letters
+        counters = (self._position // 676, self._position // 26 % 26, self._position % 26)
+        rings = (ec.left_ring, ec.middle_ring, ec.right_ring)
+        return "".join(letters[(counter + ord(ring) - ord('A')) % 26] for counter, ring in zip(counters, rings))
+
+    def snapshot(self) -> dict:
+        """
+        Everything needed to carry on from here, only made of strings, lists and ints so it
+        can be saved as JSON.
+
+        :return: dict
+        """
+        ec = self._config
+        return {"reflector": ec.reflector,
+                "rotors": [ec.left_rotor, ec.middle_rotor, ec.right_rotor],
+                "rings": ec.left_ring + ec.middle_ring + ec.right_ring,
+                "plugboard": list(ec.plugboard),
+                "position": self.position,
+                "steps": self.steps}
+
+    @staticmethod
+    def restore(snapshot):
+        """
+        Build the machine a snapshot was taken from.
+
+        :param snapshot: Result of EnigmaStream.snapshot.
+        :type snapshot: dict
+        :return: EnigmaStream
+        """
+        (left_rotor, middle_rotor, right_rotor), rings, position = \
+            snapshot["rotors"], snapshot["rings"], snapshot["position"]
+        if len(rings) != 3 or len(position) != 3:
+            raise ValueError("Rings and position must be 3 characters long!")
+        ec = EnigmaConfig(snapshot["reflector"], left_rotor, middle_rotor, right_rotor,
+                          position[0], position[1], position[2], rings[0], rings[1], rings[2],
+                          snapshot["plugboard"])
+        machine = EnigmaStream(ec)
+        machine.steps = snapshot["steps"]
+        return machine
+
+    def _set_position(self, left_start, middle_start, right_start):
+        """ Move the rotors to these window letters (checked by EnigmaConfig), same counters as _m3.reset. """
+        ec = self._config
+        ec.left_start, ec.middle_start, ec.right_start = left_start, middle_start, right_start
+        self._position = (ord(ec.left_start) - ord(ec.left_ring)) % 26 * 676 + \
+            (ord(ec.middle_start) - ord(ec.middle_ring)) % 26 * 26 + (ord(ec.right_start) - ord(ec.right_ring)) % 26
+        self.steps = 0
+
+    @staticmethod
+    def _chunks(source, chunk_size):
+        """ Chunks from an iterable, or reads from a file until it runs out. """
+        if hasattr(source, "read"):
+            while chunk := source.read(chunk_size):
+                yield chunk
+        else:
+            yield from source
+
+
+class EnigmaCatalog(object):
+    """
+    Rejewski's characteristic catalog. With enough messages sent on the same day key, the
+    first and fourth letters of the doubled message keys give a permutation (AD), as do the
+    second and fifth (BE) and the third and sixth (CF). Their cycle lengths do not change with
+    the plugboard, so they fingerprint the rotor order and day key (rings at A, reflector B).
+
+    The catalog file is every fingerprint sorted, followed by the setting each belongs to, so
+    it can be memory mapped and searched in place.
+    """
+    _magic = b"RJWK"
+    _letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    _rotor_orders = [(left, middle, right) for left in ("I", "II", "III", "IV", "V")
+                     for middle in ("I", "II", "III", "IV", "V") for right in ("I", "II", "III", "IV", "V")
+                     if left != middle and middle != right and left != right]
+    _partitions = {}    # cycle lengths (one of each pair) -> id
+
+    def __init__(self, path="ngrams/enigma_catalog.bin"):
+        """
+        Open a catalog made by EnigmaCatalog.build.
+
+        :param path: Catalog file
+        :type path: str
+        """
+        import mmap
+        import struct
+
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = struct.unpack_from("<4sI", self._mmap)
+        if magic != EnigmaCatalog._magic or len(self._mmap) != 8 + 8 * count:
+            raise ValueError("That is not an Enigma catalog!")
+        data = memoryview(self._mmap)[8:]
+        self._fingerprints = data[:4 * count].cast("I")
+        self._settings = data[4 * count:].cast("I")
+
+    def close(self):
+        self._fingerprints.release()
+        self._settings.release()
+        self._mmap.close()
+
+    def lookup(self, indicators) -> list[tuple[str, str, str, str]]:
+        """
+        Find every setting whose characteristic matches a day's worth of doubled message keys.
+
+        :param indicators: First 6 letters of every message sent on the same day key
+        :type indicators: list[str]
+        :return: list of (left rotor, middle rotor, right rotor, day key)
+        """
+        from bisect import bisect_left, bisect_right
+
+        fingerprint = EnigmaCatalog.fingerprint(EnigmaCatalog.characteristic(indicators))
+        first = bisect_left(self._fingerprints, fingerprint)
+        last = bisect_right(self._fingerprints, fingerprint, lo=first)
+        found = []
+        for setting in self._settings[first:last]:
+            order, position = divmod(setting, 17576)
+            left, middle, right = EnigmaCatalog._rotor_orders[order]
+            day_key = "".join(EnigmaCatalog._letters[idx] for idx in (position // 676, position // 26 % 26, position % 26))
+            found.append((left, middle, right, day_key))
+        return found
+
+    @staticmethod
+    def build(path="ngrams/enigma_catalog.bin"):
+        """
+        Work out the characteristic of every rotor order and day key and write the catalog (about 8 MB).
+
+        :param path: Where to write the catalog
+        :type path: str
+        """
+        from array import array
+
+        entries = []
+        for order, (left, middle, right) in enumerate(EnigmaCatalog._rotor_orders):
+            table = _store.table(left, middle, right)
+            next_position = _compiled.next_positions(middle, right)
+            for start in range(17576):
+                # the scrambler at each of the six keypresses of the indicator
+                positions = []
+                position = start
+                for _ in range(6):
+                    position = next_position[position]
+                    positions.append(bytes(table[position * 26:position * 26 + 26]))
+                cycles = tuple(EnigmaCatalog._cycle_lengths(positions[idx], positions[idx + 3]) for idx in range(3))
+                entries.append((EnigmaCatalog.fingerprint(cycles), order * 17576 + start))
+
+        entries.sort()
+        with open(path, "wb") as f:
+            f.write(EnigmaCatalog._magic + len(entries).to_bytes(4, "little"))
+            f.write(array("I", (fingerprint for fingerprint, _ in entries)).tobytes())
+            f.write(array("I", (setting for _, setting in entries)).tobytes())
+
+    @staticmethod
+    def characteristic(indicators) -> tuple[tuple[int, ...], tuple[int, ...], tuple[int, ...]]:
+        """
+        Cycle lengths of AD, BE and CF from the doubled message keys of one day.
+
+        :param indicators: First 6 letters of every message sent on the same day key
+        :type indicators: list[str]
+        :return: tuple of the cycle lengths of each permutation (longest first)
+        """
+        letters = EnigmaCatalog._letters
+        mappings = [[None] * 26 for _ in range(3)]
+        for indicator in indicators:
+            indicator = indicator.upper()
+            if len(indicator) < 6 or any(ch not in letters for ch in indicator[:6]):
+                raise ValueError("Each indicator must be 6 letters!")
+            for idx in range(3):
+                first, fourth = letters.index(indicator[idx]), letters.index(indicator[idx + 3])
+                if mappings[idx][first] not in (None, fourth):
+                    raise ValueError("Those indicators were not sent on the same day key!")
+                mappings[idx][first] = fourth
+
+        for mapping in mappings:
+            # a single letter left out can only go to the one letter nothing goes to yet
+            if mapping.count(None) == 1:
+                mapping[mapping.index(None)] = (set(range(26)) - set(mapping)).pop()
+        if any(None in mapping for mapping in mappings):
+            raise ValueError("Not enough indicators to fill in every permutation!")
+        return tuple(EnigmaCatalog._cycles(mapping) for mapping in mappings)
+
+    @staticmethod
+    def fingerprint(characteristic) -> int:
+        """ Pack the three cycle structures into one number. """
+        if not EnigmaCatalog._partitions:
+            EnigmaCatalog._build_partitions()
+        fingerprint = 0
+        for cycles in characteristic:
+            # cycles come in pairs of the same length, so one of each pair is a partition of 13
+            key = cycles[::2]
+            if key != cycles[1::2] or key not in EnigmaCatalog._partitions:
+                raise ValueError("That is not the cycle structure of an Enigma!")
+            fingerprint = fingerprint * len(EnigmaCatalog._partitions) + EnigmaCatalog._partitions[key]
+        return fingerprint
+
+    # region Catalog Backend
+    @staticmethod
+    def _cycle_lengths(first, fourth):
+        """ Cycle lengths of AD: the scrambler is its own inverse, so the letter typed
+            for indicator letter x is first[x] and the fourth letter is fourth[first[x]].
+        """
+        return EnigmaCatalog._cycles(first.translate(fourth + bytes(230)))
+
+    @staticmethod
+    def _cycles(permutation):
+        """ Cycle lengths of a permutation of 0-25, longest first. """
+        seen = bytearray(26)
+        lengths = []
+        for letter in range(26):
+            length = 0
+            while not seen[letter]:
+                seen[letter] = 1
+                letter = permutation[letter]
+                length += 1
+            if length:
+                lengths.append(length)
+        return tuple(sorted(lengths, reverse=True))
+
+    @staticmethod
+    def _build_partitions():
+        """ Give every partition of 13 an id. """
+        def partitions(remaining, largest):
+            if remaining == 0:
+                yield ()
+            for part in range(min(remaining, largest), 0, -1):
+                for rest in partitions(remaining - part, part):
+                    yield (part,) + rest
+
+        for idx, partition in enumerate(partitions(13, 13)):
+            EnigmaCatalog._partitions[partition] = idx
     # endregion
@@ -0,0 +1,275 @@
+# Author: Ryan Riccio
+# Date: Oct 19th, 2026
+# Program: Spreading an Enigma crack over worker processes on one or more hosts.
+#          Run from the root of the repo: python -m encryption_algorithms.enigma_cluster coordinator|worker ...
+import json
+import socket
+import socketserver
+import threading
+from collections import deque
+from itertools import permutations
+from encryption_algorithms.enigma import Enigma, EnigmaConfig, EnigmaStages
+
+
+class EnigmaCoordinator(object):
+    """
+    Hands out the Enigma keyspace to workers (EnigmaWorker.run) over a TCP or Unix socket.
+    The keyspace is cut into units of a rotor order, a left rotor position and a ring setting
+    (676 start positions each). A unit a worker took but never answered goes back in the queue
+    for another worker, up to max_attempts times before it is given up on and listed in failed,
+    and every worker's top results are merged into one top K.
+
+    Everything sent is JSON lines, a job is the message, the stage cut-offs and then one unit
+    at a time until the coordinator says it is done.
+    """
+    _letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+    def __init__(self, message, address=("127.0.0.1", 0), rings=("AAA",), top_k=10, stages=None, timeout=600,
+                 max_attempts=3):
+        """
+        Set up the work units and start listening (serve hands them out).
+
+        :param message: Text to be cracked, starting with the doubled message key.
+        :type message: str
+        :param address: (host, port) to listen on, or a path for a Unix socket. Port 0 picks a free port.
+        :type address: tuple[str, int] | str
+        :param rings: Ring settings to search, ex. ["AAA", "AAB"].
+        :type rings: list[str]
+        :param top_k: Number of results to keep.
+        :type top_k: int
+        :param stages: Cut-offs for the staged scoring on the workers (only the cut-offs are sent).
+        :type stages: EnigmaStages
+        :param timeout: Seconds a worker has to answer before its unit is given to someone else.
+        :type timeout: float
+        :param max_attempts: Times a unit is handed out before it is given up on.
+        :type max_attempts: int
+        """
+        rings = list(rings)
+        if not rings or not all(len(ring) == 3 and all(ch in EnigmaCoordinator._letters for ch in ring)
+                                for ring in rings):
+            raise ValueError("Ring settings must be 3 capital letters!")
+        if top_k < 1:
+            raise ValueError("Top K must be at least 1!")
+        if max_attempts < 1:
+            raise ValueError("Max attempts must be at least 1!")
+        stages = EnigmaStages() if stages is None else stages
+
+        self.message = message
+        self.top_k = top_k
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.failed = []
+        self.stages = {"prefix": stages.prefix, "ioc_keep": stages.ioc_keep, "bigram_keep": stages.bigram_keep}
+        self.counters = {name: 0 for name in stages.counters}
+        self.units = [(rotors, left_start, ring) for ring in rings
+                      for rotors in permutations(("I", "II", "III", "IV", "V"), 3) for left_start in range(26)]
+        self._pending = deque(range(len(self.units)))
+        self._finished = set()
+        self._attempts = [0] * len(self.units)
+        self._results = []
+        self._condition = threading.Condition()
+
+        # one thread per connected worker
+        if isinstance(address, str):
+            server_class = socketserver.ThreadingUnixStreamServer
+        else:
+            server_class = _tcp_server
+        self._server = server_class(address, _worker_connection)
+        self._server.daemon_threads = True
+        self._server.coordinator = self
+        self.address = self._server.server_address
+
+    def serve(self) -> list[tuple[float, tuple[str, str, str, str, str, str]]]:
+        """
+        Hand out units until every one of them has a result or has failed max_attempts times
+        (those are listed in failed, their keyspace was not searched).
+
+        :return: list of (quadgram fitness, (left, middle, right, message key, day key, rings)), best first.
+        """
+        thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with self._condition:
+                while len(self._finished) < len(self.units):
+                    self._condition.wait()
+        finally:
+            self._server.shutdown()
+            self._server.server_close()
+        return sorted(self._results, reverse=True)
+
+    def spawn_workers(self, count):
+        """
+        Start workers on this machine as separate processes.
+
+        :param count: Number of workers.
+        :type count: int
+        :return: list of the worker processes.
+        """
+        import multiprocessing
+
+        processes = [multiprocessing.Process(target=EnigmaWorker.run, args=(self.address,), daemon=True)
+                     for _ in range(count)]
+        for process in processes:
+            process.start()
+        return processes
+
+    def decrypt(self, settings) -> str:
+        """
+        Decrypt the message with one of the results.
+
+        :param settings: (left, middle, right, message key, day key, rings) from serve.
+        :type settings: tuple
+        :return: str
+        """
+        left, middle, right, _, day_key, rings = settings
+        ec = EnigmaConfig("B", left, middle, right, *day_key, *rings)
+        return Enigma.decrypt(self.message, ec)[0]
+
+    # region Coordinator Backend
+    def _next_unit(self):
+        """ The next unit nobody is working on, waits while the last ones are still out. None when all are done. """
+        with self._condition:
+            while not self._pending and len(self._finished) < len(self.units):
+                self._condition.wait()
+            return self._pending.popleft() if self._pending else None
+
+    def _finish(self, unit, results, counters):
+        """ Merge a unit's results into the top K, a unit that was handed out twice only counts once. """
+        with self._condition:
+            if unit not in self._finished:
+                self._finished.add(unit)
+                self._results = sorted(self._results + [(fitness, tuple(settings)) for fitness, settings in results],
+                                       reverse=True)[:self.top_k]
+                for name, count in counters.items():
+                    self.counters[name] = self.counters.get(name, 0) + count
+            self._condition.notify_all()
+
+    def _requeue(self, unit):
+        """ A worker went away without answering, give its unit to someone else unless it has failed too often. """
+        with self._condition:
+            if unit not in self._finished:
+                self._attempts[unit] += 1
+                if self._attempts[unit] < self.max_attempts:
+                    self._pending.appendleft(unit)
+                else:
+                    self._finished.add(unit)
+                    self.failed.append(self.units[unit])
+            self._condition.notify_all()
+    # endregion
+
+
+class EnigmaWorker(object):
+    @staticmethod
+    def run(address) -> int:
+        """
+        Connect to an EnigmaCoordinator and work on units until it says it is done.
+
+        :param address: (host, port) or Unix socket path of the coordinator.
+        :type address: tuple[str, int] | str
+        :return: number of units finished.
+        """
+        if isinstance(address, str):
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.connect(address)
+        else:
+            connection = socket.create_connection(tuple(address))
+
+        finished = 0
+        with connection, connection.makefile("rwb") as stream:
+            job = json.loads(stream.readline())
+            while True:
+                line = stream.readline()
+                if not line:
+                    break   # coordinator is gone
+                request = json.loads(line)
+                if request.get("done"):
+                    break
+
+                stages = EnigmaStages(**job["stages"])
+                unit = (tuple(request["rotors"]), request["left_start"], request["rings"])
+                ranked = Enigma._crack_units(job["message"], [unit], stages)
+                _send(stream, {"unit": request["unit"], "results": ranked[:job["top_k"]],
+                               "counters": stages.counters})
+                finished += 1
+        return finished
+
+
+class _tcp_server(socketserver.ThreadingTCPServer):
+    # a restarted coordinator can take its port back straight away
+    allow_reuse_address = True
+
+
+# one of these runs on its own thread for every connected worker
+class _worker_connection(socketserver.StreamRequestHandler):
+    def handle(self):
+        coordinator = self.server.coordinator
+        self.request.settimeout(coordinator.timeout)
+        unit = None
+        try:
+            _send(self.wfile, {"message": coordinator.message, "stages": coordinator.stages,
+                               "top_k": coordinator.top_k})
+            while True:
+                unit = coordinator._next_unit()
+                if unit is None:
+                    _send(self.wfile, {"done": True})
+                    return
+                rotors, left_start, rings = coordinator.units[unit]
+                _send(self.wfile, {"unit": unit, "rotors": rotors, "left_start": left_start, "rings": rings})
+
+                # a worker that hangs up, times out or sends garbage is treated as dead
+                reply = json.loads(self.rfile.readline())
+                if reply["unit"] != unit:
+                    raise ValueError("Worker answered for the wrong unit!")
+                coordinator._finish(unit, reply["results"], reply["counters"])
+                unit = None
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        finally:
+            if unit is not None:
+                coordinator._requeue(unit)
+
+
+def _send(stream, data):
+    """ One JSON object per line. """
+    stream.write(json.dumps(data).encode() + b"\n")
+    stream.flush()
+
+
+def _parse_address(text):
+    """ 'host:port' for TCP, anything else is a Unix socket path. """
+    host, _, port = text.rpartition(":")
+    if host and port.isdigit():
+        return host, int(port)
+    return text
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Crack Enigma with workers on one or more hosts.")
+    subparsers = parser.add_subparsers(dest="role", required=True)
+    coordinator_parser = subparsers.add_parser("coordinator", help="hand out the keyspace")
+    coordinator_parser.add_argument("file", help="file with the message to crack")
+    coordinator_parser.add_argument("-b", "--bind", default="127.0.0.1:0", help="host:port or Unix socket path")
+    coordinator_parser.add_argument("-w", "--workers", type=int, default=0, help="workers to start on this host")
+    coordinator_parser.add_argument("-r", "--rings", nargs="+", default=["AAA"], help="ring settings to search")
+    coordinator_parser.add_argument("-k", "--top_k", type=int, default=10, help="results to keep")
+    worker_parser = subparsers.add_parser("worker", help="work for a coordinator")
+    worker_parser.add_argument("address", help="host:port or Unix socket path of the coordinator")
+    args = parser.parse_args()
+
+    if args.role == "worker":
+        print(f"Finished {EnigmaWorker.run(_parse_address(args.address))} units.")
+    else:
+        with open(args.file, encoding="latin-1") as f:
+            coordinator = EnigmaCoordinator(f.read(), _parse_address(args.bind), args.rings, args.top_k)
+        print(f"Listening on {coordinator.address}, {len(coordinator.units)} units.")
+        coordinator.spawn_workers(args.workers)
+        results = coordinator.serve()
+        print(", ".join(f"{count} {name}" for name, count in coordinator.counters.items()))
+        for rotors, left_start, rings in coordinator.failed:
+            print(f"Gave up on {rotors} left rotor at {EnigmaCoordinator._letters[left_start]} rings {rings}.")
+        for fitness, settings in results:
+            print(f"{fitness:.2f} {settings}")
+        if results:
+            print(coordinator.decrypt(results[0][1]))
@@ -6,6 +6,7 @@ import encryption_algorithms.cryptanalysis_wrapper as ca
 
 
 class Playfair(object):
+    _compiled_keys = {}     # grid -> _compiled
     @staticmethod
     def encrypt(plaintext, key):
         """
@@ -16,38 +17,12 @@ class Playfair(object):
         :return: ciphertext
         :rtype: str
         """
-        # get grid and process plaintext
-        grid = Playfair._create_playfair_grid(key)
-        new_plaintext = ""
-        for ch in plaintext:
-            if ch.isalpha():
-                if ch.lower() == 'j':
-                    new_plaintext += 'i'
-                else:
-                    new_plaintext += ch
-        plaintext = new_plaintext
-
-        # get rid of double characters
-        plaintext = Playfair._encode_playfair_digrams(plaintext)
-        ciphertext = ""
-
-        # take each digram and get its location
-        for digram in plaintext:
-            pos1 = Playfair._get_character_location(grid, digram[0])
-            pos2 = Playfair._get_character_location(grid, digram[1])
-
-            # check the grid based on the positions and add to ciphertext
-            if pos1[1] == pos2[1]:
-                ciphertext += Playfair._get_playfair_letter(grid, (pos1[0] + 1) % 5, pos1[1])
-                ciphertext += Playfair._get_playfair_letter(grid, (pos2[0] + 1) % 5, pos2[1])
-            elif pos1[0] == pos2[0]:
-                ciphertext += Playfair._get_playfair_letter(grid, pos1[0], (pos1[1] + 1) % 5)
-                ciphertext += Playfair._get_playfair_letter(grid, pos2[0], (pos2[1] + 1) % 5)
-            else:
-                d_col = pos1[1] - pos2[1]
-                ciphertext += Playfair._get_playfair_letter(grid, pos1[0], pos1[1] - d_col)
-                ciphertext += Playfair._get_playfair_letter(grid, pos2[0], pos2[1] + d_col)
-        return ciphertext
+        # get the compiled key and process plaintext (A-Z only, 'J' is 'I')
+        compiled = Playfair._compile(key)
+        plaintext = ('I' if ch == 'J' else ch for ch in (ch.upper() for ch in plaintext if ch in string.ascii_letters))
+
+        # get rid of double characters, then look every digram up at once
+        return "".join(map(compiled.encrypt_table.__getitem__, Playfair._encode_playfair_digrams(plaintext)))
 
     @staticmethod
     def decrypt(ciphertext, key):
@@ -59,31 +34,16 @@ class Playfair(object):
         :return: plaintext
         :rtype: str
         """
-        # get grid and split ciphertext
-        grid = Playfair._create_playfair_grid(key)
-        new_ciphertext = ""
-        for ch in ciphertext:
-            if ch.isalpha():
-                new_ciphertext += ch
-        ciphertext = [new_ciphertext[idx:idx+2] for idx in range(0, len(new_ciphertext), 2)]
-        plaintext = ""
-
-        # go through each digram and check grid for decryption
-        for digram in ciphertext:
-            pos1 = Playfair._get_character_location(grid, digram[0])
-            pos2 = Playfair._get_character_location(grid, digram[1])
-            if pos1[1] == pos2[1]:
-                plaintext += Playfair._get_playfair_letter(grid, (pos1[0] - 1) % 5, pos1[1])
-                plaintext += Playfair._get_playfair_letter(grid, (pos2[0] - 1) % 5, pos2[1])
-            elif pos1[0] == pos2[0]:
-                plaintext += Playfair._get_playfair_letter(grid, pos1[0], (pos1[1] - 1) % 5)
-                plaintext += Playfair._get_playfair_letter(grid, pos2[0], (pos2[1] - 1) % 5)
-            else:
-                d_col = pos1[1] - pos2[1]
-                plaintext += Playfair._get_playfair_letter(grid, pos1[0], pos1[1] - d_col)
-                plaintext += Playfair._get_playfair_letter(grid, pos2[0], pos2[1] + d_col)
-        # remove 'Q's and join digrams
-        return Playfair._decode_playfair_digrams(plaintext)
+        # get the compiled key and split ciphertext
+        compiled = Playfair._compile(key)
+        ciphertext = "".join(ch for ch in ciphertext if ch in string.ascii_letters).upper().replace('J', 'I')
+        if len(ciphertext) % 2 != 0:
+            raise ValueError("Ciphertext must have an even number of letters!")
+        ciphertext = [ciphertext[idx:idx+2] for idx in range(0, len(ciphertext), 2)]
+
+        # look every digram up at once, then remove 'Q's and join digrams
+        plaintext = "".join(map(compiled.decrypt_table.__getitem__, ciphertext))
+        return "".join(Playfair._decode_playfair_digrams(plaintext))
 
     @staticmethod
     def crack(ciphertext):
@@ -106,62 +66,83 @@ class Playfair(object):
     @staticmethod
     def _encode_playfair_digrams(text):
         """
-        Encode digrams to be proper length for cipher.
+        Encode digrams to be proper length for cipher, one pass over the text.
 
-        :param str text: text to encode
-        :return: list of digrams
-        :rtype: list[str]
+        :param text: text to encode (any iterable of characters)
+        :type text: str | Iterable[str]
+        :return: generator of digrams
+        :rtype: Iterator[str]
         """
-        # expand text into list
-        split_text = [*text]
-        idx = 0
-        while idx < len(split_text):
-            # if we are not at the last character and the two characters in the digram are equal
-            if idx < len(split_text) - 1 and split_text[idx].lower() == split_text[idx + 1].lower():
-                # insert 'Q'
-                split_text = split_text[:idx + 1] + ['Q'] + split_text[idx + 1:]
-            idx += 2
-        # if digrams are not full, add 'Q'
-        if len(split_text) % 2 != 0:
-            split_text.append('Q')
-        # split list into list of digrams
-        return ["".join(split_text[idx:idx + 2]) for idx in range(0, len(split_text), 2)]
+        first = None
+        for ch in text:
+            if first is None:
+                first = ch
+            elif first.lower() == ch.lower():
+                # the two characters in the digram are equal, 'Q' goes between them
+                yield first + 'Q'
+                first = ch
+            else:
+                yield first + ch
+                first = None
+        # if the last digram is not full, add 'Q'
+        if first is not None:
+            yield first + 'Q'
 
     @staticmethod
-    def _decode_playfair_digrams(text) -> str:
+    def _decode_playfair_digrams(text):
         """
-        Function to decode playfair digrams.
+        Function to decode playfair digrams, one pass over the text.
 
-        :param text: text to modify
-        :type text: str
-        :return: str
+        :param text: text to modify (any iterable of characters)
+        :type text: str | Iterable[str]
+        :return: generator of characters
+        :rtype: Iterator[str]
         """
+        text = iter(text)
+        previous = next(text, None)
+        current = next(text, None)
+        if current is None:
+            return
         # do not check first or last letter in string
-        modified_text = text[0]
-        for idx, ch in enumerate(text[1:-1], start=1):
-            # check if 'Q' is surrounded by 2 of the same letters
-            if text[idx - 1].lower() == text[idx + 1].lower():
-                if ch.upper() != 'Q':
-                    modified_text += ch
-            else:
-                modified_text += ch
+        yield previous
+        for following in text:
+            # drop a 'Q' surrounded by 2 of the same letters
+            if current.upper() != 'Q' or previous.lower() != following.lower():
+                yield current
+            previous, current = current, following
         # add back the last letter
-        if text[-1].upper() != 'Q':
-            modified_text += text[-1]
-        return modified_text
+        if current.upper() != 'Q':
+            yield current
+
+    @staticmethod
+    def _compile(key):
+        """
+        Compiled tables for a key, every key is only compiled once.
+
+        :param str key: key to use for the grid.
+        :return: compiled key
+        :rtype: _compiled
+        """
+        grid = Playfair._create_playfair_grid(key)
+        compiled = Playfair._compiled_keys.get(grid)
+        if compiled is None:
+            if len(Playfair._compiled_keys) >= 256:
+                Playfair._compiled_keys.clear()     # plenty for bulk messages under a few keys
+            compiled = Playfair._compiled_keys[grid] = _compiled(grid)
+        return compiled
 
     @staticmethod
     def _create_playfair_grid(key):
         """ organize password to playfair grid. """
         new_key = ""
-        # get only alphabetical letters
+        # get only alphabetical letters (A-Z, the grid has no room for anything else)
         for ch in key:
-            if ch.isalpha():
+            if ch in string.ascii_letters:
                 new_key += ch.upper()
         key = new_key
         # add all uppercase letters and remove J
         key += string.ascii_uppercase
-        key.replace('J', '')
+        key = key.replace('J', '')
 
         # remove all duplicates
         key = "".join(dict.fromkeys(key.upper()))
@@ -182,3 +163,36 @@ class Playfair(object):
         col = idx % 5
         return row, col
     # endregion
+
+
+class _compiled:
+    """ A Playfair key compiled into a table for each direction, mapping all
+        625 digrams of the grid to the digram they encrypt (or decrypt) to.
+    """
+    __slots__ = ("encrypt_table", "decrypt_table")
+
+    def __init__(self, grid):
+        self.encrypt_table = {}
+        self.decrypt_table = {}
+        for first in grid:
+            pos1 = Playfair._get_character_location(grid, first)
+            for second in grid:
+                pos2 = Playfair._get_character_location(grid, second)
+                digram = first + second
+
+                # same rules as the grid lookups have always used, just done ahead of time
+                if pos1[1] == pos2[1]:
+                    self.encrypt_table[digram] = Playfair._get_playfair_letter(grid, (pos1[0] + 1) % 5, pos1[1]) + \
+                        Playfair._get_playfair_letter(grid, (pos2[0] + 1) % 5, pos2[1])
+                    self.decrypt_table[digram] = Playfair._get_playfair_letter(grid, (pos1[0] - 1) % 5, pos1[1]) + \
+                        Playfair._get_playfair_letter(grid, (pos2[0] - 1) % 5, pos2[1])
+                elif pos1[0] == pos2[0]:
+                    self.encrypt_table[digram] = Playfair._get_playfair_letter(grid, pos1[0], (pos1[1] + 1) % 5) + \
+                        Playfair._get_playfair_letter(grid, pos2[0], (pos2[1] + 1) % 5)
+                    self.decrypt_table[digram] = Playfair._get_playfair_letter(grid, pos1[0], (pos1[1] - 1) % 5) + \
+                        Playfair._get_playfair_letter(grid, pos2[0], (pos2[1] - 1) % 5)
+                else:
+                    # the rectangle swaps columns either way
+                    self.encrypt_table[digram] = self.decrypt_table[digram] = \
+                        Playfair._get_playfair_letter(grid, pos1[0], pos2[1]) + \
+                        Playfair._get_playfair_letter(grid, pos2[0], pos1[1])
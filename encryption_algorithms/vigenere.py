@@ -2,9 +2,16 @@
 # Date: Sept 19th, 2022
 # Program: For encrypting and decrypting text with the Vigenere Cipher
 from encryption_algorithms.caesar import Caesar
+import encryption_algorithms.cryptanalysis_wrapper as ca
 
 
 class Vigenere(object):
+    # frequency keys that decrypt to text scoring below this get handed to the annealer
+    fitness_threshold = 60
+    max_key_length = 30
+    # a key repeated to a multiple of its length fits short texts up to ~1 better, so a longer key must win by more
+    length_epsilon = 2
+
     @staticmethod
     def encrypt(text, keyword, preserve_spaces=True) -> str:
         """
@@ -101,34 +108,74 @@ class Vigenere(object):
         key = ""
         key_score = float('inf')
 
-        # loop through all seq lengths 4-6
+        # loop through all seq lengths 4-6 and get the common factors between all sequence spans
+        key_lengths = []
         for seq_len in range(4, 7):
-            # get the common factors between all sequence spans
             sequence = Vigenere._sequence_lists(text, seq_len)
             span = Vigenere._sequence_span_lengths(sequence)
             factor = Vigenere._sequence_length_factors(span)
-            common_factors = (Vigenere._find_common_factors(factor))
-
-            # for each factor, split the cipher text
-            for factor in common_factors:
-                split_ciphertexts = Vigenere._split_ciphertext_by_key_length(text, factor)
-                current_key = []
-                current_score = 0
-
-                # find the best key and if it is better than anything else, store it
-                for idx in range(factor):
-                    current_key += [Vigenere._top3(split_ciphertexts[idx])[0]]
-                    current_score += current_key[idx][0]
-                scaled_score = current_score / factor   # scale based on key length
-                if scaled_score < key_score:
-                    temp_key = ""
-                    for letter in current_key:
-                        temp_key += letter[1]
-                    key = temp_key
-                    key_score = scaled_score
+            key_lengths += [f for f in Vigenere._find_common_factors(factor) if f not in key_lengths]
+
+        # score every column of every candidate key length in one go
+        column_shifts = Vigenere._column_shifts(text, key_lengths)
+        for factor in key_lengths:
+            # find the best key and if it is better than anything else, store it
+            current_key = [best for best, _ in column_shifts[factor]]
+            scaled_score = sum(score for score, _ in current_key) / factor   # scale based on key length
+            if scaled_score < key_score:
+                key = "".join(letter for _, letter in current_key)
+                key_score = scaled_score
+
+        # frequency analysis falls apart on short texts and long keys (only a few letters per column),
+        # so if the key does not decrypt to something english-like, let the annealer take over
+        fitness = ca.check_fitness(Vigenere.decrypt(text, key)) if key else 0
+        if fitness < Vigenere.fitness_threshold:
+            seed_keys = ([key] if key else []) + Vigenere._seed_keys(text)
+            annealed, annealed_key = ca.crack_vigenere(text, seed_keys, Vigenere.length_epsilon)
+            margin = Vigenere.length_epsilon if key and len(annealed_key) > len(key) else 0
+            if ca.check_fitness(annealed) > fitness + margin:
+                key = annealed_key
         return Vigenere.decrypt(text, key), key
 
+    @staticmethod
+    def brute_force(text, max_key_length=5, top=10) -> list[tuple[str, str]]:
+        """
+        Will try every key up to max_key_length. Slower than crack, but it does
+        not depend on frequency analysis, so it is useful as ground truth.
+
+        :param text: Text to decipher.
+        :type text: str
+        :param max_key_length: Longest key to try, at most 12 (26^12 keys is already far too many).
+        :type max_key_length: int
+        :param top: Number of candidates to return.
+        :type top: int
+        :return: list of (plaintext, key) tuples, best first
+        """
+        if max_key_length < 1:
+            raise ValueError("Max key length must be at least 1!")
+        if max_key_length > 12:
+            raise ValueError("Max key length can be at most 12!")
+        if top < 1:
+            raise ValueError("Top must be at least 1!")
+        text = text.replace('\n', '')
+        text = text.replace('\r', '')
+        text = text.replace(' ', '')
+
+        results = ca.brute_force_vigenere(text, max_key_length, top)
+        return [(Vigenere.decrypt(text, key), key) for _, key, _ in results]
+
     # region Vigenere Backend
+    @staticmethod
+    def _seed_keys(text):
+        """ Builds a starting key for every key length the annealer should try by
+            taking the best chi-square shift of each column. Lengths are capped so
+            that every column still has a few letters in it.
+        """
+        max_length = min(Vigenere.max_key_length, len(text) // 4)
+        column_shifts = Vigenere._column_shifts(text, range(1, max_length + 1))
+        seed_keys = ["".join(best[1] for best, _ in columns) for columns in column_shifts.values()]
+        return seed_keys
+
     @staticmethod
     def _get_space_positions(text):
         """ Returns a list containing the index of every space ' ' in a string.
@@ -222,35 +269,52 @@ class Vigenere(object):
                 commonFactors.append(factor)
         return commonFactors
 
+    # English letter profile rotated by every shift, row is the shift being tested
+    _rotated_profiles = [[Caesar.english_frequencies[(i - shift) % 26] for i in range(26)] for shift in range(26)]
+    _profile_energy = sum(f ** 2 for f in Caesar.english_frequencies)
+
+    @staticmethod
+    def _shift_scores(counts, length):
+        """ Scores all 26 shifts of one column from its letter counts. This is the
+            same squared-difference score as Caesar.score_frequencies, expanded so
+            that only the correlation with each rotated profile depends on the
+            shift. Returns a list of 26 (score, letter) tuples.
+        """
+        frequencies = [100.0 * count / length for count in counts]
+        energy = sum(f ** 2 for f in frequencies) + Vigenere._profile_energy
+        return [(round(energy - 2 * sum(f * e for f, e in zip(frequencies, profile)), 1), chr(shift + ord('A')))
+                for shift, profile in enumerate(Vigenere._rotated_profiles)]
+
     @staticmethod
-    def _split_ciphertext_by_key_length(ciphertext, key_length):
-        """ Divides a Vigenere ciphertext into separate sub-ciphertexts, one for
-            each letter of the key. Returns a list of sub-ciphertexts. There will
-            be `key_length` number of sub-texts. Each sub-text corresponds to a
-            different letter in the key. Used for cryptanalysis.
-            For input "ABCDABCD" key_length=3, it returns [ "ADC", "BAD", "CB" ]
+    def _column_shifts(ciphertext, key_lengths):
+        """ Builds a (key_length x 26) letter count matrix for every candidate key
+            length from strided slices of the ciphertext and scores every column
+            against all 26 rotated English profiles. Returns a dictionary of key
+            length to a list with the best and runner-up (score, letter) for each
+            column.
+            For input "ABCDABCD" key_lengths=[2], it returns
+              { 2: [((s, 'A'), (s, 'W')), ((s, 'B'), (s, 'X'))] }
         """
-        textList = [""] * key_length
-        for startIndex in range(key_length):
-            for idx in range(startIndex, len(ciphertext), key_length):
-                textList[startIndex] += ciphertext[idx]
-        return textList
+        ciphertext = ciphertext.lower()
+        column_shifts = {}
+        for key_length in key_lengths:
+            columns = []
+            for start in range(key_length):
+                column = ciphertext[start::key_length]
+                counts = [column.count(ch) for ch in Caesar.english_alphabet]
+                best, runner_up = sorted(Vigenere._shift_scores(counts, len(column)))[:2]
+                columns.append((best, runner_up))
+            column_shifts[key_length] = columns
+        return column_shifts
 
     @staticmethod
     def _top3(subtext):
-        import queue as _queue
         """ Calculates the three most likely Vigenere shift factors for a group of
             subtext. Returns the shift facts as a list of tuples, each tuple having
             a score and the letter that corresponds to the shift factor.
             For example: [(48.5, 'P'), (459.6, 'E'), (468.6, 'A')]
         """
-        q = _queue.PriorityQueue()
-        scores = Caesar.score_all_keys(subtext)
-        for i, score in scores.items():
-            keyLetter = chr(i + ord('A'))
-            q.put((round(score, 1), keyLetter))
-        if q.qsize() != 26:
-            err = "Error: Expected 26 scores but got {0}"
-            raise IndexError(err.format(q.qsize()))
-        return [q.get(), q.get(), q.get()]
+        subtext = subtext.lower()
+        counts = [subtext.count(ch) for ch in Caesar.english_alphabet]
+        return sorted(Vigenere._shift_scores(counts, len(subtext)))[:3]
     # endregion